@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+from ctypes import sizeof
+
+import pyads
+
+# 通知方式
+NOTIFY_MODES = {
+    "change": pyads.ADSTRANS_SERVERONCHA,
+    "cycle": pyads.ADSTRANS_SERVERCYCLE,
+}
+
+
+class StatusSubscriber:
+    """以 ADS 设备通知订阅 PLC 状态数组（推送模式）
+
+    每个数组一个通知句柄；通知回调在 ADS 的回调线程中执行，解码后带时间戳
+    放入加锁的缓冲区，由界面定时取出。缓冲区满时丢弃最旧的样本并计数。
+    """
+
+    def __init__(self, plc, arrays, count, mode="change", cycle_ms=10.0, buffer_size=65536):
+        """arrays: [(数组变量名, 元素 PLC 类型)]；count: 每个数组订阅的元素个数"""
+        if mode not in NOTIFY_MODES:
+            raise ValueError(f"未知通知方式: {mode}")
+        self.plc = plc
+        self.mode = mode
+        self.cycle_ms = cycle_ms
+        self.types = {name: plc_type * count for name, plc_type in arrays}
+        self.handles = []
+        self.dropped = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+
+    def start(self):
+        """为每个数组添加设备通知；任一失败时撤销已添加的通知并抛出 ADSError"""
+        try:
+            for name, array_type in self.types.items():
+                attr = pyads.NotificationAttrib(sizeof(array_type), NOTIFY_MODES[self.mode],
+                                                max_delay=0, cycle_time=self.cycle_ms)
+                self.handles.append(self.plc.add_device_notification(name, attr, self._on_notification))
+        except pyads.ADSError:
+            self.stop()
+            raise
+
+    def _on_notification(self, notification, name):
+        # 在 ADS 回调线程中执行，只做解码和入队
+        _, timestamp, value = self.plc.parse_notification(notification, self.types[name])
+        if value is None:
+            return
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append((name, timestamp, value))
+
+    def drain(self):
+        """取出缓冲区中的全部样本 [(数组变量名, 时间戳, 值列表)]"""
+        with self._lock:
+            samples = list(self._buffer)
+            self._buffer.clear()
+        return samples
+
+    def stop(self):
+        """删除全部设备通知（连接已断开时忽略错误）"""
+        for handles in self.handles:
+            if handles is None:
+                continue
+            try:
+                self.plc.del_device_notification(*handles)
+            except pyads.ADSError:
+                pass
+        self.handles = []
@@ -0,0 +1,159 @@
+import itertools
+import queue
+import threading
+
+import pyads
+from PyQt6.QtCore import QThread, pyqtSignal
+
+# 任务优先级（数值越小越先执行）：停止类命令 > 普通命令 > 状态读取
+PRIORITY_STOP = 0
+PRIORITY_COMMAND = 1
+PRIORITY_TELEMETRY = 2
+
+# ADS 请求超时 (ms)，PLC 无响应时工作线程最多阻塞这么久
+ADS_TIMEOUT_MS = 1000
+
+
+class SymbolHandleCache:
+    """PLC 变量句柄缓存
+
+    write_by_name/read_by_name 不带句柄时，每次都要 获取句柄-读写-释放句柄 三次往返；
+    缓存句柄后每次读写只有一次往返。句柄在断开连接前统一释放。
+    """
+
+    def __init__(self, plc):
+        self.plc = plc
+        self.handles = {}
+
+    def get(self, name):
+        """返回变量句柄，首次访问时向 PLC 解析"""
+        handle = self.handles.get(name)
+        if handle is None:
+            handle = self.handles[name] = self.plc.get_handle(name)
+        return handle
+
+    def prefetch(self, names):
+        """预先解析一批变量句柄，返回解析失败的变量名列表（PLC 中不存在的变量不影响连接）"""
+        failed = []
+        for name in names:
+            try:
+                self.get(name)
+            except pyads.ADSError:
+                failed.append(name)
+        return failed
+
+    def release_all(self):
+        """释放全部句柄（连接已断开时忽略错误）"""
+        for handle in self.handles.values():
+            try:
+                self.plc.release_handle(handle)
+            except pyads.ADSError:
+                pass
+        self.handles.clear()
+
+
+class AdsWorker(QThread):
+    """ADS 通信工作线程
+
+    所有 ADS 读写都在本线程中按优先级依次执行，界面线程只负责提交任务；
+    结果通过 job_finished 信号（排队连接）回到界面线程。
+    同一 coalesce 键的任务在队列中最多只有一个，避免 PLC 卡顿时状态读取堆积。
+    """
+
+    # 任务序号, 是否成功, 错误信息, 返回值
+    job_finished = pyqtSignal(int, bool, str, object)
+
+    def __init__(self, parent=None, timeout_ms=ADS_TIMEOUT_MS):
+        super().__init__(parent)
+        self.timeout_ms = timeout_ms
+        self.plc = None
+        self.handles = None
+        self._queue = queue.PriorityQueue()
+        self._ids = itertools.count(1)
+        self._pending_keys = set()
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self):
+        return self.plc is not None
+
+    def submit(self, priority, fn, *args, coalesce=None):
+        """提交任务 fn(*args)，返回任务序号；同一 coalesce 键已在排队时返回 None"""
+        with self._lock:
+            if coalesce is not None:
+                if coalesce in self._pending_keys:
+                    return None
+                self._pending_keys.add(coalesce)
+            job_id = next(self._ids)
+        self._queue.put((priority, job_id, fn, args, coalesce))
+        return job_id
+
+    def stop(self):
+        """执行完已提交的任务后结束线程并关闭连接"""
+        with self._lock:
+            job_id = next(self._ids)
+        self._queue.put((PRIORITY_TELEMETRY + 1, job_id, None, (), None))
+        self.wait()
+
+    def run(self):
+        while True:
+            _, job_id, fn, args, coalesce = self._queue.get()
+            if fn is None:
+                break
+            if coalesce is not None:
+                with self._lock:
+                    self._pending_keys.discard(coalesce)
+            try:
+                result = fn(*args)
+                self.job_finished.emit(job_id, True, "", result)
+            except Exception as e:
+                self.job_finished.emit(job_id, False, str(e), None)
+        self._close()
+
+    # ---------- 在工作线程中执行的连接任务 ----------
+
+    def open_connection(self, net_id, port):
+        """建立连接（替换已有连接）"""
+        self._close()
+        plc = pyads.Connection(net_id, port)
+        plc.open()
+        plc.set_timeout(self.timeout_ms)
+        self.plc = plc
+        self.handles = SymbolHandleCache(plc)
+
+    def close_connection(self):
+        self._close()
+
+    def _close(self):
+        if self.plc is None:
+            return
+        self.handles.release_all()
+        self.handles = None
+        try:
+            self.plc.close()
+        except pyads.ADSError:
+            pass
+        self.plc = None
+
+    def require_plc(self):
+        """返回当前连接，未连接时抛出异常（由任务结果回报给界面）"""
+        if self.plc is None:
+            raise RuntimeError("未连接到PLC")
+        return self.plc
+
+    def write(self, name, value, plc_type):
+        """按缓存的句柄写变量"""
+        plc = self.require_plc()
+        plc.write_by_name(name, value, plc_type, handle=self.handles.get(name))
+
+    def write_list(self, values):
+        """一次 ADS 求和写入 {变量名: 值}（类型取自缓存的符号信息），任一变量写入失败时抛出异常"""
+        errors = self.require_plc().write_list_by_name(values)
+        failed = [f"{name}: {error}" for name, error in errors.items() if error != "no error"]
+        if failed:
+            raise RuntimeError(f"写入失败 {', '.join(failed)}")
+
+    def read(self, name, plc_type):
+        """按缓存的句柄读变量"""
+        plc = self.require_plc()
+        return plc.read_by_name(name, plc_type, handle=self.handles.get(name))
@@ -0,0 +1,414 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import mujoco
+import numpy as np
+
+from model_cache import cache_path, load_model, model_fingerprint
+from mujoco_simulation import LOD_MODEL_PATH, MODEL_PATH, actuated_joint_indices, replay_trajectory
+from sim_channel import SetpointChannel
+from trajectory_interp import interpolate, joint_limits
+
+# 基准测试项
+BENCHMARKS = ("step_rate", "viewer_step_rate", "command_latency", "model_load", "closed_loop")
+
+# 延迟测试使用的仿真服务端口，避免与界面启动的常驻服务冲突
+BENCH_SERVER_PORT = 6151
+
+
+def _summary(samples, scale=1.0, digits=3):
+    """样本统计: 次数、均值、最小值、中位数、p95、p99、最大值"""
+    samples = np.asarray(samples, dtype=float) * scale
+    if len(samples) == 0:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "n": len(samples),
+        "mean": round(float(samples.mean()), digits),
+        "min": round(float(samples.min()), digits),
+        "p50": round(float(p50), digits),
+        "p95": round(float(p95), digits),
+        "p99": round(float(p99), digits),
+        "max": round(float(samples.max()), digits),
+    }
+
+
+def machine_info():
+    """运行环境信息，便于比较不同机器和版本的结果"""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "mujoco": mujoco.__version__,
+        "numpy": np.__version__,
+        "git_revision": revision,
+    }
+
+
+# ---------- 步进速率 ----------
+
+def bench_step_rate(model_path=MODEL_PATH, duration=3.0, repeats=3):
+    """无可视化时 mj_step 的步进速率（步/秒），重复 repeats 次"""
+    model = load_model(model_path)
+    data = mujoco.MjData(model)
+    rates = []
+    for _ in range(repeats):
+        mujoco.mj_resetData(model, data)
+        steps = 0
+        start = time.perf_counter()
+        deadline = start + duration
+        while True:
+            # 每 100 步检查一次时间，减少计时开销
+            for _ in range(100):
+                mujoco.mj_step(model, data)
+            steps += 100
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+        rates.append(steps / (now - start))
+    return {
+        "steps_per_second": _summary(rates, digits=0),
+        "realtime_factor": round(float(np.median(rates)) * model.opt.timestep, 1),
+        "timestep": model.opt.timestep,
+    }
+
+
+def _viewer_worker(model_path, duration, render_fps, conn):
+    """在子进程中打开可视化窗口并尽快步进（无显示环境时 GLFW 会直接结束进程）"""
+    import mujoco.viewer
+
+    model = load_model(model_path)
+    data = mujoco.MjData(model)
+    frame_period = 1.0 / render_fps
+    with mujoco.viewer.launch_passive(model, data) as viewer:
+        steps = frames = 0
+        sync_time = 0.0
+        start = time.perf_counter()
+        next_frame = start + frame_period
+        while viewer.is_running():
+            mujoco.mj_step(model, data)
+            steps += 1
+            now = time.perf_counter()
+            if now >= next_frame:
+                viewer.sync()
+                frames += 1
+                sync_time += time.perf_counter() - now
+                next_frame += frame_period
+                if now - start >= duration:
+                    break
+        elapsed = time.perf_counter() - start
+    conn.send({
+        "steps_per_second": round(steps / elapsed),
+        "frames_per_second": round(frames / elapsed, 1),
+        "sync_ms": round(sync_time / max(frames, 1) * 1000, 3),
+        "render_fps": render_fps,
+    })
+
+
+def bench_viewer_step_rate(model_path=MODEL_PATH, duration=3.0, render_fps=60.0):
+    """打开可视化窗口、按 render_fps 同步画面时的步进速率"""
+    ctx = multiprocessing.get_context("spawn")
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_viewer_worker, args=(model_path, duration, render_fps, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv() if receiver.poll(duration + 60) else None
+    except EOFError:
+        # 子进程未发送结果就退出了
+        result = None
+    process.join(10)
+    if process.is_alive():
+        process.terminate()
+    if result is None:
+        return {"skipped": f"无法打开可视化窗口（退出码 {process.exitcode}），可能没有显示环境"}
+    return result
+
+
+# ---------- 命令到执行的延迟 ----------
+
+def _latency_consumer(kind, path, model_path, stop, conn):
+    """模拟仿真循环：每步轮询一次命令，新设定值生效并步进后回报时间戳"""
+    model = load_model(model_path)
+    data = mujoco.MjData(model)
+    nu = model.nu
+    last = None
+    channel = SetpointChannel(path) if kind == "setpoint_channel" else None
+    last_seq = channel.seq if channel is not None else None
+    conn.send("ready")
+    while not stop.is_set():
+        values = None
+        if kind == "json_file":
+            # 原实现：每步读取一次 ctrl_params.json
+            try:
+                with open(path, "r") as f:
+                    values = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                values = None
+        else:
+            update = channel.poll(last_seq)
+            if update is not None:
+                last_seq, values = update
+        if values is not None and values != last and len(values) >= nu:
+            last = values
+            data.ctrl[:nu] = values[:nu]
+            mujoco.mj_step(model, data)
+            conn.send((values[0], time.perf_counter()))
+        else:
+            mujoco.mj_step(model, data)
+    if channel is not None:
+        channel.close()
+
+
+def _measure_consumer_latency(kind, path, model_path, samples):
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    receiver, sender = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_latency_consumer, args=(kind, path, model_path, stop, sender))
+    process.start()
+    sender.close()
+    latencies = []
+    channel = SetpointChannel(path) if kind == "setpoint_channel" else None
+    try:
+        if not receiver.poll(60):
+            raise RuntimeError("延迟测试进程启动超时")
+        receiver.recv()
+        rng = np.random.default_rng(0)
+        for i in range(samples):
+            # 每次下发不同的设定值，标记值用于匹配回报
+            values = [0.001 * (i + 1), -1.0, -1.0, 0.0, 0.0, 0.0]
+            sent = time.perf_counter()
+            if channel is not None:
+                channel.write(values)
+            else:
+                # 与界面相同：直接覆盖写入 JSON 文件
+                with open(path, "w") as f:
+                    json.dump(values, f)
+            while True:
+                if not receiver.poll(5):
+                    raise RuntimeError("等待设定值生效超时")
+                marker, applied = receiver.recv()
+                if marker == values[0]:
+                    break
+            latencies.append(applied - sent)
+            time.sleep(rng.uniform(0.001, 0.005))
+    finally:
+        stop.set()
+        process.join(10)
+        if process.is_alive():
+            process.terminate()
+        if channel is not None:
+            channel.close()
+    return latencies
+
+
+def _server_worker(model_path, port, workdir):
+    """在临时目录中运行无界面仿真服务，避免覆盖工作目录中的通道文件"""
+    from sim_server import SimulationServer
+
+    os.chdir(workdir)
+    server = SimulationServer(model_path=model_path, address=("127.0.0.1", port), headless=True,
+                              exit_on_disconnect=True, telemetry_hz=0)
+    server.serve_forever()
+
+
+def _measure_server_latency(model_path, samples, port, workdir):
+    from sim_server import SimClient
+
+    ctx = multiprocessing.get_context("spawn")
+    process = ctx.Process(target=_server_worker, args=(model_path, port, workdir))
+    process.start()
+    client = SimClient(("127.0.0.1", port))
+    latencies = []
+    try:
+        client.connect(timeout=60)
+        client.request("start", ctrl=[0.0, -1.0, -1.0, 0.0, 0.0, 0.0])
+        rng = np.random.default_rng(0)
+        for i in range(samples):
+            sent = time.perf_counter()
+            # 应答在服务主循环中设定值写入 data.ctrl 之后返回
+            client.request("set_setpoint", ctrl=[0.001 * (i + 1), -1.0, -1.0, 0.0, 0.0, 0.0])
+            latencies.append(time.perf_counter() - sent)
+            time.sleep(rng.uniform(0.001, 0.005))
+        client.request("shutdown")
+    finally:
+        client.close()
+        process.join(10)
+        if process.is_alive():
+            process.terminate()
+    return latencies
+
+
+def bench_command_latency(model_path=MODEL_PATH, samples=200, port=BENCH_SERVER_PORT):
+    """界面下发设定值到仿真循环中生效的延迟 (ms)
+
+    json_file: 原 ctrl_params.json 方式，仿真循环每步读取文件；
+    setpoint_channel: 共享内存设定值通道，仿真循环每步轮询序号；
+    sim_server: 向常驻仿真服务发送 set_setpoint 命令的往返时间（实时模式，在帧间处理）。
+    时间戳均取自 time.perf_counter，跨进程可比。
+    """
+    model_path = str(Path(model_path).resolve())
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for kind, name in (("json_file", "ctrl_params.json"), ("setpoint_channel", "ctrl_channel.bin")):
+            try:
+                latencies = _measure_consumer_latency(kind, os.path.join(workdir, name), model_path, samples)
+                results[kind] = _summary(latencies, scale=1000.0)
+            except Exception as e:
+                results[kind] = {"error": str(e)}
+        try:
+            latencies = _measure_server_latency(model_path, samples, port, workdir)
+            results["sim_server"] = _summary(latencies, scale=1000.0)
+        except Exception as e:
+            results["sim_server"] = {"error": str(e)}
+    results["unit"] = "ms"
+    return results
+
+
+# ---------- 模型加载 ----------
+
+def bench_model_load(model_path=MODEL_PATH, repeats=5):
+    """冷加载（从 MJCF 编译）与热加载（读取 MJB 缓存）的耗时 (ms)"""
+    cold = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load_model(model_path, use_cache=False)
+        cold.append(time.perf_counter() - start)
+
+    # 第一次带缓存加载负责生成缓存文件，不计入热加载
+    cache_file = cache_path(model_path)
+    start = time.perf_counter()
+    load_model(model_path)
+    first = time.perf_counter() - start
+    warm = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load_model(model_path)
+        warm.append(time.perf_counter() - start)
+    # 热加载中计算源文件指纹和读取 MJB 各自的耗时
+    fingerprint, binary = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model_fingerprint(model_path)
+        fingerprint.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        mujoco.MjModel.from_binary_path(str(cache_file))
+        binary.append(time.perf_counter() - start)
+    return {
+        "xml_compile_ms": _summary(cold, scale=1000.0),
+        "first_cached_load_ms": round(first * 1000.0, 3),
+        "mjb_cache_ms": _summary(warm, scale=1000.0),
+        "fingerprint_ms": _summary(fingerprint, scale=1000.0),
+        "mjb_read_ms": _summary(binary, scale=1000.0),
+        "cache_file": str(cache_file),
+        "cache_available": cache_file.exists(),
+    }
+
+
+# ---------- 闭环轨迹 ----------
+
+def bench_closed_loop(trajectory_file="closedLoopParams.json", model_path=MODEL_PATH,
+                      pos_tol=1e-2, vel_tol=1e-2, timeout=5.0, method="quintic"):
+    """无可视化执行闭环轨迹的完成时间
+
+    waypoint: 逐点下发并等待到位（与界面逐点模式一致）；
+    interpolated: 先按关节限制插值为稠密设定值逐步下发，最后等待终点到位。
+    """
+    with open(trajectory_file, "r") as f:
+        trajectory = np.asarray(json.load(f), dtype=float)
+    model = load_model(model_path)
+    data = mujoco.MjData(model)
+    qpos_idx, _ = actuated_joint_indices(model)
+    nu = len(qpos_idx)
+    results = {"trajectory": Path(trajectory_file).name, "points": len(trajectory)}
+
+    mujoco.mj_resetData(model, data)
+    start = time.perf_counter()
+    result = replay_trajectory(model, data, trajectory, pos_tol, vel_tol, timeout)
+    wall = time.perf_counter() - start
+    settled = ~np.isnan(result["settle_times"])
+    results["waypoint"] = {
+        "sim_time": round(data.time, 4),
+        "wall_time": round(wall, 4),
+        "settled_points": int(settled.sum()),
+        "max_final_error": round(float(np.abs(result["final_errors"]).max()), 6),
+    }
+
+    mujoco.mj_resetData(model, data)
+    start = time.perf_counter()
+    waypoints = np.vstack((data.qpos[qpos_idx], trajectory[:, :nu]))
+    _, positions = interpolate(waypoints, model.opt.timestep, joint_limits(model), method)
+    for setpoint in positions:
+        data.ctrl[:nu] = setpoint
+        mujoco.mj_step(model, data)
+    final = replay_trajectory(model, data, positions[-1:], pos_tol, vel_tol, timeout)
+    wall = time.perf_counter() - start
+    results["interpolated"] = {
+        "method": method,
+        "sim_time": round(data.time, 4),
+        "wall_time": round(wall, 4),
+        "settled": bool(not np.isnan(final["settle_times"][0])),
+        "final_error": round(float(np.abs(final["final_errors"]).max()), 6),
+    }
+    return results
+
+
+def run_benchmarks(selected=BENCHMARKS, quick=False, trajectory_file="closedLoopParams.json"):
+    """依次运行选中的基准测试，单项失败时记录错误并继续"""
+    duration = 1.0 if quick else 3.0
+    runners = {
+        "step_rate": lambda: bench_step_rate(duration=duration, repeats=1 if quick else 3),
+        "viewer_step_rate": lambda: bench_viewer_step_rate(duration=duration),
+        "command_latency": lambda: bench_command_latency(samples=50 if quick else 200),
+        "model_load": lambda: bench_model_load(repeats=2 if quick else 5),
+        "closed_loop": lambda: bench_closed_loop(trajectory_file),
+        "model_load_lod": lambda: bench_model_load(LOD_MODEL_PATH, repeats=2 if quick else 5),
+    }
+    names = list(selected)
+    if "model_load" in names and Path(LOD_MODEL_PATH).exists():
+        # 已生成低精度场景时一并比较其加载时间
+        names.append("model_load_lod")
+    results = {"machine": machine_info(), "quick": quick, "model": MODEL_PATH, "results": {}}
+    for name in names:
+        print(f"运行 {name} ...")
+        start = time.perf_counter()
+        try:
+            results["results"][name] = runners[name]()
+        except Exception as e:
+            results["results"][name] = {"error": str(e)}
+        print(f"  {name} 完成，用时 {time.perf_counter() - start:.1f} s")
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="UR5e 仿真性能基准测试")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS),
+                        help="只运行指定的测试项")
+    parser.add_argument("--quick", action="store_true", help="缩短测试时长（用于快速检查）")
+    parser.add_argument("--trajectory", default="closedLoopParams.json", help="闭环轨迹测试使用的轨迹文件")
+    parser.add_argument("--output", default="benchmark_result.json", help="结果文件（JSON）")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = run_benchmarks(args.only, args.quick, args.trajectory)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"结果已写入 {args.output}")
@@ -0,0 +1,159 @@
+from collections import OrderedDict
+
+import mujoco
+import numpy as np
+
+from model_cache import load_model
+from mujoco_simulation import MODEL_PATH, actuated_joint_indices
+
+
+def rpy_to_quat(roll, pitch, yaw):
+    """RPY 欧拉角（绕固定轴 X-Y-Z）转四元数 (w, x, y, z)"""
+    cr, sr = np.cos(roll / 2), np.sin(roll / 2)
+    cp, sp = np.cos(pitch / 2), np.sin(pitch / 2)
+    cy, sy = np.cos(yaw / 2), np.sin(yaw / 2)
+    return np.array([
+        cr * cp * cy + sr * sp * sy,
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+    ])
+
+
+class IKService:
+    """基于 MuJoCo 雅可比（mj_jacSite）的 UR5e 逆运动学服务
+
+    采用阻尼最小二乘迭代，默认以上一次的解作为初值；最近的解按量化后的
+    位姿保存在 LRU 缓存中，重复或相近的目标可直接命中。
+    """
+
+    def __init__(self, model_path=MODEL_PATH, site="attachment_site", cache_size=1024,
+                 pos_quantum=1e-4, rot_quantum=1e-3, damping=1e-3):
+        self.model = load_model(model_path)
+        self.data = mujoco.MjData(self.model)
+        self.site_id = mujoco.mj_name2id(self.model, mujoco.mjtObj.mjOBJ_SITE, site)
+        if self.site_id < 0:
+            raise ValueError(f"site 不存在: {site}")
+        self.qpos_idx, self.dof_idx = actuated_joint_indices(self.model)
+        joint_ids = self.model.actuator_trnid[:, 0]
+        self.joint_min = self.model.jnt_range[joint_ids, 0]
+        self.joint_max = self.model.jnt_range[joint_ids, 1]
+
+        self.cache_size = cache_size
+        self.pos_quantum = pos_quantum
+        self.rot_quantum = rot_quantum
+        self.damping = damping
+        self.cache = OrderedDict()
+
+        # 初值：home 关键帧（没有时为零位）
+        if self.model.nkey > 0:
+            mujoco.mj_resetDataKeyframe(self.model, self.data, 0)
+        self.home = self.data.qpos[self.qpos_idx].copy()
+        self.last_solution = self.home.copy()
+
+        nv = self.model.nv
+        self._jacp = np.zeros((3, nv))
+        self._jacr = np.zeros((3, nv))
+        self._site_quat = np.zeros(4)
+        self._neg_quat = np.zeros(4)
+        self._err_quat = np.zeros(4)
+        self._err_rot = np.zeros(3)
+
+    def _cache_key(self, pos, quat):
+        if quat is not None and quat[0] < 0:
+            # q 与 -q 表示同一姿态
+            quat = -quat
+        key = tuple(np.round(pos / self.pos_quantum).astype(np.int64))
+        if quat is not None:
+            key += tuple(np.round(quat / self.rot_quantum).astype(np.int64))
+        return key
+
+    def _site_error(self, target_pos, target_quat):
+        """当前 site 与目标位姿的误差向量（位置 3 维 + 姿态 3 维）"""
+        data = self.data
+        err_pos = target_pos - data.site_xpos[self.site_id]
+        if target_quat is None:
+            return err_pos
+        mujoco.mju_mat2Quat(self._site_quat, data.site_xmat[self.site_id])
+        mujoco.mju_negQuat(self._neg_quat, self._site_quat)
+        mujoco.mju_mulQuat(self._err_quat, target_quat, self._neg_quat)
+        mujoco.mju_quat2Vel(self._err_rot, self._err_quat, 1.0)
+        return np.concatenate((err_pos, self._err_rot))
+
+    def solve(self, pos, quat=None, initial=None, max_iter=200, tol=1e-5, max_step=0.5):
+        """求解单个目标位姿
+
+        pos: 末端目标位置 (3,)；quat: 目标姿态四元数 (w, x, y, z)，为 None 时只约束位置
+        initial: 初值，默认使用上一次收敛的解
+        返回 (关节角 (nu,), 是否收敛, 残差范数)
+        """
+        pos = np.asarray(pos, dtype=float)
+        if quat is not None:
+            quat = np.asarray(quat, dtype=float)
+            quat = quat / np.linalg.norm(quat)
+
+        key = self._cache_key(pos, quat)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.last_solution = cached[0].copy()
+            return cached[0].copy(), True, cached[1]
+
+        seed = self.last_solution if initial is None else initial
+        q, converged, error_norm = self._iterate(pos, quat, seed, max_iter, tol, max_step)
+        if not converged:
+            # 热启动初值离目标太远时退回到 home 位形重新求解
+            q_home, converged_home, error_home = self._iterate(pos, quat, self.home, max_iter, tol, max_step)
+            if converged_home or error_home < error_norm:
+                q, converged, error_norm = q_home, converged_home, error_home
+
+        if converged:
+            self.last_solution = q.copy()
+            self.cache[key] = (q.copy(), error_norm)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return q, converged, error_norm
+
+    def _iterate(self, pos, quat, seed, max_iter, tol, max_step):
+        """从 seed 出发做阻尼最小二乘迭代"""
+        model, data = self.model, self.data
+        q = np.array(seed, dtype=float)
+        converged = False
+        error_norm = np.inf
+        for _ in range(max_iter):
+            data.qpos[self.qpos_idx] = q
+            mujoco.mj_kinematics(model, data)
+            mujoco.mj_comPos(model, data)
+            error = self._site_error(pos, quat)
+            error_norm = np.linalg.norm(error)
+            if error_norm < tol:
+                converged = True
+                break
+
+            mujoco.mj_jacSite(model, data, self._jacp, self._jacr, self.site_id)
+            jac = self._jacp if quat is None else np.vstack((self._jacp, self._jacr))
+            jac = jac[:, self.dof_idx]
+            # 阻尼最小二乘: dq = J^T (J J^T + λI)^-1 e
+            dq = jac.T @ np.linalg.solve(jac @ jac.T + self.damping * np.eye(len(error)), error)
+            step = np.abs(dq).max()
+            if step > max_step:
+                dq *= max_step / step
+            q = np.clip(q + dq, self.joint_min, self.joint_max)
+        return q, converged, error_norm
+
+    def solve_batch(self, positions, quats=None, initial=None, **kwargs):
+        """依次求解一组位姿，每个点以前一个点的解为初值（适合连续路径）
+
+        返回 (关节角 (N, nu), 收敛标志 (N,), 残差 (N,))
+        """
+        positions = np.atleast_2d(np.asarray(positions, dtype=float))
+        n = len(positions)
+        solutions = np.zeros((n, len(self.qpos_idx)))
+        converged = np.zeros(n, dtype=bool)
+        errors = np.zeros(n)
+        if initial is not None:
+            self.last_solution = np.asarray(initial, dtype=float)
+        for i in range(n):
+            quat = None if quats is None else quats[i]
+            solutions[i], converged[i], errors[i] = self.solve(positions[i], quat, **kwargs)
+        return solutions, converged, errors
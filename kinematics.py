@@ -0,0 +1,118 @@
+from functools import lru_cache
+
+import mujoco
+import numpy as np
+
+from model_cache import load_model
+from mujoco_simulation import MODEL_PATH
+
+# UR5e 标称工作半径 (m)，以肩关节为中心
+UR5E_REACH = 0.85
+
+
+def _quat_to_mat(quat):
+    mat = np.zeros(9)
+    mujoco.mju_quat2Mat(mat, np.asarray(quat, dtype=float))
+    return mat.reshape(3, 3)
+
+
+def _axis_rotations(axis, angles):
+    """绕固定单位轴旋转 angles（形状 (N,)）的批量旋转矩阵 (N, 3, 3)"""
+    x, y, z = axis
+    c = np.cos(angles)[:, None, None]
+    s = np.sin(angles)[:, None, None]
+    skew = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    outer = np.outer(axis, axis)
+    return c * np.eye(3) + s * skew + (1.0 - c) * outer
+
+
+class KinematicChain:
+    """由 MJCF 编译后的刚体树构建的串联运动链，支持批量正运动学
+
+    仅包含从世界坐标系到目标 site 所在刚体的路径，各刚体的固定位姿预先计算，
+    批量求解时每个关节只做一次向量化的旋转矩阵相乘。
+    """
+
+    def __init__(self, model, site="attachment_site"):
+        site_id = mujoco.mj_name2id(model, mujoco.mjtObj.mjOBJ_SITE, site)
+        if site_id < 0:
+            raise ValueError(f"site 不存在: {site}")
+
+        # 从目标刚体回溯到世界
+        bodies = []
+        body = model.site_bodyid[site_id]
+        while body != 0:
+            bodies.append(body)
+            body = model.body_parentid[body]
+        bodies.reverse()
+
+        self.links = []
+        for body in bodies:
+            joints = [j for j in range(model.njnt) if model.jnt_bodyid[j] == body]
+            if len(joints) > 1 or any(model.jnt_type[j] != mujoco.mjtJoint.mjJNT_HINGE for j in joints):
+                raise ValueError("运动链只支持每个刚体至多一个转动关节")
+            joint = joints[0] if joints else None
+            self.links.append({
+                "name": mujoco.mj_id2name(model, mujoco.mjtObj.mjOBJ_BODY, body),
+                "pos": model.body_pos[body].copy(),
+                "rot": _quat_to_mat(model.body_quat[body]),
+                "qpos_adr": None if joint is None else model.jnt_qposadr[joint],
+                "axis": None if joint is None else model.jnt_axis[joint].copy(),
+                "anchor": None if joint is None else model.jnt_pos[joint].copy(),
+            })
+        self.site_pos = model.site_pos[site_id].copy()
+        self.site_rot = _quat_to_mat(model.site_quat[site_id])
+        self.qpos_adr = [link["qpos_adr"] for link in self.links if link["qpos_adr"] is not None]
+
+    def forward(self, qpos, return_links=False):
+        """批量正运动学
+
+        qpos: (N, nq) 或 (nq,) 的关节位置
+        返回 (位置 (N, 3), 姿态矩阵 (N, 3, 3))；return_links 为 True 时
+        另外返回 {刚体名: 原点位置 (N, 3)}，用于绘制整条机械臂。
+        """
+        qpos = np.atleast_2d(np.asarray(qpos, dtype=float))
+        n = len(qpos)
+        pos = np.zeros((n, 3))
+        rot = np.broadcast_to(np.eye(3), (n, 3, 3)).copy()
+        link_positions = {}
+
+        for link in self.links:
+            pos = pos + rot @ link["pos"]
+            rot = rot @ link["rot"]
+            if link["qpos_adr"] is not None:
+                joint_rot = _axis_rotations(link["axis"], qpos[:, link["qpos_adr"]])
+                anchor = link["anchor"]
+                if anchor.any():
+                    # 关节轴不过刚体原点时的平移修正
+                    pos = pos + rot @ anchor - np.einsum("nij,nj->ni", rot @ joint_rot, np.broadcast_to(anchor, (n, 3)))
+                rot = rot @ joint_rot
+            if return_links:
+                link_positions[link["name"]] = pos
+
+        site_pos = pos + rot @ self.site_pos
+        site_rot = rot @ self.site_rot
+        if return_links:
+            return site_pos, site_rot, link_positions
+        return site_pos, site_rot
+
+
+@lru_cache(maxsize=4)
+def get_chain(model_path=MODEL_PATH, site="attachment_site"):
+    """按模型路径缓存运动链，模型只在首次使用时加载"""
+    return KinematicChain(load_model(model_path), site)
+
+
+def forward_kinematics(qpos, model_path=MODEL_PATH, site="attachment_site"):
+    """批量计算末端 site 的位置和姿态矩阵"""
+    return get_chain(model_path, site).forward(qpos)
+
+
+def workspace_violations(qpos, reach=UR5E_REACH, z_min=0.0, model_path=MODEL_PATH):
+    """批量检查末端是否超出工作空间（超出标称半径或低于地面），返回布尔数组"""
+    chain = get_chain(model_path)
+    site_pos, _, links = chain.forward(qpos, return_links=True)
+    shoulder = links[chain.links[1]["name"]] if len(chain.links) > 1 else np.zeros_like(site_pos)
+    too_far = np.linalg.norm(site_pos - shoulder, axis=1) > reach
+    too_low = site_pos[:, 2] < z_min
+    return too_far | too_low
@@ -29,6 +29,12 @@ class MainWindow(QMainWindow):
         self.sim_tab = SimulationControlTab(self)
         self.tab_widget.addTab(self.sim_tab, "3D仿真控制")
 
+    def closeEvent(self, event):
+        # 退出时关闭常驻仿真服务和 ADS 工作线程
+        self.sim_tab.shutdown_sim_server()
+        self.robot_tab.shutdown()
+        super().closeEvent(event)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setStyleSheet(
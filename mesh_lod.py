@@ -0,0 +1,221 @@
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import mujoco
+import numpy as np
+
+from mujoco_simulation import MODEL_PATH
+
+# 低精度网格目录（与原 assets 目录同级，文件名不变，只需切换 meshdir）
+LOD_MESH_DIR = "assets_lod"
+
+# 每个刚体的凸包碰撞网格文件名后缀
+HULL_SUFFIX = "_hull"
+
+
+def read_obj(path):
+    """读取 OBJ 网格，返回 (顶点 (N, 3), 三角面 (M, 3))，多边形按扇形三角化"""
+    vertices = []
+    faces = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("v "):
+                vertices.append(line[2:])
+            elif line.startswith("f "):
+                # 只取顶点序号，忽略纹理和法线序号
+                idx = [int(token.split("/")[0]) for token in line[2:].split()]
+                for k in range(1, len(idx) - 1):
+                    faces.append((idx[0], idx[k], idx[k + 1]))
+    vertices = np.array(" ".join(vertices).split(), dtype=float).reshape(-1, 3)
+    faces = np.array(faces, dtype=np.int64).reshape(-1, 3)
+    # OBJ 序号从 1 开始，负数表示相对末尾
+    faces = np.where(faces > 0, faces - 1, faces + len(vertices))
+    return vertices, faces
+
+
+def write_obj(path, vertices, faces):
+    """写出只含顶点和三角面的 OBJ 网格"""
+    with open(path, "w") as f:
+        f.write(f"# {len(vertices)} vertices, {len(faces)} faces\n")
+        np.savetxt(f, vertices, fmt="v %.6f %.6f %.6f")
+        np.savetxt(f, faces + 1, fmt="f %d %d %d")
+
+
+def _cluster(vertices, faces, resolution):
+    """按网格分辨率（最长边上的格子数）做顶点聚类，返回 (顶点, 三角面)"""
+    low = vertices.min(axis=0)
+    cell = max(np.ptp(vertices, axis=0).max() / resolution, 1e-12)
+    keys = np.floor((vertices - low) / cell).astype(np.int64)
+    _, cluster, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.reshape(-1)
+    # 每个格子用其中顶点的平均位置作为代表点
+    merged = np.zeros((len(counts), 3))
+    np.add.at(merged, cluster, vertices)
+    merged /= counts[:, None]
+
+    remapped = cluster[faces]
+    keep = ((remapped[:, 0] != remapped[:, 1]) & (remapped[:, 1] != remapped[:, 2])
+            & (remapped[:, 0] != remapped[:, 2]))
+    remapped = remapped[keep]
+    if len(remapped):
+        # 去掉重复的三角面（保留第一次出现时的朝向）
+        _, first = np.unique(np.sort(remapped, axis=1), axis=0, return_index=True)
+        remapped = remapped[np.sort(first)]
+    # 删除未被引用的顶点
+    used, remapped = np.unique(remapped, return_inverse=True)
+    return merged[used], remapped.reshape(-1, 3)
+
+
+def decimate(vertices, faces, target_faces):
+    """顶点聚类简化：二分查找网格分辨率，使三角面数不超过 target_faces 且尽量接近"""
+    if len(faces) <= target_faces:
+        return _cluster(vertices, faces, 1 << 20)
+    lo, hi = 1, 2048
+    best = _cluster(vertices, faces, lo)
+    while lo < hi - 1:
+        mid = (lo + hi) // 2
+        candidate = _cluster(vertices, faces, mid)
+        if len(candidate[1]) <= target_faces:
+            lo, best = mid, candidate
+        else:
+            hi = mid
+    return best
+
+
+def convex_hull(vertices, max_vertices=64):
+    """用 MuJoCo 自带的 qhull 计算凸包，返回 (顶点, 三角面)，坐标系与输入一致"""
+    spec = mujoco.MjSpec()
+    mesh = spec.add_mesh()
+    mesh.name = "hull"
+    mesh.uservert = np.asarray(vertices, dtype=float).reshape(-1).tolist()
+    mesh.maxhullvert = max_vertices
+    geom = spec.worldbody.add_geom()
+    geom.type = mujoco.mjtGeom.mjGEOM_MESH
+    geom.meshname = "hull"
+    model = spec.compile()
+
+    # mesh_graph: numvert, numface, vert_edgeadr, vert_globalid, edge_localid, face_globalid
+    graph = model.mesh_graph[model.mesh_graphadr[0]:]
+    numvert, numface = graph[0], graph[1]
+    global_ids = graph[2 + numvert:2 + 2 * numvert]
+    hull_faces = graph[2 + 3 * numvert + 3 * numface:2 + 3 * numvert + 6 * numface].reshape(numface, 3)
+
+    # 编译时网格被平移、旋转到惯性主轴坐标系，变换回原坐标系
+    rot = np.zeros(9)
+    mujoco.mju_quat2Mat(rot, model.mesh_quat[0])
+    points = model.mesh_vert.astype(float) @ rot.reshape(3, 3).T + model.mesh_pos[0]
+    # 凸包面引用的是全部顶点的序号，只保留凸包顶点并重新编号
+    remap = np.full(len(points), -1)
+    remap[global_ids] = np.arange(numvert)
+    return points[global_ids], remap[hull_faces]
+
+
+def _body_meshes(root):
+    """{刚体名: [该刚体可视网格名]}，用于生成每个刚体的凸包"""
+    meshes = {}
+    for body in root.iter("body"):
+        names = [geom.get("mesh") for geom in body.findall("geom") if geom.get("mesh")]
+        if names:
+            meshes[body.get("name")] = names
+    return meshes
+
+
+def build_lod(scene_path=MODEL_PATH, ratio=0.1, min_faces=200, hull_vertices=64, hull_collision=False):
+    """生成低精度网格、每个刚体的凸包碰撞网格以及低精度场景文件
+
+    scene_path 所在目录下生成:
+      assets_lod/<网格>.obj       按 ratio 简化的可视网格（文件名与原网格相同）
+      assets_lod/<刚体>_hull.obj  刚体全部可视网格的凸包
+      <机器人>_lod.xml、<场景>_lod.xml
+    hull_collision 为 True 时，低精度模型用凸包替换原有的胶囊体碰撞几何。
+    """
+    scene_path = Path(scene_path)
+    model_dir = scene_path.parent
+    scene_root = ET.parse(scene_path).getroot()
+    include = scene_root.find("include")
+    if include is None:
+        raise ValueError(f"场景文件中没有 include 机器人模型: {scene_path}")
+    robot_path = model_dir / include.get("file")
+    tree = ET.parse(robot_path)
+    root = tree.getroot()
+    compiler = root.find("compiler")
+    mesh_dir = model_dir / (compiler.get("meshdir", "") if compiler is not None else "")
+    lod_dir = model_dir / LOD_MESH_DIR
+    lod_dir.mkdir(exist_ok=True)
+
+    # 可视网格简化
+    stats = {}
+    body_vertices = {}
+    for mesh in root.iter("mesh"):
+        file_name = mesh.get("file")
+        name = mesh.get("name") or Path(file_name).stem
+        start = time.perf_counter()
+        vertices, faces = read_obj(mesh_dir / file_name)
+        target = max(min_faces, int(len(faces) * ratio))
+        lod_vertices, lod_faces = decimate(vertices, faces, target)
+        write_obj(lod_dir / file_name, lod_vertices, lod_faces)
+        body_vertices[name] = vertices
+        stats[name] = {
+            "faces": len(faces),
+            "lod_faces": len(lod_faces),
+            "bytes": (mesh_dir / file_name).stat().st_size,
+            "lod_bytes": (lod_dir / file_name).stat().st_size,
+        }
+        print(f"{file_name}: {len(faces)} -> {len(lod_faces)} 面, 用时 {time.perf_counter() - start:.2f} s")
+
+    # 每个刚体一个凸包碰撞网格
+    hulls = {}
+    for body, names in _body_meshes(root).items():
+        hull_vertices_, hull_faces = convex_hull(np.vstack([body_vertices[n] for n in names]), hull_vertices)
+        hull_file = f"{body}{HULL_SUFFIX}.obj"
+        write_obj(lod_dir / hull_file, hull_vertices_, hull_faces)
+        hulls[body] = hull_file
+        print(f"{hull_file}: {len(hull_vertices_)} 个顶点, {len(hull_faces)} 面")
+
+    # 低精度机器人模型：切换网格目录，可选用凸包替换碰撞几何
+    if compiler is None:
+        compiler = ET.SubElement(root, "compiler")
+    compiler.set("meshdir", LOD_MESH_DIR)
+    if hull_collision:
+        asset = root.find("asset")
+        for body in root.iter("body"):
+            collision = [geom for geom in body.findall("geom")
+                         if geom.get("class") in ("collision", "eef_collision")]
+            # 只替换原本带碰撞几何的刚体
+            if body.get("name") not in hulls or not collision:
+                continue
+            hull_name = Path(hulls[body.get("name")]).stem
+            ET.SubElement(asset, "mesh", name=hull_name, file=hulls[body.get("name")])
+            for geom in collision:
+                body.remove(geom)
+            ET.SubElement(body, "geom", {"class": "collision", "type": "mesh", "mesh": hull_name})
+    ET.indent(tree, space="  ")
+    lod_robot = robot_path.with_name(f"{robot_path.stem}_lod.xml")
+    tree.write(lod_robot, encoding="utf-8")
+
+    # 低精度场景：除 include 外与原场景相同
+    include.set("file", lod_robot.name)
+    lod_scene = scene_path.with_name(f"{scene_path.stem}_lod.xml")
+    scene_tree = ET.ElementTree(scene_root)
+    ET.indent(scene_tree, space="  ")
+    scene_tree.write(lod_scene, encoding="utf-8")
+    print(f"低精度场景已生成: {lod_scene}")
+    return {"scene": str(lod_scene), "meshes": stats, "hulls": hulls}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成 UR5e 低精度网格、凸包碰撞网格和低精度场景")
+    parser.add_argument("--scene", default=MODEL_PATH, help="原场景文件")
+    parser.add_argument("--ratio", type=float, default=0.1, help="简化后保留的三角面比例")
+    parser.add_argument("--min-faces", type=int, default=200, help="每个网格至少保留的三角面数")
+    parser.add_argument("--hull-vertices", type=int, default=64, help="凸包最多顶点数")
+    parser.add_argument("--hull-collision", action="store_true",
+                        help="低精度模型用凸包网格替换原有的胶囊体碰撞几何")
+    args = parser.parse_args()
+
+    result = build_lod(args.scene, args.ratio, args.min_faces, args.hull_vertices, args.hull_collision)
+    before = sum(s["bytes"] for s in result["meshes"].values())
+    after = sum(s["lod_bytes"] for s in result["meshes"].values())
+    print(f"网格文件 {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
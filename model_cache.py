@@ -0,0 +1,111 @@
+import hashlib
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import mujoco
+
+# 引用资源文件的 MJCF 元素及其所在目录对应的 compiler 属性
+ASSET_DIR_ATTRS = {"mesh": "meshdir", "skin": "meshdir", "hfield": "meshdir", "texture": "texturedir"}
+
+# 立方体贴图可分别引用六个面的文件
+_TEXTURE_FILE_ATTRS = ("file", "fileright", "fileleft", "fileup", "filedown", "filefront", "fileback")
+
+# 缓存目录名（位于场景文件所在目录下，遍历源文件时跳过）
+CACHE_DIR_NAME = ".cache"
+
+
+def _source_files(xml_path):
+    """列出场景实际引用的源文件：场景文件、递归 include 的 MJCF 以及网格/贴图等资源
+
+    只跟随文件中的引用，目录中的其他文件（如 mesh_lod.py 生成的低精度模型）不影响哈希。
+    include 与 compiler 的资源目录都相对场景文件所在目录解析（与 MuJoCo 一致）。
+    """
+    model_dir = xml_path.parent
+    xml_files = []
+    pending = [xml_path]
+    while pending:
+        path = pending.pop(0)
+        if path in xml_files:
+            continue
+        xml_files.append(path)
+        for include in ET.parse(path).getroot().iter("include"):
+            pending.append(model_dir / include.get("file"))
+
+    # include 展开后 compiler 设置对整个模型生效，先收集资源目录
+    roots = [ET.parse(path).getroot() for path in xml_files]
+    dirs = {}
+    for root in roots:
+        for compiler in root.iter("compiler"):
+            for attr in ("assetdir", "meshdir", "texturedir"):
+                if compiler.get(attr) is not None:
+                    dirs[attr] = compiler.get(attr)
+    asset_dir = dirs.get("assetdir", "")
+
+    files = list(xml_files)
+    for root in roots:
+        for tag, dir_attr in ASSET_DIR_ATTRS.items():
+            base = model_dir / dirs.get(dir_attr, asset_dir)
+            for element in root.iter(tag):
+                for attr in _TEXTURE_FILE_ATTRS if tag == "texture" else ("file",):
+                    name = element.get(attr)
+                    if name and (base / name) not in files:
+                        files.append(base / name)
+    return files
+
+
+def model_fingerprint(xml_path):
+    """计算场景文件、include 的 MJCF 以及引用的网格/贴图文件的内容哈希
+
+    MJB 格式与 MuJoCo 版本相关，版本号也计入哈希。
+    """
+    xml_path = Path(xml_path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(mujoco.__version__.encode())
+    digest.update(xml_path.name.encode())
+    for file_path in _source_files(xml_path):
+        digest.update(os.path.relpath(file_path, xml_path.parent).encode())
+        if not file_path.exists():
+            # 缺失的文件由 MuJoCo 编译时报错，这里只计入文件名
+            continue
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(xml_path):
+    """返回场景文件对应的 MJB 缓存路径"""
+    xml_path = Path(xml_path)
+    key = model_fingerprint(xml_path)
+    return xml_path.parent / CACHE_DIR_NAME / f"{xml_path.stem}-{key}.mjb"
+
+
+def load_model(xml_path, use_cache=True):
+    """加载 MuJoCo 模型，优先使用已编译的 MJB 缓存
+
+    源文件任一变化都会改变哈希，旧缓存随之失效并被删除。
+    """
+    if not use_cache:
+        return mujoco.MjModel.from_xml_path(str(xml_path))
+
+    mjb_path = cache_path(xml_path)
+    if mjb_path.exists():
+        try:
+            return mujoco.MjModel.from_binary_path(str(mjb_path))
+        except Exception as e:
+            print(f"警告: 模型缓存无法读取，重新编译: {e}")
+
+    model = mujoco.MjModel.from_xml_path(str(xml_path))
+    try:
+        mjb_path.parent.mkdir(parents=True, exist_ok=True)
+        # 清理同一场景的旧缓存
+        for stale in mjb_path.parent.glob(f"{Path(xml_path).stem}-*.mjb"):
+            stale.unlink()
+        # 先写临时文件再替换，避免并发启动时读到不完整的缓存
+        tmp_path = mjb_path.with_suffix(f".{os.getpid()}.tmp")
+        mujoco.mj_saveModel(model, str(tmp_path), None)
+        os.replace(tmp_path, mjb_path)
+    except OSError as e:
+        print(f"警告: 无法写入模型缓存: {e}")
+    return model
@@ -2,11 +2,116 @@ import mujoco.viewer
 import time
 import sys
 import json
+import argparse
+import numpy as np
+from pathlib import Path
+from sim_channel import SetpointChannel
+from model_cache import load_model
+from sim_profiler import PhaseProfiler
+from sim_recorder import SimLog, SimRecorder
 
+MODEL_PATH = 'model/universal_robots_ur5e/scene.xml'
+# 低精度网格场景（由 mesh_lod.py 生成），用于无可视化或远程运行
+LOD_MODEL_PATH = 'model/universal_robots_ur5e/scene_lod.xml'
 
-def run_simulation(ctrl_params):
-    model = mujoco.MjModel.from_xml_path('model/universal_robots_ur5e/scene.xml')
+
+def scene_path(lod=False):
+    """选择场景文件：lod 为 True 时使用低精度场景，未生成时退回原场景"""
+    if lod:
+        if Path(LOD_MODEL_PATH).exists():
+            return LOD_MODEL_PATH
+        print(f"警告: 低精度场景 {LOD_MODEL_PATH} 不存在（请先运行 mesh_lod.py），使用原场景")
+    return MODEL_PATH
+
+
+class StepScheduler:
+    """物理步进与渲染解耦的调度器
+
+    每一渲染帧内执行若干物理子步，使仿真时间按给定实时因子跟随墙钟时间，
+    viewer.sync() 的频率被限制在目标帧率以内。
+    realtime_factor <= 0 表示尽可能快地运行。
+    """
+
+    def __init__(self, timestep, realtime_factor=1.0, render_fps=60.0,
+                 max_substeps=1000, report_interval=1.0):
+        self.timestep = timestep
+        if render_fps <= 0:
+            # 没有帧率上限时实时模式的主循环永不休眠，空转占满 CPU
+            raise ValueError(f"渲染帧率必须为正数: {render_fps}")
+        self.realtime_factor = realtime_factor
+        self.frame_period = 1.0 / render_fps
+        self.max_substeps = max_substeps
+        self.report_interval = report_interval
+        self.steps_per_second = 0.0
+        self.achieved_factor = 0.0
+        self.lag = 0.0
+        self.reset(0.0)
+
+    @property
+    def as_fast_as_possible(self):
+        return self.realtime_factor <= 0
+
+    def reset(self, sim_time):
+        """以当前仿真时间为起点重新对齐墙钟"""
+        now = time.perf_counter()
+        self._wall_start = now
+        self._sim_start = sim_time
+        self._next_frame = now
+        self._report_wall = now
+        self._report_sim = sim_time
+        self._report_steps = 0
+
+    def target_time(self):
+        """当前墙钟对应的目标仿真时间"""
+        elapsed = time.perf_counter() - self._wall_start
+        return self._sim_start + self.realtime_factor * elapsed
+
+    def substeps(self, sim_time):
+        """本帧需要执行的物理子步数（实时模式）"""
+        behind = self.target_time() - sim_time
+        n = int(behind / self.timestep + 0.5)
+        return max(0, min(n, self.max_substeps))
+
+    def frame_deadline(self):
+        """本帧物理计算的截止时刻（尽快模式下用于切分渲染帧）"""
+        return self._next_frame + self.frame_period
+
+    def end_frame(self, sim_time, steps, sleep=time.sleep):
+        """结束一帧：统计速率，并休眠到下一帧开始（sleep 可替换为等待命令的函数）"""
+        self._report_steps += steps
+        now = time.perf_counter()
+        if not self.as_fast_as_possible:
+            self.lag = self.target_time() - sim_time
+            if self.lag > self.max_substeps * self.timestep:
+                # 物理计算跟不上时重新对齐，避免滞后无限累积
+                print(f"警告: 仿真滞后 {self.lag * 1000:.1f} ms，重新对齐实时时钟")
+                self.reset(sim_time)
+        if now - self._report_wall >= self.report_interval:
+            span = now - self._report_wall
+            self.steps_per_second = self._report_steps / span
+            self.achieved_factor = (sim_time - self._report_sim) / span
+            print(f"步进速率: {self.steps_per_second:.0f} 步/秒, "
+                  f"实时因子: {self.achieved_factor:.2f}, 滞后: {self.lag * 1000:.1f} ms")
+            self._report_wall = now
+            self._report_sim = sim_time
+            self._report_steps = 0
+
+        self._next_frame += self.frame_period
+        if self._next_frame < now:
+            # 渲染帧已落后，不再补帧
+            self._next_frame = now
+        elif not self.as_fast_as_possible:
+            sleep(self._next_frame - now)
+
+
+def run_simulation(ctrl_params, realtime_factor=1.0, render_fps=60.0, record_file=None,
+                   profile_file=None, profile_interval=1.0):
+    model = load_model(MODEL_PATH)
     data = mujoco.MjData(model)
+    # 录制每个物理步的状态，用于事后回放分析
+    recorder = SimRecorder(record_file, model) if record_file else None
+    # 分阶段计时，定期写入 profile_file
+    profiler = PhaseProfiler(dump_file=profile_file, dump_interval=profile_interval) if profile_file else None
 
     # 应用控制参数
     if len(ctrl_params) >= 6:
@@ -15,35 +120,272 @@ def run_simulation(ctrl_params):
         print(f"警告: 不足的控制参数数量，使用默认值")
         data.ctrl[:6] = [0, 0, 0, 0, 0, 0]
 
+    # 共享内存命令通道，替代每步读取 ctrl_params.json
+    channel = SetpointChannel()
+    last_seq = channel.seq
+
+    scheduler = StepScheduler(model.opt.timestep, realtime_factor, render_fps)
+
     with mujoco.viewer.launch_passive(model, data) as viewer:
         print("仿真已启动，控制参数:", data.ctrl[:6])
 
         try:
+            scheduler.reset(data.time)
             while viewer.is_running():
-                mujoco.mj_step(model, data)
+                frame_start = time.perf_counter()
+                # 检查命令通道中是否有新的控制参数
+                update = channel.poll(last_seq)
+                if update is not None:
+                    last_seq, new_params = update
+                    if len(new_params) >= 6:
+                        data.ctrl[:6] = new_params[:6]
+                        print("更新控制参数:", data.ctrl[:6])
+                read_done = time.perf_counter()
 
-                # 更新可视化
+                # 执行本帧的物理子步
+                steps = 0
+                if scheduler.as_fast_as_possible:
+                    deadline = scheduler.frame_deadline()
+                    while steps < scheduler.max_substeps:
+                        mujoco.mj_step(model, data)
+                        steps += 1
+                        if recorder is not None:
+                            recorder.record(data)
+                        if time.perf_counter() >= deadline:
+                            break
+                else:
+                    for _ in range(scheduler.substeps(data.time)):
+                        mujoco.mj_step(model, data)
+                        steps += 1
+                        if recorder is not None:
+                            recorder.record(data)
+                physics_done = time.perf_counter()
+
+                # 更新可视化（每帧一次）
                 viewer.sync()
+                sync_done = time.perf_counter()
 
-                # 检查是否有新的控制参数文件
-                try:
-                    with open("ctrl_params.json", "r") as f:
-                        new_params = json.load(f)
-                    if new_params and len(new_params) >= 6:
-                        data.ctrl[:6] = new_params[:6]
-                        print("更新控制参数:", data.ctrl[:6])
-                except FileNotFoundError:
-                    # 文件可能被暂时删除或移动
-                    pass
-                except json.JSONDecodeError:
-                    print("警告: 无法解析控制参数文件")
+                scheduler.end_frame(data.time, steps)
 
-                time.sleep(0.0001)  # 控制更新频率
+                if profiler is not None:
+                    frame_end = time.perf_counter()
+                    profiler.add("ctrl_read", read_done - frame_start)
+                    profiler.add("physics", physics_done - read_done)
+                    if steps:
+                        profiler.add("mj_step", (physics_done - read_done) / steps)
+                    profiler.add("sync", sync_done - physics_done)
+                    profiler.add("sleep", frame_end - sync_done)
+                    profiler.add("frame", frame_end - frame_start)
+                    profiler.tick()
         except Exception as e:
             print(f"仿真错误: {str(e)}")
+        finally:
+            channel.close()
+            if recorder is not None:
+                recorder.close()
+                print(f"已录制 {recorder.count} 步到 {record_file}")
+            if profiler is not None:
+                try:
+                    profiler.dump()
+                except OSError as e:
+                    print(f"警告: 无法写入性能统计文件: {e}")
+
+
+# 回放窗口的按键（GLFW 键码）
+_KEY_SPACE = 32
+_KEY_RIGHT = 262
+_KEY_LEFT = 263
+_KEY_DOWN = 264
+_KEY_UP = 265
+_KEY_HOME = 268
+
+
+def replay_log(log_file, speed=1.0, start=0.0, render_fps=60.0):
+    """在可视化窗口中回放录制文件，不重新仿真
+
+    按记录序号推进，speed 为回放倍速（负数为倒放）。窗口中的按键：
+    空格 暂停/继续，← → 后退/前进 1 秒，↑ ↓ 倍速加倍/减半，Home 回到开头。
+    """
+    model = load_model(MODEL_PATH)
+    data = mujoco.MjData(model)
+    log = SimLog(log_file)
+    log.check_model(model)
+    if len(log) == 0:
+        print(f"录制文件为空: {log_file}")
+        return
+
+    last = len(log) - 1
+    steps_per_second = 1.0 / log.timestep
+    state = {"position": float(log.index_at(log.time[0] + start)), "speed": speed, "paused": False}
+
+    def on_key(key):
+        # 在 viewer 线程中调用，只修改回放状态
+        if key == _KEY_SPACE:
+            state["paused"] = not state["paused"]
+        elif key == _KEY_RIGHT:
+            state["position"] = min(state["position"] + steps_per_second, last)
+        elif key == _KEY_LEFT:
+            state["position"] = max(state["position"] - steps_per_second, 0.0)
+        elif key == _KEY_UP:
+            state["speed"] *= 2.0
+        elif key == _KEY_DOWN:
+            state["speed"] /= 2.0
+        elif key == _KEY_HOME:
+            state["position"] = 0.0
+        else:
+            return
+        print(f"回放: t = {log.time[int(state['position'])]:.3f} s, 倍速 {state['speed']:g}"
+              f"{'（暂停）' if state['paused'] else ''}")
+
+    frame_period = 1.0 / render_fps if render_fps > 0 else 0.0
+    print(f"回放 {log_file}: {len(log)} 步, 时长 {log.duration:.2f} s")
+    with mujoco.viewer.launch_passive(model, data, key_callback=on_key) as viewer:
+        wall = time.perf_counter()
+        while viewer.is_running():
+            now = time.perf_counter()
+            if not state["paused"]:
+                position = state["position"] + state["speed"] * (now - wall) * steps_per_second
+                state["position"] = min(max(position, 0.0), last)
+            wall = now
+
+            # 只恢复状态并计算派生量，不做物理步进
+            with viewer.lock():
+                log.apply(data, int(state["position"]))
+                mujoco.mj_forward(model, data)
+            viewer.sync()
+
+            sleep = frame_period - (time.perf_counter() - now)
+            if sleep > 0:
+                time.sleep(sleep)
+
+
+def actuated_joint_indices(model):
+    """返回各执行器对应关节在 qpos / qvel 中的下标"""
+    joint_ids = model.actuator_trnid[:, 0]
+    return model.jnt_qposadr[joint_ids], model.jnt_dofadr[joint_ids]
+
+
+def replay_trajectory(model, data, trajectory, pos_tol=1e-2, vel_tol=1e-2, timeout=5.0):
+    """无界面回放轨迹点，返回每个点的稳定时间、最终误差和峰值驱动力
+
+    每个轨迹点作为位置设定值下发，关节误差和速度同时低于容差即视为到位，
+    随后立即切换到下一个点；超过 timeout（仿真秒）仍未到位时稳定时间记为 NaN。
+    """
+    trajectory = np.asarray(trajectory, dtype=float)
+    qpos_idx, dof_idx = actuated_joint_indices(model)
+    nu = len(qpos_idx)
+    max_steps = max(1, int(round(timeout / model.opt.timestep)))
+
+    n_points = len(trajectory)
+    settle_times = np.full(n_points, np.nan)
+    final_errors = np.zeros((n_points, nu))
+    peak_forces = np.zeros((n_points, nu))
+
+    for idx, point in enumerate(trajectory):
+        target = point[:nu]
+        data.ctrl[:nu] = target
+        start_time = data.time
+        peak = peak_forces[idx]
+        for _ in range(max_steps):
+            mujoco.mj_step(model, data)
+            np.maximum(peak, np.abs(data.actuator_force[:nu]), out=peak)
+            error = data.qpos[qpos_idx] - target
+            if (np.abs(error).max() < pos_tol
+                    and np.abs(data.qvel[dof_idx]).max() < vel_tol):
+                settle_times[idx] = data.time - start_time
+                break
+        final_errors[idx] = data.qpos[qpos_idx] - target
+
+    return {
+        "settle_times": settle_times,
+        "final_errors": final_errors,
+        "peak_forces": peak_forces,
+    }
+
+
+def run_headless(trajectory_files, output_file, pos_tol=1e-2, vel_tol=1e-2, timeout=5.0,
+                 model_path=MODEL_PATH):
+    """无可视化批量验证轨迹文件，并把结果写入 JSON 文件"""
+    model = load_model(model_path)
+    data = mujoco.MjData(model)
+
+    results = {}
+    for file_path in trajectory_files:
+        with open(file_path, "r") as f:
+            trajectory = json.load(f)
+
+        mujoco.mj_resetData(model, data)
+        wall_start = time.perf_counter()
+        result = replay_trajectory(model, data, trajectory, pos_tol, vel_tol, timeout)
+        wall_time = time.perf_counter() - wall_start
+
+        settle_times = result["settle_times"]
+        results[Path(file_path).name] = {
+            "points": len(settle_times),
+            "all_settled": bool(not np.isnan(settle_times).any()),
+            "sim_time": round(data.time, 6),
+            "speedup": round(data.time / wall_time, 1) if wall_time > 0 else None,
+            # 未到位的点用 null 表示
+            "settle_times": [None if np.isnan(t) else round(float(t), 4) for t in settle_times],
+            "final_errors": np.round(result["final_errors"], 6).tolist(),
+            "peak_forces": np.round(result["peak_forces"], 3).tolist(),
+        }
+        print(f"{file_path}: {len(settle_times)} 个点, 仿真 {data.time:.2f} s, 耗时 {wall_time:.3f} s")
+
+    with open(output_file, "w") as f:
+        json.dump(results, f, separators=(",", ":"))
+    print(f"结果已写入 {output_file}")
+    return results
+
+
+def positive_float(text):
+    """argparse 类型：正浮点数"""
+    value = float(text)
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"必须为正数: {text}")
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="UR5e MuJoCo 仿真")
+    parser.add_argument("--rtf", type=float, default=1.0,
+                        help="实时因子，1 为实时，10 为十倍速，0 为尽可能快")
+    parser.add_argument("--fps", type=positive_float, default=60.0,
+                        help="可视化刷新帧率上限")
+    parser.add_argument("--headless", action="store_true",
+                        help="无可视化模式，以最快速度回放轨迹并输出结果文件")
+    parser.add_argument("--trajectory", nargs="+", default=["closedLoopParams.json"],
+                        help="无可视化模式下回放的轨迹文件（JSON 二维数组）")
+    parser.add_argument("--output", default="headless_result.json",
+                        help="无可视化模式的结果文件")
+    parser.add_argument("--pos-tol", type=float, default=1e-2, help="到位判定的关节误差容差 (rad)")
+    parser.add_argument("--vel-tol", type=float, default=1e-2, help="到位判定的关节速度容差 (rad/s)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="单个轨迹点的最长仿真时间 (s)")
+    parser.add_argument("--lod", action="store_true",
+                        help="无可视化模式使用低精度网格场景（可视化仍使用原始网格）")
+    parser.add_argument("--record", metavar="FILE",
+                        help="把每个物理步的 time/qpos/qvel/ctrl/actuator_force 录制到文件（如 run.simlog）")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="分阶段计时（读取控制参数/物理步进/画面同步/休眠），定期把 p50/p95/p99 写入 JSON 文件")
+    parser.add_argument("--profile-interval", type=float, default=1.0, help="性能统计文件的写入间隔 (s)")
+    parser.add_argument("--replay", metavar="FILE", help="回放录制文件（不重新仿真）")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，负数为倒放")
+    parser.add_argument("--start", type=float, default=0.0, help="回放起始时间 (s，相对录制开头)")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
+    args = parse_args()
+
+    if args.headless:
+        run_headless(args.trajectory, args.output, args.pos_tol, args.vel_tol, args.timeout,
+                     scene_path(args.lod))
+        sys.exit(0)
+
+    if args.replay:
+        replay_log(args.replay, args.speed, args.start, args.fps)
+        sys.exit(0)
+
     # 尝试从JSON文件加载参数
     try:
         with open("ctrl_params.json", "r") as f:
@@ -56,4 +398,4 @@ if __name__ == "__main__":
         ctrl_params = [0, -1, -1, 0, 0, 0]
         print("使用默认控制参数")
 
-    run_simulation(ctrl_params)
\ No newline at end of file
+    run_simulation(ctrl_params, args.rtf, args.fps, args.record, args.profile, args.profile_interval)
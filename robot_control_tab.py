@@ -1,14 +1,85 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, 
                              QLineEdit, QGridLayout, QGroupBox, QListWidget, QFileDialog, 
-                             QCheckBox)
+                             QCheckBox, QComboBox)
 import pyads
 from PyQt6.QtCore import QTimer
+import os
+import time
+import numpy as np
+from ads_notify import StatusSubscriber
+from ads_worker import AdsWorker, PRIORITY_STOP, PRIORITY_COMMAND, PRIORITY_TELEMETRY
+from traj_stream import TrajectoryStreamer
+from traj_io import TRAJ_SUFFIX, load_trajectory, open_trajectory
+from telemetry_history import TelemetryHistory
+from telemetry_plot import TelemetryPlot
+
+# 状态显示的 PLC 数组: (数组变量名, 元素类型, 对应的显示标签列表属性名)
+STATUS_FIELDS = (
+    ("MAIN.Position", pyads.PLCTYPE_DINT, "position_labels"),
+    ("MAIN.Velocity", pyads.PLCTYPE_REAL, "velocity_labels"),
+    ("MAIN.Torque", pyads.PLCTYPE_REAL, "torque_labels"),
+    ("MAIN.State", pyads.PLCTYPE_DINT, "state_labels"),
+    ("MAIN.ProfileState", pyads.PLCTYPE_DINT, "profile_labels"),
+)
+
+# 状态刷新周期 (ms)，求和读取每次只有一次网络往返
+STATUS_POLL_MS = 100
+
+# 推送模式下界面取出通知样本的周期 (ms)
+STATUS_DRAIN_MS = 50
+
+# 状态曲线的中文名称（与 STATUS_FIELDS 顺序一致）
+STATUS_FIELD_TITLES = ("位置", "速度", "扭矩", "状态", "轮廓")
+
+# 状态历史保留的样本数（1 kHz 约 17 分钟），每个样本 5 个数组 x 7 个电机的 float32，约 150 MB
+TELEMETRY_HISTORY_SIZE = 1 << 20
+
+# 状态曲线可选的显示跨度 (s)，None 表示全部历史
+PLOT_SPANS = (("1 秒", 1.0), ("10 秒", 10.0), ("1 分钟", 60.0), ("10 分钟", 600.0), ("全部", None))
+
+# 状态曲线刷新周期 (ms)
+PLOT_REFRESH_MS = 100
+
+# 单个写入的电机命令数组（按电机号 1..7 访问），连接时预先解析全部变量句柄；
+# 移动目标和 StartMove 走求和写入，使用 pyads 缓存的符号信息
+COMMAND_FIELDS = ("EnableDrive", "DisableDrive", "ClearDriveFault", "JogDrive", "StopDrive")
+
+# 轨迹流式传输的流控周期 (ms)：每次读取 PLC 读指针，有半个缓冲区空闲时补写
+TRAJ_PUMP_MS = 20
+
+# 走停止优先级的命令，排在队列中所有普通命令和状态读取之前
+STOP_COMMANDS = ("StopDrive", "DisableDrive")
 
 class RobotControlTab(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
         self.motor_count = 7
+        self.status_var_names = self._status_var_names()
+        # 推送模式：设备通知订阅及收到的历史样本 (数组变量名, 时间戳, 值列表)
+        self.status_subscriber = None
+        # 状态历史：每行依次为 STATUS_FIELDS 各数组的全部电机值；推送模式下各数组分别到达，
+        # 其余数组沿用最新值
+        self.status_history = TelemetryHistory(TELEMETRY_HISTORY_SIZE, len(STATUS_FIELDS) * self.motor_count)
+        self.status_row = np.zeros(self.status_history.channels, dtype=np.float32)
+        # 历史中时间戳的来源："host"（轮询，本机单调时钟）或 "plc"（设备通知时间戳），切换时清空历史
+        self.status_timebase = None
+        self.status_field_index = {name: i for i, (name, _, _) in enumerate(STATUS_FIELDS)}
+        self._plotted_head = 0
+        self.connected = False
+        # 已加载的轨迹 (点数, 电机数) 及其流式传输状态
+        self.trajectory = None
+        # 二进制轨迹文件（流式写入时逐块校验），其他格式为 None
+        self.traj_source = None
+        self.traj_streamer = None
+        self.traj_prepared = False
+
+        # ADS 通信工作线程：界面线程只提交任务，结果按任务序号回调
+        self.ads_callbacks = {}
+        self.ads_worker = AdsWorker(self)
+        self.ads_worker.job_finished.connect(self.on_ads_job_finished)
+        self.ads_worker.start()
+
         self.initUI()
         self.set_button_enable_func(False)
 
@@ -16,6 +87,19 @@ class RobotControlTab(QWidget):
         self.status_timer = QTimer(self)
         self.status_timer.timeout.connect(self.update_robot_status)
 
+        # 推送模式下取出通知样本的定时器
+        self.notify_timer = QTimer(self)
+        self.notify_timer.timeout.connect(self.drain_status_notifications)
+
+        # 有新样本时重绘状态曲线
+        self.plot_timer = QTimer(self)
+        self.plot_timer.timeout.connect(self.refresh_status_plot)
+        self.plot_timer.start(PLOT_REFRESH_MS)
+
+        # 轨迹执行时的流控定时器
+        self.traj_timer = QTimer(self)
+        self.traj_timer.timeout.connect(self.pump_trajectory)
+
     def initUI(self):
         """初始化机械臂控制选项卡"""
         layout = QHBoxLayout(self)
@@ -47,6 +131,18 @@ class RobotControlTab(QWidget):
         connection_layout.addWidget(self.port_edit, 1, 1)
         connection_layout.addWidget(self.connect_button, 2, 0, 1, 2)
         connection_layout.addWidget(self.stop_connect_button, 3, 0, 1, 2)
+
+        # 状态获取方式：默认定时轮询，可选 ADS 设备通知推送
+        self.notify_checkbox = QCheckBox("推送模式（设备通知）")
+        self.notify_mode_combo = QComboBox()
+        self.notify_mode_combo.addItem("变化时", "change")
+        self.notify_mode_combo.addItem("周期", "cycle")
+        self.notify_cycle_edit = QLineEdit("10")
+        connection_layout.addWidget(self.notify_checkbox, 4, 0, 1, 2)
+        connection_layout.addWidget(QLabel("通知方式:"), 5, 0)
+        connection_layout.addWidget(self.notify_mode_combo, 5, 1)
+        connection_layout.addWidget(QLabel("周期 (ms):"), 6, 0)
+        connection_layout.addWidget(self.notify_cycle_edit, 6, 1)
         
         connection_group.setLayout(connection_layout)
         layout0.addWidget(connection_group)
@@ -98,6 +194,29 @@ class RobotControlTab(QWidget):
         
         status_group.setLayout(status_layout)
         layout1.addWidget(status_group)
+
+        # 状态曲线
+        plot_group = QGroupBox("状态曲线")
+        plot_layout = QGridLayout()
+        self.plot_field_combo = QComboBox()
+        for title in STATUS_FIELD_TITLES:
+            self.plot_field_combo.addItem(title)
+        self.plot_field_combo.currentIndexChanged.connect(self.select_plot_field)
+        self.plot_span_combo = QComboBox()
+        for title, seconds in PLOT_SPANS:
+            self.plot_span_combo.addItem(title, seconds)
+        self.plot_span_combo.currentIndexChanged.connect(
+            lambda _: self.status_plot.set_span(self.plot_span_combo.currentData()))
+        self.status_plot = TelemetryPlot(self.status_history)
+        plot_layout.addWidget(QLabel("数据:"), 0, 0)
+        plot_layout.addWidget(self.plot_field_combo, 0, 1)
+        plot_layout.addWidget(QLabel("跨度:"), 0, 2)
+        plot_layout.addWidget(self.plot_span_combo, 0, 3)
+        plot_layout.addWidget(self.status_plot, 1, 0, 1, 4)
+        plot_group.setLayout(plot_layout)
+        layout1.addWidget(plot_group)
+        self.plot_span_combo.setCurrentIndex(1)
+        self.select_plot_field(0)
         
         # 控制按钮部分
         control_group = QGroupBox("电机控制")
@@ -185,6 +304,11 @@ class RobotControlTab(QWidget):
             self.confirm_buttons.append(confirm_btn)
             control_layout.addWidget(confirm_btn, row, 6)
         
+        # 全部电机同时移动：目标一次求和写入，再同步启动
+        self.group_move_button = QPushButton("全部确认（同步启动）")
+        self.group_move_button.clicked.connect(self.confirm_group_move)
+        control_layout.addWidget(self.group_move_button, self.motor_count * 2, 0, 1, 7)
+
         control_group.setLayout(control_layout)
         layout0.addWidget(control_group)
         
@@ -214,6 +338,9 @@ class RobotControlTab(QWidget):
         trajectory_layout.addWidget(transfer_button, 1, 1)
         trajectory_layout.addWidget(self.start_exec_button, 1, 2)
         trajectory_layout.addWidget(self.abort_button, 1, 3)
+
+        self.traj_progress_label = QLabel("未加载轨迹")
+        trajectory_layout.addWidget(self.traj_progress_label, 2, 0, 1, 4)
         
         trajectory_group.setLayout(trajectory_layout)
         layout0.addWidget(trajectory_group)
@@ -254,151 +381,328 @@ class RobotControlTab(QWidget):
             self.output_list.scrollToBottom()
             return
             
-        try:
-            self.plc = pyads.Connection(net_id, port)
-            self.plc.open()
-            self.connected = True
-        except pyads.ADSError as e:
-            self.output_list.addItem(f"连接失败: {e}")
+        self.connect_button.setEnabled(False)
+        self.run_ads(PRIORITY_COMMAND, self._connect, net_id, port,
+                     on_done=lambda ok, error, failed: self.on_connected(ok, error, failed, net_id, port))
+
+    def _connect(self, net_id, port):
+        # 在 ADS 工作线程中执行：打开连接并预先解析命令变量句柄
+        self.ads_worker.open_connection(net_id, port)
+        names = [f"MAIN.{command}[{motor}]" for command in COMMAND_FIELDS
+                 for motor in range(1, self.motor_count + 1)]
+        return self.ads_worker.handles.prefetch(names)
+
+    def on_connected(self, ok, error, failed, net_id, port):
+        self.connect_button.setEnabled(True)
+        if not ok:
+            self.output_list.addItem(f"连接失败: {error}")
             self.output_list.scrollToBottom()
             return
-        
+
+        self.connected = True
         self.set_button_enable_func(True)
 
-        self.status_timer.start(200)  # 每200ms更新一次状态
+        if self.notify_checkbox.isChecked():
+            self.start_status_notifications()
+        else:
+            self.status_timer.start(STATUS_POLL_MS)
 
         self.output_list.addItem(f"已连接到 {net_id}:{port} (0x{port:x})")
+        if failed:
+            self.output_list.addItem(f"{len(failed)} 个命令变量句柄解析失败，如 {failed[0]}")
         self.output_list.scrollToBottom()
 
     def stop_connect_to_robot(self):
-        self.plc.close()
+        self.status_timer.stop()
+        self.notify_timer.stop()
+        self.traj_timer.stop()
+        self.traj_streamer = None
+        self.traj_prepared = False
+        subscriber, self.status_subscriber = self.status_subscriber, None
         self.connected = False
         self.set_button_enable_func(False)
-        
-    def _read_plc_data(self, var_name_template, plc_type):
-        """统一读取PLC数据的模板函数"""
-        if not hasattr(self, 'plc') or not self.plc:
-            return [-1.0] * self.motor_count
+        # 排在已提交的命令之后执行，先删除设备通知，再释放变量句柄并关闭连接
+        self.run_ads(PRIORITY_COMMAND, self._disconnect, subscriber)
 
-        try:
-            values = []
+    def _disconnect(self, subscriber):
+        # 在 ADS 工作线程中执行
+        if subscriber is not None:
+            subscriber.stop()
+        self.ads_worker.close_connection()
+
+    def shutdown(self):
+        """窗口关闭时调用：断开连接并结束 ADS 工作线程"""
+        if self.connected:
+            self.stop_connect_to_robot()
+        self.ads_worker.stop()
+
+    def run_ads(self, priority, fn, *args, on_done=None, coalesce=None):
+        """在 ADS 工作线程中执行 fn(*args)，完成后在界面线程调用 on_done(ok, error, result)
+
+        同一 coalesce 键的任务已在排队时不再提交，返回 False。
+        """
+        job_id = self.ads_worker.submit(priority, fn, *args, coalesce=coalesce)
+        if job_id is None:
+            return False
+        if on_done is not None:
+            self.ads_callbacks[job_id] = on_done
+        return True
+
+    def on_ads_job_finished(self, job_id, ok, error, result):
+        on_done = self.ads_callbacks.pop(job_id, None)
+        if on_done is not None:
+            on_done(ok, error, result)
+
+    def _status_var_names(self):
+        """状态显示用到的全部 PLC 变量名（按 STATUS_FIELDS 和电机顺序排列）"""
+        return [f"{name}[{i}]" for name, _, _ in STATUS_FIELDS for i in range(self.motor_count)]
+
+    def _read_status_batch(self):
+        """一次 ADS 求和读取（read_list_by_name）取得全部状态变量
+
+        在 ADS 工作线程中执行。返回 {数组变量名: 各电机的值列表}，读取失败的变量值为 -1。
+        符号信息在首次读取时缓存，之后每次只有一次网络往返。
+        """
+        values = self.ads_worker.require_plc().read_list_by_name(self.status_var_names)
+
+        result = {}
+        for name, _, _ in STATUS_FIELDS:
+            field = []
             for i in range(self.motor_count):
-                var_name = var_name_template.format(i)
-                value = self.plc.read_by_name(var_name, plc_type)
-                values.append(value)
-            return values
-        except pyads.ADSError as e:
-            self.output_list.addItem(f"读取{var_name_template}出错: {e}")
-            self.output_list.scrollToBottom()
-            return [-1.0] * self.motor_count
-        
+                value = values.get(f"{name}[{i}]")
+                # 单个变量出错时求和读取返回错误描述字符串
+                field.append(-1.0 if value is None or isinstance(value, str) else value)
+            result[name] = field
+        return result
+
+    def _show_status(self, status):
+        """把 {数组变量名: 值列表} 显示到对应的标签"""
+        for name, _, labels_name in STATUS_FIELDS:
+            if name not in status:
+                continue
+            labels = getattr(self, labels_name)
+            for i, value in enumerate(status[name]):
+                labels[i].setText(str(value))
+
     def update_robot_status(self):
-        """更新机械臂状态显示"""
-        # 获取并显示位置
-        positions = self._read_plc_data('MAIN.Position[{}]', pyads.PLCTYPE_DINT)
-        for i, pos in enumerate(positions):
-            self.position_labels[i].setText(str(pos))
-        
-        # 获取并显示速度
-        velocities = self._read_plc_data('MAIN.Velocity[{}]', pyads.PLCTYPE_REAL)
-        for i, vel in enumerate(velocities):
-            self.velocity_labels[i].setText(str(vel))
-        
-        # 获取并显示扭矩
-        torques = self._read_plc_data('MAIN.Torque[{}]', pyads.PLCTYPE_REAL)
-        for i, tq in enumerate(torques):
-            self.torque_labels[i].setText(str(tq))
-        
-        # 获取并显示状态
-        states = self._read_plc_data('MAIN.State[{}]', pyads.PLCTYPE_DINT)
-        for i, state in enumerate(states):
-            self.state_labels[i].setText(str(state))
-        
-        # 获取并显示轮廓状态
-        profile_states = self._read_plc_data('MAIN.ProfileState[{}]', pyads.PLCTYPE_DINT)
-        for i, profile in enumerate(profile_states):
-            self.profile_labels[i].setText(str(profile))
+        """更新机械臂状态显示（位置、速度、扭矩、状态、轮廓状态）
 
-    def _execute_command(self, motor_number, command_name, value=1):
-        if not hasattr(self, 'plc') or not self.plc:
-            self.output_list.addItem("未连接到PLC")
+        上一次读取还在排队时跳过本次，PLC 响应慢时读取任务不会堆积。
+        """
+        self.run_ads(PRIORITY_TELEMETRY, self._read_status_batch, on_done=self.on_status_read, coalesce="status")
+
+    def on_status_read(self, ok, error, status):
+        if not self.connected:
+            return
+        if not ok:
+            self.output_list.addItem(f"读取状态出错: {error}")
             self.output_list.scrollToBottom()
-            return False
-            
+            status = {name: [-1.0] * self.motor_count for name, _, _ in STATUS_FIELDS}
+        else:
+            for name, value in status.items():
+                self._set_status_row(name, value)
+            self._append_status_history([time.monotonic()], self.status_row, "host")
+        self._show_status(status)
+
+    def _append_status_history(self, times, rows, timebase):
+        if timebase != self.status_timebase:
+            # 两种时钟的时间戳不可比较，不能混在同一段历史中
+            self.status_history.clear()
+            self.status_timebase = timebase
+        self.status_history.append(times, rows)
+
+    def _set_status_row(self, name, value):
+        start = self.status_field_index[name] * self.motor_count
+        self.status_row[start:start + self.motor_count] = value
+
+    def start_status_notifications(self):
+        """订阅状态数组的设备通知，失败时退回轮询"""
         try:
-            # 构建变量名：MAIN.CommandName[MotorNumber]
-            var_name = f"MAIN.{command_name}[{motor_number}]"
-            # 写入命令值（通常1表示执行）
-            self.plc.write_by_name(var_name, value, pyads.PLCTYPE_INT)
-            return True
-        except pyads.ADSError as e:
-            self.output_list.addItem(f"执行{command_name}命令出错: {e}")
+            cycle_ms = float(self.notify_cycle_edit.text())
+            if cycle_ms <= 0:
+                raise ValueError
+        except ValueError:
+            self.output_list.addItem("通知周期必须为正数，改用轮询")
+            self.output_list.scrollToBottom()
+            self.status_timer.start(STATUS_POLL_MS)
+            return
+
+        mode_text = self.notify_mode_combo.currentText()
+        self.run_ads(PRIORITY_COMMAND, self._subscribe, self.notify_mode_combo.currentData(), cycle_ms,
+                     on_done=lambda ok, error, subscriber: self.on_subscribed(ok, error, subscriber,
+                                                                              mode_text, cycle_ms))
+
+    def _subscribe(self, mode, cycle_ms):
+        # 在 ADS 工作线程中执行
+        subscriber = StatusSubscriber(self.ads_worker.require_plc(),
+                                      [(name, plc_type) for name, plc_type, _ in STATUS_FIELDS],
+                                      self.motor_count, mode, cycle_ms)
+        subscriber.start()
+        return subscriber
+
+    def on_subscribed(self, ok, error, subscriber, mode_text, cycle_ms):
+        if not self.connected:
+            # 订阅完成前已断开，撤销这次订阅
+            if ok:
+                self.run_ads(PRIORITY_COMMAND, subscriber.stop)
+            return
+        if not ok:
+            self.output_list.addItem(f"订阅设备通知失败，改用轮询: {error}")
+            self.output_list.scrollToBottom()
+            self.status_timer.start(STATUS_POLL_MS)
+            return
+
+        self.status_subscriber = subscriber
+        self.notify_timer.start(STATUS_DRAIN_MS)
+        self.output_list.addItem(f"已订阅状态设备通知（{mode_text}，{cycle_ms:g} ms）")
+        self.output_list.scrollToBottom()
+
+    def drain_status_notifications(self):
+        """取出通知缓冲区中的样本：全部保存到历史，标签显示每个数组的最新值"""
+        if self.status_subscriber is None:
+            return
+        samples = self.status_subscriber.drain()
+        if not samples:
+            return
+        # 同一 PLC 周期内各数组的通知时间戳相同，合并为一行；本周期没有通知的数组沿用最新值
+        times = []
+        rows = []
+        for name, timestamp, value in sorted(samples, key=lambda sample: sample[1]):
+            self._set_status_row(name, value)
+            t = timestamp.timestamp()
+            if times and times[-1] == t:
+                rows[-1] = self.status_row.copy()
+            else:
+                times.append(t)
+                rows.append(self.status_row.copy())
+        self._append_status_history(times, rows, "plc")
+        latest = {name: value for name, _, value in samples}
+        self._show_status(latest)
+
+    def select_plot_field(self, index):
+        """状态曲线显示第 index 个数组的全部电机"""
+        start = index * self.motor_count
+        self.status_plot.set_channels(slice(start, start + self.motor_count),
+                                      [f"电机 {i + 1}" for i in range(self.motor_count)])
+
+    def refresh_status_plot(self):
+        if self.status_history.head != self._plotted_head and self.status_plot.isVisible():
+            self._plotted_head = self.status_history.head
+            self.status_plot.update()
+
+    def _execute_command(self, motor_number, command_name, value=1, success=None, failure=None):
+        """提交命令写入任务（MAIN.CommandName[MotorNumber]），完成后输出 success 或 failure 消息
+
+        StopDrive、DisableDrive 走停止优先级，排在所有排队的命令和状态读取之前。
+        """
+        if not self.connected:
+            self.output_list.addItem("未连接到PLC")
             self.output_list.scrollToBottom()
             return False
-        
+
+        # 构建变量名：MAIN.CommandName[MotorNumber]
+        var_name = f"MAIN.{command_name}[{motor_number}]"
+        priority = PRIORITY_STOP if command_name in STOP_COMMANDS else PRIORITY_COMMAND
+
+        def on_done(ok, error, _):
+            if not ok:
+                self.output_list.addItem(f"执行{command_name}命令出错: {error}")
+            message = success if ok else failure
+            if message:
+                self.output_list.addItem(message)
+            self.output_list.scrollToBottom()
+
+        # 写入命令值（通常1表示执行）
+        self.run_ads(priority, self._write_command, var_name, value, on_done=on_done)
+        return True
+
+    def _write_command(self, var_name, value):
+        # 在 ADS 工作线程中执行
+        self.ads_worker.write(var_name, value, pyads.PLCTYPE_INT)
+
     def enable_motor(self, motor_number):
-        if self._execute_command(motor_number, "EnableDrive"):
-            self.output_list.addItem(f"电机 {motor_number} 已使能")           
-        else:
-            self.output_list.addItem(f"电机 {motor_number} 使能失败")
-        self.output_list.scrollToBottom()
+        self._execute_command(motor_number, "EnableDrive",
+                              success=f"电机 {motor_number} 已使能", failure=f"电机 {motor_number} 使能失败")
 
     def disable_motor(self, motor_number):
-        if self._execute_command(motor_number, "DisableDrive"):
-            self.output_list.addItem(f"电机 {motor_number} 已禁止")
-        else:
-            self.output_list.addItem(f"电机 {motor_number} 禁止失败")
-        self.output_list.scrollToBottom()
+        self._execute_command(motor_number, "DisableDrive",
+                              success=f"电机 {motor_number} 已禁止", failure=f"电机 {motor_number} 禁止失败")
 
     def clear_motor_fault(self, motor_number):
-        if self._execute_command(motor_number, "ClearDriveFault"):
-            self.output_list.addItem(f"电机 {motor_number} 故障已清除")
-        else:
-            self.output_list.addItem(f"电机 {motor_number} 故障清除失败")
-        self.output_list.scrollToBottom()
+        self._execute_command(motor_number, "ClearDriveFault",
+                              success=f"电机 {motor_number} 故障已清除", failure=f"电机 {motor_number} 故障清除失败")
 
     def jog_motor(self, motor_number, is_positive):
-        if self._execute_command(motor_number, "JogDrive", 1 if is_positive else 2):
-            direction = "正转" if is_positive else "反转"
-            self.output_list.addItem(f"电机 {motor_number} {direction}点动中...")
-        else:
-            self.output_list.addItem(f"电机 {motor_number} 点动启动失败")
-        self.output_list.scrollToBottom()
+        direction = "正转" if is_positive else "反转"
+        self._execute_command(motor_number, "JogDrive", 1 if is_positive else 2,
+                              success=f"电机 {motor_number} {direction}点动中...",
+                              failure=f"电机 {motor_number} 点动启动失败")
 
     def stop_motor(self, motor_number):
-        if self._execute_command(motor_number, "StopDrive"):
-            self.output_list.addItem(f"电机 {motor_number} 已停止")
-        else:
-            self.output_list.addItem(f"电机 {motor_number} 停止失败")
-        self.output_list.scrollToBottom()
+        self._execute_command(motor_number, "StopDrive",
+                              success=f"电机 {motor_number} 已停止", failure=f"电机 {motor_number} 停止失败")
+
+    def _motor_target(self, motor_number):
+        """读取输入框中的 (目标位置, 速度, 加速度)，不是数字时抛出 ValueError"""
+        idx = motor_number - 1
+        return (float(self.target_pos_edits[idx].text()),
+                float(self.target_vel_edits[idx].text()),
+                float(self.target_acc_edits[idx].text()))
 
     def confirm_motor_move(self, motor_number):
         try:
-            idx = motor_number - 1
-            pos = float(self.target_pos_edits[idx].text())
-            vel = float(self.target_vel_edits[idx].text())
-            acc = float(self.target_acc_edits[idx].text())
-            
-            # 写入目标位置
-            if self._execute_command(motor_number, "SetTargetPosition", int(pos)):
-                # 写入目标速度
-                self.plc.write_by_name(f"MAIN.TargetVelocity[{motor_number}]", vel, pyads.PLCTYPE_REAL)
-                # 写入目标加速度
-                self.plc.write_by_name(f"MAIN.TargetAcceleration[{motor_number}]", acc, pyads.PLCTYPE_REAL)
-                # 启动移动
-                if self._execute_command(motor_number, "StartMove"):
-                    self.output_list.addItem(f"电机 {motor_number} 移动到位置 {pos}°, 速度 {vel}°/s, 加速度 {acc}°/s²")
-                    self.output_list.scrollToBottom()
+            target = self._motor_target(motor_number)
+        except ValueError:
+            self.output_list.addItem("请输入有效的数字")
+            self.output_list.scrollToBottom()
+            return
+        self.move_motors({motor_number: target})
+
+    def confirm_group_move(self):
+        """全部电机按各自的目标同时移动"""
+        try:
+            targets = {motor: self._motor_target(motor) for motor in range(1, self.motor_count + 1)}
         except ValueError:
             self.output_list.addItem("请输入有效的数字")
             self.output_list.scrollToBottom()
-        except pyads.ADSError as e:
-            self.output_list.addItem(f"移动命令失败: {e}")
+            return
+        self.move_motors(targets)
+
+    def move_motors(self, targets):
+        """多轴移动 {电机号: (目标位置, 速度, 加速度)}
+
+        全部目标一次求和写入，成功后所有 StartMove 再一次求和写入，各轴在同一个 PLC 周期
+        收到启动信号；无论几个轴都只有两次网络往返。
+        """
+        if not self.connected:
+            self.output_list.addItem("未连接到PLC")
+            self.output_list.scrollToBottom()
+            return
+
+        def on_done(ok, error, _):
+            if ok:
+                for motor, (pos, vel, acc) in targets.items():
+                    self.output_list.addItem(f"电机 {motor} 移动到位置 {pos}°, 速度 {vel}°/s, 加速度 {acc}°/s²")
+            else:
+                self.output_list.addItem(f"移动命令失败: {error}")
             self.output_list.scrollToBottom()
 
+        self.run_ads(PRIORITY_COMMAND, self._move_motors, targets, on_done=on_done)
+
+    def _move_motors(self, targets):
+        # 在 ADS 工作线程中执行
+        values = {}
+        for motor, (pos, vel, acc) in targets.items():
+            values[f"MAIN.SetTargetPosition[{motor}]"] = int(pos)
+            values[f"MAIN.TargetVelocity[{motor}]"] = vel
+            values[f"MAIN.TargetAcceleration[{motor}]"] = acc
+        # 目标写入失败时不启动任何轴
+        self.ads_worker.write_list(values)
+        self.ads_worker.write_list({f"MAIN.StartMove[{motor}]": 1 for motor in targets})
+
     def browse_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "选择轨迹文件", "", "所有文件 (*.*);;文本文件 (*.txt)"
+            self, "选择轨迹文件", "", f"所有文件 (*.*);;文本文件 (*.txt);;二进制轨迹 (*{TRAJ_SUFFIX})"
         )
         if file_path:
             self.file_path_edit.setText(file_path)
@@ -411,64 +715,136 @@ class RobotControlTab(QWidget):
             return
         
         try:
-            with open(file_path, 'r') as f:
-                lines = f.readlines()
-            
-            # 解析轨迹数据
-            trajectory = []
-            for line in lines:
-                values = line.strip().split(',')
-                if len(values) >= self.motor_count:
-                    trajectory.append([
-                        float(values[0]), 
-                        float(values[1]), 
-                        float(values[2]), 
-                        float(values[3]),
-                        float(values[4]),
-                        float(values[5]),
-                        float(values[6])
-                    ])
-            
-            if not trajectory:
-                self.output_list.addItem("轨迹文件为空")
-                self.output_list.scrollToBottom()
-                return
-            
-            # 传输轨迹到所有电机
-            for i in range(self.motor_count):
-                motor_trajectory = [point[i] for point in trajectory]
-                # 在实际应用中，这里需要实现轨迹传输逻辑
-                # 这里仅做演示
-                self.output_list.addItem(f"电机 {i+1} 轨迹传输完成 ({len(motor_trajectory)}点)")
-            
-            # 显示起始点
-            start_point = trajectory[0]
-            self.output_list.addItem(f"轨迹文件: {file_path}")
-            self.output_list.addItem(f"起始点: {start_point[0]}, {start_point[1]}, {start_point[2]}, {start_point[3]}")
-            self.output_list.scrollToBottom()
-            
-            # 更新目标位置显示
-            for i in range(self.motor_count):
-                self.target_pos_edits[i].setText(str(start_point[i]))
-                
+            # CSV 按块向量化解析，二进制轨迹直接内存映射，均为 (点数, 电机数) 数组
+            if os.path.splitext(file_path)[1].lower() == TRAJ_SUFFIX:
+                source = open_trajectory(file_path, self.motor_count)
+                trajectory = source.points
+            else:
+                source = None
+                trajectory = load_trajectory(file_path, self.motor_count)
         except Exception as e:
             self.output_list.addItem(f"传输轨迹失败: {str(e)}")
             self.output_list.scrollToBottom()
+            return
+        if not len(trajectory):
+            self.output_list.addItem("轨迹文件为空")
+            self.output_list.scrollToBottom()
+            return
 
-    def start_execution(self):
-        """开始执行轨迹"""
-        is_loop = self.loop_checkbox.isChecked()
-        # 在实际应用中，这里需要实现轨迹执行逻辑
-        # 这里仅做演示
-        self.output_list.addItem(f"轨迹执行{'（循环）' if is_loop else ''}已开始")
+        self.trajectory = trajectory
+        self.traj_source = source
+        self.traj_timer.stop()
+        self.traj_streamer = None
+        self.traj_prepared = False
+        self.traj_progress_label.setText(f"已加载 {len(self.trajectory)} 点")
+
+        # 显示起始点
+        start_point = self.trajectory[0]
+        self.output_list.addItem(f"轨迹文件: {file_path} ({len(self.trajectory)}点)")
+        self.output_list.addItem(f"起始点: {start_point[0]}, {start_point[1]}, {start_point[2]}, {start_point[3]}")
         self.output_list.scrollToBottom()
 
+        # 更新目标位置显示
+        for i in range(self.motor_count):
+            self.target_pos_edits[i].setText(str(start_point[i]))
+
+        # 已连接时预先写满 PLC 缓冲区，开始执行时无需等待
+        if self.connected:
+            self._submit_stream(start=False)
+        else:
+            self.output_list.addItem("未连接到PLC，开始执行时再传输轨迹")
+            self.output_list.scrollToBottom()
+
+    def _submit_stream(self, start):
+        """提交轨迹任务：需要时新建流并预写缓冲区，start 为 True 时随后启动执行"""
+        loop = self.loop_checkbox.isChecked()
+        streamer = self.traj_streamer
+        prepare = not self.traj_prepared or streamer is None or streamer.loop != loop
+        if prepare:
+            streamer = self.traj_streamer = TrajectoryStreamer(self.ads_worker, self.trajectory, loop,
+                                                                     self.traj_source)
+
+        def on_done(ok, error, _):
+            if streamer is not self.traj_streamer:
+                return
+            if not ok:
+                self.traj_prepared = False
+                self.output_list.addItem(f"传输轨迹失败: {error}")
+                self.output_list.scrollToBottom()
+                return
+            self.traj_prepared = not start
+            self._show_traj_progress(streamer.sent, streamer.executed)
+            if start:
+                self.traj_timer.start(TRAJ_PUMP_MS)
+                self.output_list.addItem(f"轨迹执行{'（循环）' if loop else ''}已开始")
+            elif prepare:
+                self.output_list.addItem(f"已写入 PLC 缓冲区 {streamer.sent}/{len(self.trajectory)} 点")
+            self.output_list.scrollToBottom()
+
+        self.run_ads(PRIORITY_COMMAND, self._stream_job, streamer, prepare, start, on_done=on_done)
+
+    def _stream_job(self, streamer, prepare, start):
+        # 在 ADS 工作线程中执行
+        if prepare:
+            streamer.prepare()
+        if start:
+            streamer.start()
+
+    def _show_traj_progress(self, sent, executed):
+        self.traj_progress_label.setText(f"共 {len(self.trajectory)} 点，已发送 {sent}，已执行 {executed}")
+
+    def start_execution(self):
+        """开始执行轨迹：流式写入 PLC 环形缓冲区，按读指针流控"""
+        if self.trajectory is None:
+            self.output_list.addItem("请先传输轨迹")
+            self.output_list.scrollToBottom()
+            return
+        if not self.connected:
+            self.output_list.addItem("未连接到PLC")
+            self.output_list.scrollToBottom()
+            return
+        self.traj_timer.stop()
+        self._submit_stream(start=True)
+
+    def pump_trajectory(self):
+        """定时流控：上一次流控还在排队时跳过"""
+        streamer = self.traj_streamer
+        if streamer is None:
+            self.traj_timer.stop()
+            return
+
+        def on_done(ok, error, progress):
+            if streamer is not self.traj_streamer:
+                return
+            if not ok:
+                self.traj_timer.stop()
+                self.output_list.addItem(f"轨迹传输出错: {error}")
+                self.output_list.scrollToBottom()
+                return
+            sent, executed, finished = progress
+            self._show_traj_progress(sent, executed)
+            if finished and self.traj_timer.isActive():
+                self.traj_timer.stop()
+                self.output_list.addItem(f"轨迹执行完成 ({executed}点)")
+                self.output_list.scrollToBottom()
+
+        self.run_ads(PRIORITY_COMMAND, streamer.pump, on_done=on_done, coalesce="trajectory")
+
     def abort_execution(self):
-        """中止轨迹执行"""
-        # 在实际应用中，这里需要实现中止执行逻辑
-        # 这里仅做演示
-        self.output_list.addItem("轨迹执行已中止")
-        self.output_list.scrollToBottom()
+        """中止轨迹执行（停止优先级，排在排队的流控任务之前）"""
+        self.traj_timer.stop()
+        streamer, self.traj_streamer = self.traj_streamer, None
+        self.traj_prepared = False
+        if streamer is None or not self.connected:
+            self.output_list.addItem("没有正在执行的轨迹")
+            self.output_list.scrollToBottom()
+            return
+
+        def on_done(ok, error, _):
+            self.output_list.addItem("轨迹执行已中止" if ok else f"中止轨迹失败: {error}")
+            self.output_list.scrollToBottom()
+
+        self.run_ads(PRIORITY_STOP, streamer.abort, on_done=on_done)
 
     def clear_output_func(self):
         self.output_list.clear()
@@ -485,5 +861,6 @@ class RobotControlTab(QWidget):
             self.target_pos_edits[i].setEnabled(state)
             self.target_vel_edits[i].setEnabled(state)
             self.target_acc_edits[i].setEnabled(state)
+        self.group_move_button.setEnabled(state)
         self.start_exec_button.setEnabled(state)
         self.abort_button.setEnabled(state)
\ No newline at end of file
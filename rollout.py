@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import mujoco
+import numpy as np
+
+from model_cache import load_model
+from mujoco_simulation import MODEL_PATH, actuated_joint_indices, replay_trajectory, scene_path
+
+# 工作进程内常驻的模型、数据和已挂载的共享内存
+_worker_model = None
+_worker_data = None
+_worker_buffers = {}
+
+
+def _attach_shared(name):
+    """在工作进程中挂载共享内存（由主进程负责 unlink）"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.13 以前没有 track 参数；工作进程与主进程共用同一个
+        # resource_tracker，重复登记同一名称不会导致提前释放
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(model_path):
+    """工作进程初始化：只加载一次模型"""
+    global _worker_model, _worker_data
+    _worker_model = load_model(model_path)
+    _worker_data = mujoco.MjData(_worker_model)
+
+
+def _worker_arrays(specs):
+    """按 {键: (名称, 形状)} 取得共享内存上的数组视图，同一批次内复用挂载"""
+    global _worker_buffers
+    names = tuple(name for name, _ in specs.values())
+    if _worker_buffers.get("names") != names:
+        # 新批次开始，释放上一批次的挂载
+        for shm in _worker_buffers.get("blocks", ()):
+            shm.close()
+        blocks = [_attach_shared(name) for name in names]
+        arrays = {key: np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+                  for (key, (_, shape)), shm in zip(specs.items(), blocks)}
+        _worker_buffers = {"names": names, "blocks": blocks, "arrays": arrays}
+    return _worker_buffers["arrays"]
+
+
+def _rollout_task(index, trajectory, initial_qpos, specs, pos_tol, vel_tol, timeout):
+    """在工作进程中执行一次回放，并把结果直接写入共享内存"""
+    model, data = _worker_model, _worker_data
+    mujoco.mj_resetData(model, data)
+    if initial_qpos is not None:
+        data.qpos[:len(initial_qpos)] = initial_qpos
+        data.ctrl[:] = data.qpos[actuated_joint_indices(model)[0]]
+    mujoco.mj_forward(model, data)
+
+    result = replay_trajectory(model, data, trajectory, pos_tol, vel_tol, timeout)
+    n_points = len(trajectory)
+    arrays = _worker_arrays(specs)
+    for key in ("settle_times", "final_errors", "peak_forces"):
+        arrays[key][index, :n_points] = result[key]
+    arrays["final_qpos"][index] = data.qpos
+    return index
+
+
+class RolloutEngine:
+    """基于进程池的批量轨迹回放引擎
+
+    每个工作进程只加载一次 MjModel，并在多次回放之间复用同一个 MjData；
+    回放结果由工作进程直接写入主进程创建的共享内存数组，无需序列化传回。
+    """
+
+    def __init__(self, max_workers=None, model_path=MODEL_PATH):
+        self.max_workers = max_workers or os.cpu_count()
+        self.model_path = model_path
+        model = load_model(model_path)
+        self.nq = model.nq
+        self.nu = len(actuated_joint_indices(model)[0])
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(model_path,),
+        )
+
+    def run(self, trajectories, initial_qpos=None, pos_tol=1e-2, vel_tol=1e-2, timeout=5.0):
+        """批量回放轨迹
+
+        trajectories: 轨迹列表，每条为 (点数, 关节数) 的二维数组，长度可以不同
+        initial_qpos: 可选，(批量, nq) 的初始关节位置
+        返回字典：settle_times (B, P)、final_errors (B, P, nu)、peak_forces (B, P, nu)、
+        final_qpos (B, nq)，其中 P 为最长轨迹的点数，较短轨迹的空位为 NaN。
+        """
+        batch = len(trajectories)
+        max_points = max((len(t) for t in trajectories), default=0)
+        shapes = {
+            "settle_times": (batch, max_points),
+            "final_errors": (batch, max_points, self.nu),
+            "peak_forces": (batch, max_points, self.nu),
+            "final_qpos": (batch, self.nq),
+        }
+
+        blocks = {}
+        try:
+            specs = {}
+            for key, shape in shapes.items():
+                size = max(1, int(np.prod(shape)) * np.dtype(np.float64).itemsize)
+                shm = shared_memory.SharedMemory(create=True, size=size)
+                blocks[key] = shm
+                np.ndarray(shape, dtype=np.float64, buffer=shm.buf).fill(np.nan)
+                specs[key] = (shm.name, shape)
+
+            futures = []
+            for i, trajectory in enumerate(trajectories):
+                init = None if initial_qpos is None else np.asarray(initial_qpos[i], dtype=float)
+                futures.append(self._executor.submit(
+                    _rollout_task, i, np.asarray(trajectory, dtype=float), init,
+                    specs, pos_tol, vel_tol, timeout))
+            for future in futures:
+                future.result()
+
+            # 结果拷出共享内存后即可释放
+            return {key: np.ndarray(shapes[key], dtype=np.float64, buffer=shm.buf).copy()
+                    for key, shm in blocks.items()}
+        finally:
+            for shm in blocks.values():
+                shm.close()
+                shm.unlink()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def rollout_batch(trajectories, initial_qpos=None, max_workers=None, **kwargs):
+    """一次性批量回放的便捷函数"""
+    with RolloutEngine(max_workers) as engine:
+        return engine.run(trajectories, initial_qpos, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多进程批量轨迹回放")
+    parser.add_argument("trajectory", nargs="+", help="轨迹文件（JSON 二维数组）")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，默认为 CPU 核数")
+    parser.add_argument("--repeat", type=int, default=1, help="每个轨迹重复回放的次数")
+    parser.add_argument("--lod", action="store_true", help="使用低精度网格场景")
+    args = parser.parse_args()
+
+    trajectories = []
+    for file_path in args.trajectory:
+        with open(file_path, "r") as f:
+            trajectories.extend([json.load(f)] * args.repeat)
+
+    with RolloutEngine(args.workers, scene_path(args.lod)) as engine:
+        start = time.perf_counter()
+        results = engine.run(trajectories)
+        elapsed = time.perf_counter() - start
+
+    settled = ~np.isnan(results["settle_times"])
+    print(f"回放 {len(trajectories)} 条轨迹, 用时 {elapsed:.3f} s, "
+          f"到位点数 {int(settled.sum())}/{sum(len(t) for t in trajectories)}")
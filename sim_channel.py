@@ -0,0 +1,189 @@
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+# 共享内存命令通道文件（与 ctrl_params.json 位于同一工作目录）
+CHANNEL_FILE = "ctrl_channel.bin"
+
+# 通道可容纳的最大设定值个数
+MAX_SETPOINTS = 8
+
+# 读端遇到正在写入的数据时的最大重试次数（超过后放弃本次读取，避免写端异常退出时读端空转）
+READ_RETRIES = 100
+
+# 内存布局: magic(4s) version(I) seq(Q) count(I) 保留(I) values(MAX_SETPOINTS*d)
+_MAGIC = b"SPCH"
+_VERSION = 1
+_HEAD = struct.Struct("<4sI")
+_SEQ = struct.Struct("<Q")
+_COUNT = struct.Struct("<I")
+_VALUES = struct.Struct(f"<{MAX_SETPOINTS}d")
+_SEQ_OFFSET = _HEAD.size
+_COUNT_OFFSET = _SEQ_OFFSET + _SEQ.size
+_VALUES_OFFSET = _COUNT_OFFSET + 2 * _COUNT.size
+CHANNEL_SIZE = _VALUES_OFFSET + _VALUES.size
+
+
+def _open_mapping(path, size):
+    """打开（必要时创建）指定大小的文件并映射到内存"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+        return mmap.mmap(fd, size)
+    finally:
+        os.close(fd)
+
+
+class SetpointChannel:
+    """基于内存映射文件的设定值通道
+
+    写端（界面）采用顺序锁协议：先把序号置为奇数，写入数据后再置为偶数；
+    读端（仿真循环）无锁读取，序号前后一致且为偶数时数据才有效，
+    因此不会读到写了一半的设定值。
+    """
+
+    def __init__(self, path=CHANNEL_FILE):
+        self.path = path
+        self._mm = _open_mapping(path, CHANNEL_SIZE)
+        self._write_lock = threading.Lock()
+        magic, version = _HEAD.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            # 新文件或旧版本文件，重新初始化
+            self._mm[:CHANNEL_SIZE] = bytes(CHANNEL_SIZE)
+            _HEAD.pack_into(self._mm, 0, _MAGIC, _VERSION)
+
+    @property
+    def seq(self):
+        """当前序号（偶数表示数据稳定）"""
+        return _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+
+    def write(self, values):
+        """写入一组设定值，返回新的序号"""
+        values = [float(v) for v in values[:MAX_SETPOINTS]]
+        padded = values + [0.0] * (MAX_SETPOINTS - len(values))
+        with self._write_lock:
+            seq = self.seq
+            if seq & 1:
+                # 上一个写端异常退出，序号停在奇数
+                seq += 1
+            _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 1)
+            _COUNT.pack_into(self._mm, _COUNT_OFFSET, len(values))
+            _VALUES.pack_into(self._mm, _VALUES_OFFSET, *padded)
+            _SEQ.pack_into(self._mm, _SEQ_OFFSET, seq + 2)
+        return seq + 2
+
+    def read(self, retries=READ_RETRIES):
+        """读取 (序号, 设定值列表)
+
+        遇到正在写入的数据时让出 CPU 后重试，retries 次仍未读到稳定数据
+        （写端停在写入中途）时返回 None。
+        """
+        for _ in range(retries):
+            seq1 = _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+            if not seq1 & 1:
+                count = _COUNT.unpack_from(self._mm, _COUNT_OFFSET)[0]
+                values = _VALUES.unpack_from(self._mm, _VALUES_OFFSET)
+                seq2 = _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0]
+                if seq1 == seq2:
+                    return seq1, list(values[:min(count, MAX_SETPOINTS)])
+            time.sleep(0)
+        return None
+
+    def poll(self, last_seq):
+        """若序号与 last_seq 不同则返回 (序号, 设定值)，否则返回 None
+
+        数据正在写入且重试后仍不稳定时也返回 None，下次轮询再读取。
+        """
+        if _SEQ.unpack_from(self._mm, _SEQ_OFFSET)[0] == last_seq:
+            return None
+        return self.read()
+
+    def close(self):
+        self._mm.close()
+
+
+# 遥测环形缓冲区文件
+TELEMETRY_FILE = "telemetry_ring.bin"
+
+# 每条遥测记录的字段及长度（UR5e: 6 个关节、6 个执行器）
+TELEMETRY_FIELDS = (
+    ("time", 1),
+    ("qpos", 6),
+    ("qvel", 6),
+    ("actuator_force", 6),
+    ("eef_pos", 3),
+    ("eef_quat", 4),
+)
+TELEMETRY_RECORD_LEN = sum(n for _, n in TELEMETRY_FIELDS)
+
+# 内存布局: magic(4s) version(I) capacity(I) record_len(I) head(Q) records(capacity*record_len*d)
+_RING_MAGIC = b"TLRB"
+_RING_HEAD = struct.Struct("<4sIII")
+_RING_HEAD_OFFSET = _RING_HEAD.size
+_RING_DATA_OFFSET = _RING_HEAD_OFFSET + _SEQ.size
+
+
+class TelemetryRing:
+    """基于内存映射文件的单写多读遥测环形缓冲区
+
+    写端（仿真服务）先写入记录再递增写指针；读端按自己的读指针取出新记录，
+    若期间记录已被覆盖则丢弃这部分，内存占用固定为 capacity 条记录。
+    """
+
+    def __init__(self, path=TELEMETRY_FILE, capacity=4096, reset=False):
+        self.path = path
+        self.capacity = capacity
+        self.record_len = TELEMETRY_RECORD_LEN
+        size = _RING_DATA_OFFSET + capacity * self.record_len * 8
+        self._mm = _open_mapping(path, size)
+        header = _RING_HEAD.unpack_from(self._mm, 0)
+        if reset or header != (_RING_MAGIC, _VERSION, capacity, self.record_len):
+            self._mm[:_RING_DATA_OFFSET] = bytes(_RING_DATA_OFFSET)
+            _RING_HEAD.pack_into(self._mm, 0, _RING_MAGIC, _VERSION, capacity, self.record_len)
+        self._records = np.frombuffer(self._mm, dtype=np.float64, offset=_RING_DATA_OFFSET,
+                                      count=capacity * self.record_len).reshape(capacity, self.record_len)
+
+    @property
+    def head(self):
+        """已写入的记录总数"""
+        return _SEQ.unpack_from(self._mm, _RING_HEAD_OFFSET)[0]
+
+    def write(self, record):
+        """写入一条记录（长度为 TELEMETRY_RECORD_LEN 的一维数组）"""
+        head = self.head
+        self._records[head % self.capacity] = record
+        _SEQ.pack_into(self._mm, _RING_HEAD_OFFSET, head + 1)
+
+    def read_new(self, last):
+        """读取 last 之后的新记录，返回 (记录数组, 新的读指针)"""
+        head = self.head
+        if head < last:
+            # 写端重新初始化了缓冲区
+            last = 0
+        start = max(last, head - self.capacity + 1)
+        idx = np.arange(start, head) % self.capacity
+        records = self._records[idx]
+        # 拷贝期间被覆盖的记录不可用
+        overwritten = self.head - self.capacity + 1 - start
+        if overwritten > 0:
+            records = records[overwritten:]
+        return records, head
+
+    @staticmethod
+    def unpack(records):
+        """把记录数组拆分为 {字段名: 数组} 的视图"""
+        fields = {}
+        offset = 0
+        for name, length in TELEMETRY_FIELDS:
+            fields[name] = records[..., offset:offset + length]
+            offset += length
+        return fields
+
+    def close(self):
+        self._records = None
+        self._mm.close()
@@ -0,0 +1,74 @@
+import json
+import os
+import time
+
+import numpy as np
+
+
+class PhaseProfiler:
+    """仿真循环分阶段计时
+
+    每个阶段保存最近 window 个耗时样本（环形数组），记录一次只有一次数组赋值；
+    分位数在查询或导出时才计算。可选每隔 dump_interval 秒把统计写入 JSON 文件。
+    """
+
+    def __init__(self, window=2048, dump_file=None, dump_interval=1.0):
+        self.window = window
+        self.dump_file = dump_file
+        self.dump_interval = dump_interval
+        self._samples = {}
+        self._counts = {}
+        self._started = time.perf_counter()
+        self._next_dump = self._started + dump_interval
+
+    def add(self, phase, seconds):
+        """记录一个阶段的一次耗时（秒）"""
+        samples = self._samples.get(phase)
+        if samples is None:
+            samples = self._samples[phase] = np.zeros(self.window)
+            self._counts[phase] = 0
+        count = self._counts[phase]
+        samples[count % self.window] = seconds
+        self._counts[phase] = count + 1
+
+    def reset(self):
+        self._samples.clear()
+        self._counts.clear()
+        self._started = time.perf_counter()
+
+    def snapshot(self):
+        """各阶段最近 window 个样本的统计（毫秒）"""
+        phases = {}
+        for phase, samples in self._samples.items():
+            count = self._counts[phase]
+            recent = samples[:min(count, self.window)]
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99]) * 1000.0
+            phases[phase] = {
+                "count": count,
+                "mean_ms": round(float(recent.mean()) * 1000.0, 4),
+                "p50_ms": round(float(p50), 4),
+                "p95_ms": round(float(p95), 4),
+                "p99_ms": round(float(p99), 4),
+                "max_ms": round(float(recent.max()) * 1000.0, 4),
+            }
+        return {"window": self.window, "uptime": round(time.perf_counter() - self._started, 3), "phases": phases}
+
+    def dump(self, path=None):
+        """把统计写入 JSON 文件（先写临时文件再替换，读端不会读到一半）"""
+        path = path or self.dump_file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def tick(self):
+        """每帧调用一次，到达导出间隔时写文件"""
+        if self.dump_file is None:
+            return
+        now = time.perf_counter()
+        if now >= self._next_dump:
+            self._next_dump = now + self.dump_interval
+            try:
+                self.dump()
+            except OSError as e:
+                print(f"警告: 无法写入性能统计文件: {e}")
@@ -0,0 +1,153 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# 文件头: magic(4s) version(I) nq(I) nv(I) nu(I) 保留(I) count(Q) timestep(d)，补齐到 64 字节
+_MAGIC = b"SLOG"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIIIIIQd")
+_COUNT = struct.Struct("<Q")
+_COUNT_OFFSET = struct.calcsize("<4sIIIII")
+_DATA_OFFSET = 64
+
+
+def record_fields(nq, nv, nu):
+    """每条记录的字段及长度: time, qpos, qvel, ctrl, actuator_force"""
+    return (("time", 1), ("qpos", nq), ("qvel", nv), ("ctrl", nu), ("actuator_force", nu))
+
+
+def _split(rows, fields):
+    """把记录数组 (N, 记录长度) 拆分为 {字段名: 视图}"""
+    views = {}
+    offset = 0
+    for name, length in fields:
+        views[name] = rows[:, offset:offset + length]
+        offset += length
+    views["time"] = views["time"][:, 0]
+    return views
+
+
+class SimRecorder:
+    """仿真录制器：把每个物理步的状态追加到内存映射的二进制日志
+
+    文件按 chunk_steps 条记录为单位预分配，写满后扩展文件并重新映射；
+    每步只做几次数组拷贝和一次记录数更新，开销在微秒级。
+    关闭时把文件截断到实际记录数。
+    """
+
+    def __init__(self, path, model, chunk_steps=65536):
+        self.path = path
+        self.nq, self.nv, self.nu = model.nq, model.nv, model.nu
+        self.fields = record_fields(self.nq, self.nv, self.nu)
+        self.record_len = sum(length for _, length in self.fields)
+        self.chunk_steps = chunk_steps
+        self.count = 0
+        self.capacity = 0
+        self._mm = None
+
+        # 二进制模式的文件对象在 Windows 上同样可用（os.pwrite 只有 Unix 提供）
+        header = _HEADER.pack(_MAGIC, _VERSION, self.nq, self.nv, self.nu, 0, 0, model.opt.timestep)
+        with open(path, "w+b") as f:
+            f.write(header.ljust(_DATA_OFFSET, b"\0"))
+        self._grow()
+
+    def _grow(self):
+        """扩展一个数据块并重新映射"""
+        self._release()
+        self.capacity += self.chunk_steps
+        size = _DATA_OFFSET + self.capacity * self.record_len * 8
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._rows = np.frombuffer(self._mm, dtype=np.float64, offset=_DATA_OFFSET,
+                                   count=self.capacity * self.record_len).reshape(self.capacity, self.record_len)
+        views = _split(self._rows, self.fields)
+        self._time = views["time"]
+        self._qpos = views["qpos"]
+        self._qvel = views["qvel"]
+        self._ctrl = views["ctrl"]
+        self._force = views["actuator_force"]
+
+    def _release(self):
+        if self._mm is None:
+            return
+        # 先释放所有指向映射的数组视图，否则无法关闭映射
+        self._rows = self._time = self._qpos = self._qvel = self._ctrl = self._force = None
+        self._mm.close()
+        self._mm = None
+
+    def record(self, data):
+        """追加一条记录（每个物理步之后调用）"""
+        n = self.count
+        if n == self.capacity:
+            self._grow()
+        self._time[n] = data.time
+        self._qpos[n] = data.qpos
+        self._qvel[n] = data.qvel
+        self._ctrl[n] = data.ctrl
+        self._force[n] = data.actuator_force
+        self.count = n + 1
+        _COUNT.pack_into(self._mm, _COUNT_OFFSET, n + 1)
+
+    def close(self):
+        """结束录制并把文件截断到实际长度"""
+        if self._mm is None:
+            return
+        self._mm.flush()
+        self._release()
+        os.truncate(self.path, _DATA_OFFSET + self.count * self.record_len * 8)
+
+
+class SimLog:
+    """以只读内存映射打开录制文件，按需读取，不把整段日志载入内存"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"录制文件不完整: {path}")
+        magic, version, self.nq, self.nv, self.nu, _, count, self.timestep = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"不是有效的录制文件: {path}")
+        self.fields = record_fields(self.nq, self.nv, self.nu)
+        self.record_len = sum(length for _, length in self.fields)
+        # 录制中途异常退出时文件可能未截断，以文件头中的记录数为准
+        available = (os.path.getsize(path) - _DATA_OFFSET) // (self.record_len * 8)
+        self.count = min(count, available)
+        if self.count:
+            self.rows = np.memmap(path, dtype=np.float64, mode="r", offset=_DATA_OFFSET,
+                                  shape=(self.count, self.record_len))
+        else:
+            self.rows = np.zeros((0, self.record_len))
+        for name, view in _split(self.rows, self.fields).items():
+            setattr(self, name, view)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def duration(self):
+        return float(self.time[-1] - self.time[0]) if self.count else 0.0
+
+    def index_at(self, t):
+        """仿真时间 t 对应（不晚于 t）的记录序号（要求录制期间没有复位）"""
+        idx = int(np.searchsorted(self.time, t, side="right")) - 1
+        return min(max(idx, 0), self.count - 1)
+
+    def check_model(self, model):
+        """确认录制文件与模型维度一致"""
+        if (self.nq, self.nv, self.nu) != (model.nq, model.nv, model.nu):
+            raise ValueError(f"录制文件维度 (nq={self.nq}, nv={self.nv}, nu={self.nu}) 与模型不一致")
+
+    def apply(self, data, index):
+        """把第 index 条记录写回 MjData（不做物理步进）"""
+        data.time = self.time[index]
+        data.qpos[:] = self.qpos[index]
+        data.qvel[:] = self.qvel[index]
+        data.ctrl[:] = self.ctrl[index]
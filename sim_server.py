@@ -0,0 +1,485 @@
+import argparse
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import mujoco
+import mujoco.viewer
+import numpy as np
+
+from model_cache import load_model
+from mujoco_simulation import MODEL_PATH, StepScheduler, actuated_joint_indices, positive_float, scene_path
+from sim_channel import SetpointChannel, TelemetryRing, TELEMETRY_RECORD_LEN
+from sim_profiler import PhaseProfiler
+from sim_recorder import SimRecorder
+from trajectory_interp import interpolate, joint_limits
+
+# 仿真服务监听地址（仅本机）
+SERVER_ADDRESS = ("127.0.0.1", 6150)
+AUTHKEY = b"ur5e-sim"
+
+# --exit-on-disconnect 时最后一个连接断开后等待的时间 (s)，期间有新连接则不退出
+DISCONNECT_GRACE_S = 0.5
+
+
+class SimServerError(Exception):
+    """仿真服务返回错误或无法通信"""
+
+
+class SimulationServer:
+    """常驻的仿真服务
+
+    模型只加载一次并常驻内存，界面通过本地套接字发送命令并获得应答：
+    start / pause / resume / stop / reset / snapshot / restore / set_setpoint /
+    load_trajectory / load_waypoints / cancel_trajectory / record / profile / status / shutdown。
+    物理步进与可视化都在主线程中执行，命令由连接线程放入队列后在帧间处理。
+    """
+
+    def __init__(self, model_path=MODEL_PATH, address=SERVER_ADDRESS, authkey=AUTHKEY,
+                 realtime_factor=1.0, render_fps=60.0, headless=False, exit_on_disconnect=False,
+                 telemetry_hz=200.0, record_file=None, profile_file=None, profile_interval=1.0):
+        self.model = load_model(model_path)
+        self.data = mujoco.MjData(self.model)
+        self.nu = self.model.nu
+        self.channel = SetpointChannel()
+        self.last_seq = self.channel.seq
+        self.scheduler = StepScheduler(self.model.opt.timestep, realtime_factor, render_fps)
+        self.headless = headless
+        self.exit_on_disconnect = exit_on_disconnect
+
+        self.viewer = None
+        self.session_active = False
+        self.running = False
+        self.shutdown_requested = False
+        self.snapshots = {}
+        self.state_spec = mujoco.mjtState.mjSTATE_INTEGRATION
+        self.state_size = mujoco.mj_stateSize(self.model, self.state_spec)
+
+        # 遥测发布：按仿真时间以 telemetry_hz 的频率写入共享环形缓冲区
+        self.telemetry = TelemetryRing(reset=True)
+        self.telemetry_period = 1.0 / telemetry_hz if telemetry_hz > 0 else None
+        self.next_telemetry = 0.0
+        self.qpos_idx, self.dof_idx = actuated_joint_indices(self.model)
+        self.eef_site = mujoco.mj_name2id(self.model, mujoco.mjtObj.mjOBJ_SITE, "attachment_site")
+        self._telemetry_record = np.zeros(TELEMETRY_RECORD_LEN)
+        self._telemetry_fields = TelemetryRing.unpack(self._telemetry_record)
+
+        # 正在下发的设定值序列: (设定值数组, 每个设定值持续的仿真时间, 起始仿真时间)
+        self.trajectory = None
+        self.joint_limits = joint_limits(self.model)
+
+        # 主循环分阶段计时，可通过 profile 命令查询，或定期写入 profile_file
+        self.profiler = PhaseProfiler(dump_file=profile_file, dump_interval=profile_interval)
+
+        # 逐步录制到内存映射文件
+        self.recorder = None
+        if record_file:
+            self.cmd_record(record_file)
+
+        self.commands = queue.Queue()
+        # 连接数由各连接线程增减，与 exit_on_disconnect 的退出判断一起加锁
+        self.clients = 0
+        self._clients_lock = threading.Lock()
+        self.listener = Listener(address, authkey=authkey)
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    # ---------- 连接与命令分发 ----------
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return
+            # 在接受连接时计数，避免连接线程尚未启动时另一个连接断开导致服务误退出
+            with self._clients_lock:
+                self.clients += 1
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        """每个连接一个线程：接收命令，等待主线程处理后发送应答"""
+        reply_queue = queue.Queue(maxsize=1)
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    break
+                self.commands.put((message, reply_queue))
+                conn.send(reply_queue.get())
+        finally:
+            conn.close()
+            with self._clients_lock:
+                self.clients -= 1
+                idle = self.exit_on_disconnect and self.clients == 0
+            if idle:
+                # 新连接在认证握手完成后才计数，等待片刻再确认没有连接（例如探测连接断开后紧接着的正式连接）
+                time.sleep(DISCONNECT_GRACE_S)
+                with self._clients_lock:
+                    if self.clients == 0:
+                        self.commands.put(({"cmd": "shutdown"}, None))
+
+    def _process_commands(self, block_timeout=0.0):
+        """处理队列中的全部命令，队列为空时最多等待 block_timeout 秒"""
+        try:
+            item = self.commands.get(timeout=block_timeout) if block_timeout else self.commands.get_nowait()
+        except queue.Empty:
+            return
+        while True:
+            message, reply_queue = item
+            try:
+                handler = getattr(self, f"cmd_{message.get('cmd')}", None)
+                if handler is None:
+                    reply = {"ok": False, "error": f"未知命令: {message.get('cmd')}"}
+                else:
+                    params = {k: v for k, v in message.items() if k not in ("cmd", "id")}
+                    reply = {"ok": True}
+                    reply.update(handler(**params) or {})
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            # 回传请求序号，客户端据此丢弃超时后才到达的旧应答
+            reply["id"] = message.get("id")
+            if reply_queue is not None:
+                reply_queue.put(reply)
+            try:
+                item = self.commands.get_nowait()
+            except queue.Empty:
+                return
+
+    # ---------- 命令 ----------
+
+    def cmd_start(self, ctrl=None):
+        """开始一次仿真会话（打开可视化窗口并开始步进）"""
+        if ctrl is not None:
+            self.cmd_set_setpoint(ctrl)
+        if not self.headless and self.viewer is None:
+            self.viewer = mujoco.viewer.launch_passive(self.model, self.data)
+        self.session_active = True
+        self.running = True
+        self.scheduler.reset(self.data.time)
+        return self.cmd_status()
+
+    def cmd_pause(self):
+        self.running = False
+        return self.cmd_status()
+
+    def cmd_resume(self):
+        if not self.session_active:
+            raise RuntimeError("仿真未启动")
+        self.running = True
+        self.scheduler.reset(self.data.time)
+        return self.cmd_status()
+
+    def cmd_stop(self):
+        """结束当前会话并关闭可视化窗口，模型仍常驻"""
+        self.running = False
+        self.session_active = False
+        self.trajectory = None
+        if self.viewer is not None:
+            self.viewer.close()
+            self.viewer = None
+        return self.cmd_status()
+
+    def cmd_reset(self, keyframe=None, ctrl=None):
+        """复位仿真状态（可选复位到关键帧）"""
+        if keyframe is None:
+            mujoco.mj_resetData(self.model, self.data)
+        else:
+            key_id = keyframe if isinstance(keyframe, int) else mujoco.mj_name2id(
+                self.model, mujoco.mjtObj.mjOBJ_KEY, keyframe)
+            if key_id < 0:
+                raise ValueError(f"关键帧不存在: {keyframe}")
+            mujoco.mj_resetDataKeyframe(self.model, self.data, key_id)
+        if ctrl is not None:
+            self.cmd_set_setpoint(ctrl)
+        self.trajectory = None
+        mujoco.mj_forward(self.model, self.data)
+        self.scheduler.reset(self.data.time)
+        self._publish_telemetry()
+        return self.cmd_status()
+
+    def cmd_snapshot(self, name="default"):
+        """保存当前完整状态"""
+        state = np.empty(self.state_size)
+        mujoco.mj_getState(self.model, self.data, state, self.state_spec)
+        self.snapshots[name] = state
+        return {"name": name}
+
+    def cmd_restore(self, name="default"):
+        """恢复之前保存的状态"""
+        if name not in self.snapshots:
+            raise KeyError(f"快照不存在: {name}")
+        mujoco.mj_setState(self.model, self.data, self.snapshots[name], self.state_spec)
+        mujoco.mj_forward(self.model, self.data)
+        self.scheduler.reset(self.data.time)
+        self._publish_telemetry()
+        return self.cmd_status()
+
+    def cmd_set_setpoint(self, ctrl):
+        if len(ctrl) < self.nu:
+            raise ValueError(f"控制参数数量不足: {len(ctrl)} < {self.nu}")
+        self.data.ctrl[:self.nu] = ctrl[:self.nu]
+        return {"ctrl": self.data.ctrl[:self.nu].tolist()}
+
+    def cmd_load_trajectory(self, points, period):
+        """加载设定值序列，每 period 秒（仿真时间）切换到下一个点"""
+        points = np.asarray(points, dtype=float)
+        if points.ndim != 2 or points.shape[1] < self.nu or len(points) == 0:
+            raise ValueError("轨迹应为 (点数, 关节数) 的二维数组")
+        self.trajectory = (points[:, :self.nu], float(period), self.data.time)
+        return {"points": len(points), "duration": len(points) * float(period)}
+
+    def cmd_load_waypoints(self, points, method="quintic", vel_scale=1.0):
+        """从当前位置出发插值路径点，按物理步长逐步下发稠密设定值"""
+        points = np.asarray(points, dtype=float)
+        if points.ndim != 2 or points.shape[1] < self.nu or len(points) == 0:
+            raise ValueError("路径点应为 (点数, 关节数) 的二维数组")
+        waypoints = np.vstack((self.data.qpos[self.qpos_idx], points[:, :self.nu]))
+        limits = dict(self.joint_limits, vel_max=self.joint_limits["vel_max"] * vel_scale)
+        times, positions = interpolate(waypoints, self.model.opt.timestep, limits, method)
+        self.trajectory = (positions, self.model.opt.timestep, self.data.time)
+        # 路径点已按关节限位裁剪，终点以实际下发的最后一个设定值为准
+        return {"points": len(positions), "duration": float(times[-1]), "start_time": self.data.time,
+                "end_point": positions[-1].tolist()}
+
+    def cmd_cancel_trajectory(self):
+        """停止下发设定值序列，保持当前设定值"""
+        self.trajectory = None
+        return {"ctrl": self.data.ctrl[:self.nu].tolist()}
+
+    def cmd_record(self, path=None):
+        """开始录制到 path；path 为空时停止当前录制"""
+        steps = 0
+        if self.recorder is not None:
+            self.recorder.close()
+            steps = self.recorder.count
+            self.recorder = None
+        if path:
+            self.recorder = SimRecorder(path, self.model)
+        return {"recording": path or None, "recorded_steps": steps}
+
+    def cmd_profile(self, reset=False):
+        """返回主循环各阶段耗时的 p50/p95/p99（毫秒），reset 为 True 时随后清空样本"""
+        snapshot = self.profiler.snapshot()
+        if reset:
+            self.profiler.reset()
+        return snapshot
+
+    def cmd_status(self):
+        return {
+            "session": self.session_active,
+            "running": self.running,
+            "viewer": self.viewer is not None,
+            "time": self.data.time,
+            "qpos": self.data.qpos.tolist(),
+            "ctrl": self.data.ctrl[:self.nu].tolist(),
+            "trajectory": self.trajectory is not None,
+            "recording": None if self.recorder is None else self.recorder.path,
+        }
+
+    def cmd_shutdown(self):
+        self.shutdown_requested = True
+
+    # ---------- 主循环 ----------
+
+    def _apply_setpoints(self):
+        """应用共享内存通道和设定值序列中的控制量"""
+        update = self.channel.poll(self.last_seq)
+        if update is not None:
+            self.last_seq, values = update
+            if len(values) >= self.nu:
+                self.data.ctrl[:self.nu] = values[:self.nu]
+        if self.trajectory is not None:
+            points, period, start = self.trajectory
+            idx = int((self.data.time - start) / period)
+            if idx >= len(points):
+                self.data.ctrl[:self.nu] = points[-1]
+                self.trajectory = None
+            else:
+                self.data.ctrl[:self.nu] = points[idx]
+
+    def _publish_telemetry(self):
+        """把当前状态写入遥测环形缓冲区"""
+        if self.telemetry_period is None:
+            return
+        data, fields = self.data, self._telemetry_fields
+        fields["time"][0] = data.time
+        fields["qpos"][:] = data.qpos[self.qpos_idx]
+        fields["qvel"][:] = data.qvel[self.dof_idx]
+        fields["actuator_force"][:] = data.actuator_force[:self.nu]
+        if self.eef_site >= 0:
+            fields["eef_pos"][:] = data.site_xpos[self.eef_site]
+            mujoco.mju_mat2Quat(fields["eef_quat"], data.site_xmat[self.eef_site])
+        self.telemetry.write(self._telemetry_record)
+        next_time = self.next_telemetry + self.telemetry_period
+        if not data.time <= next_time <= data.time + self.telemetry_period:
+            # 复位或恢复快照后仿真时间发生跳变
+            next_time = data.time + self.telemetry_period
+        self.next_telemetry = next_time
+
+    def _step(self):
+        """执行一个物理步，并按需发布遥测"""
+        self._apply_setpoints()
+        mujoco.mj_step(self.model, self.data)
+        if self.recorder is not None:
+            self.recorder.record(self.data)
+        if self.telemetry_period is not None and self.data.time >= self.next_telemetry:
+            self._publish_telemetry()
+
+    def _step_frame(self):
+        """执行一帧的物理子步"""
+        scheduler = self.scheduler
+        steps = 0
+        if scheduler.as_fast_as_possible:
+            deadline = scheduler.frame_deadline()
+            while steps < scheduler.max_substeps:
+                self._step()
+                steps += 1
+                if time.perf_counter() >= deadline:
+                    break
+        else:
+            for _ in range(scheduler.substeps(self.data.time)):
+                self._step()
+                steps += 1
+        return steps
+
+    def serve_forever(self):
+        print(f"仿真服务已启动，监听 {self.listener.address}")
+        try:
+            while not self.shutdown_requested:
+                if not self.session_active:
+                    # 空闲时阻塞等待命令
+                    self._process_commands(block_timeout=0.05)
+                    continue
+                frame_start = time.perf_counter()
+                self._process_commands()
+                commands_done = time.perf_counter()
+
+                if self.viewer is not None and not self.viewer.is_running():
+                    # 用户关闭了可视化窗口
+                    self.cmd_stop()
+                    continue
+
+                steps = self._step_frame() if self.running else 0
+                physics_done = time.perf_counter()
+                if self.viewer is not None:
+                    self.viewer.sync()
+                sync_done = time.perf_counter()
+                # 帧间空闲时间用于等待命令，命令到达后立即处理
+                if self.running:
+                    self.scheduler.end_frame(self.data.time, steps, sleep=self._process_commands)
+                else:
+                    self._process_commands(block_timeout=self.scheduler.frame_period)
+
+                frame_end = time.perf_counter()
+                profiler = self.profiler
+                profiler.add("commands", commands_done - frame_start)
+                if steps:
+                    profiler.add("physics", physics_done - commands_done)
+                    profiler.add("mj_step", (physics_done - commands_done) / steps)
+                if self.viewer is not None:
+                    profiler.add("sync", sync_done - physics_done)
+                profiler.add("idle", frame_end - sync_done)
+                profiler.add("frame", frame_end - frame_start)
+                profiler.tick()
+        finally:
+            self.cmd_stop()
+            self.listener.close()
+            self.channel.close()
+            self.telemetry.close()
+            self.cmd_record()
+            print("仿真服务已退出")
+
+
+class SimClient:
+    """仿真服务客户端，请求线程安全"""
+
+    def __init__(self, address=SERVER_ADDRESS, authkey=AUTHKEY):
+        self.address = address
+        self.authkey = authkey
+        self.conn = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    @property
+    def connected(self):
+        return self.conn is not None
+
+    def connect(self, timeout=10.0):
+        """连接仿真服务，服务尚在加载模型时重试直到超时"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.conn = Client(self.address, authkey=self.authkey)
+                return
+            except (ConnectionRefusedError, FileNotFoundError):
+                if time.monotonic() >= deadline:
+                    raise SimServerError("无法连接仿真服务")
+                time.sleep(0.05)
+
+    def request(self, cmd, timeout=5.0, **params):
+        """发送命令并等待应答，失败时抛出 SimServerError"""
+        with self._lock:
+            if self.conn is None:
+                raise SimServerError("未连接仿真服务")
+            self._next_id += 1
+            request_id = self._next_id
+            deadline = time.monotonic() + timeout
+            try:
+                self.conn.send(dict(params, cmd=cmd, id=request_id))
+                while True:
+                    if not self.conn.poll(max(deadline - time.monotonic(), 0)):
+                        raise SimServerError(f"命令 {cmd} 应答超时")
+                    reply = self.conn.recv()
+                    # 之前超时的命令的应答可能晚到，跳过序号不符的应答
+                    if reply.get("id") == request_id:
+                        break
+            except (EOFError, OSError) as e:
+                self.conn = None
+                raise SimServerError(f"仿真服务连接断开: {e}")
+        if not reply.get("ok"):
+            raise SimServerError(reply.get("error", "未知错误"))
+        return reply
+
+    def close(self):
+        with self._lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="UR5e 常驻仿真服务")
+    parser.add_argument("--port", type=int, default=SERVER_ADDRESS[1], help="监听端口")
+    parser.add_argument("--rtf", type=float, default=1.0,
+                        help="实时因子，1 为实时，10 为十倍速，0 为尽可能快")
+    parser.add_argument("--fps", type=positive_float, default=60.0, help="可视化刷新帧率上限")
+    parser.add_argument("--headless", action="store_true", help="不打开可视化窗口")
+    parser.add_argument("--exit-on-disconnect", action="store_true",
+                        help="最后一个客户端断开后退出")
+    parser.add_argument("--telemetry-hz", type=float, default=200.0,
+                        help="遥测发布频率（按仿真时间），0 为关闭")
+    parser.add_argument("--lod", action="store_true",
+                        help="使用低精度网格场景（适合 --headless 或远程运行）")
+    parser.add_argument("--profile", metavar="FILE", help="定期把主循环各阶段耗时统计写入 JSON 文件")
+    parser.add_argument("--profile-interval", type=float, default=1.0, help="性能统计文件的写入间隔 (s)")
+    parser.add_argument("--record", metavar="FILE", help="启动后即录制每个物理步到文件")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = SimulationServer(
+        model_path=scene_path(args.lod),
+        address=(SERVER_ADDRESS[0], args.port),
+        realtime_factor=args.rtf,
+        render_fps=args.fps,
+        headless=args.headless,
+        exit_on_disconnect=args.exit_on_disconnect,
+        telemetry_hz=args.telemetry_hz,
+        record_file=args.record,
+        profile_file=args.profile,
+        profile_interval=args.profile_interval,
+    )
+    server.serve_forever()
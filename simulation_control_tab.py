@@ -1,28 +1,80 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QGridLayout, QGroupBox, 
                             QHBoxLayout, QPushButton, QLabel, QDoubleSpinBox, QListWidget,
-                            QProgressBar, QTextEdit, QFileDialog, QLineEdit)
+                            QProgressBar, QTextEdit, QFileDialog, QLineEdit, QComboBox)
 from PyQt6.QtGui import QFont
 import sys
 import subprocess
 from pathlib import Path
 import json
 import threading
+import numpy as np
 import time
-from PyQt6.QtCore import QTimer
+from PyQt6.QtCore import QTimer, pyqtSignal
+from sim_channel import SetpointChannel, TelemetryRing
+from sim_server import SimClient, SimServerError
+from kinematics import forward_kinematics
+from ik_service import IKService, rpy_to_quat
+from trajectory_check import TrajectoryChecker
+from traj_io import TRAJ_SUFFIX, load_trajectory
+
+# 闭环控制参数列表最多显示的轨迹点数（大轨迹只显示开头部分）
+PARAMS_DISPLAY_LIMIT = 1000
+
+
+def _joint_values(row):
+    """轨迹点前 6 个关节值（float 列表）；不是至少 6 个数值的行返回 None"""
+    try:
+        values = [float(v) for v in row[:6]]
+    except (TypeError, ValueError):
+        return None
+    return values if len(values) == 6 else None
+
+
+def _format_value(item):
+    try:
+        return f"{float(item):.4f}"
+    except (TypeError, ValueError):
+        return str(item)
 
 class SimulationControlTab(QWidget):
+    # 仿真服务启动/连接结果（后台线程发出，排队连接回到界面线程）: 是否成功, 错误信息
+    sim_server_ready = pyqtSignal(bool, str)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent = parent
         self.ctrl_values = [0, -1, -1, -1, 0, 0]  # 默认控制值
         self.ctrl_params_label = None
         self.closed_loop_params_label = None
+        # 与仿真进程共享的设定值通道
+        self.setpoint_channel = SetpointChannel()
+        # 常驻仿真服务及其客户端
+        self.server_process = None
+        self.sim_client = SimClient()
+        self.sim_server_starting = False
+        self.sim_server_ready.connect(self.on_sim_server_ready)
+        # 仿真遥测环形缓冲区及读指针
+        self.telemetry_ring = TelemetryRing()
+        self.telemetry_index = self.telemetry_ring.head
+        self.latest_telemetry = None
+        # 逆运动学服务（首次使用时加载模型）
+        self.ik_service = None
+        # 轨迹限位/碰撞检查器（首次使用时加载模型）
+        self.trajectory_checker = None
+        # 导入的二进制闭环轨迹（内存映射），为 None 时使用 closedLoopParams.json
+        self.closed_loop_points = None
         self.initUI()
         self.set_button_enable_func(False)
 
         self.progress_timer = QTimer(self)
         self.progress_timer.timeout.connect(self.update_progress)
 
+        # 用于读取仿真遥测的定时器
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.timeout.connect(self.update_telemetry)
+        self._telemetry_count = 0
+        self._telemetry_rate_time = time.monotonic()
+
     def initUI(self):
         """初始化仿真控制选项卡"""
         layout = QHBoxLayout(self)
@@ -39,12 +91,18 @@ class SimulationControlTab(QWidget):
         button_box = QGroupBox("仿真控制")
         button_layout = QGridLayout()
 
-        startButton = QPushButton("启动仿真")
-        startButton.clicked.connect(self.run_mujoco_simulation)
+        self.startButton = QPushButton("启动仿真")
+        self.startButton.clicked.connect(self.run_mujoco_simulation)
 
         stopButton = QPushButton("停止仿真")
         stopButton.clicked.connect(self.stop_simulation)
 
+        self.pauseButton = QPushButton("暂停仿真")
+        self.pauseButton.clicked.connect(self.toggle_pause_simulation)
+
+        self.resetButton = QPushButton("复位仿真")
+        self.resetButton.clicked.connect(self.reset_simulation)
+
         self.closedLoopButton = QPushButton("闭环控制")
         self.closedLoopButton.clicked.connect(self.start_closed_loop_control)
 
@@ -54,15 +112,43 @@ class SimulationControlTab(QWidget):
         importButton = QPushButton("导入闭环参数")
         importButton.clicked.connect(self.import_closed_loop_params)
 
-        button_layout.addWidget(startButton, 0, 0, 1, 2)
+        button_layout.addWidget(self.startButton, 0, 0, 1, 2)
         button_layout.addWidget(stopButton, 1, 0, 1, 2)
-        button_layout.addWidget(importButton, 2, 0, 1, 2)
-        button_layout.addWidget(self.closedLoopButton, 3, 0)
-        button_layout.addWidget(self.stopClosedLoopButton, 3, 1)
+        button_layout.addWidget(self.pauseButton, 2, 0)
+        button_layout.addWidget(self.resetButton, 2, 1)
+        button_layout.addWidget(importButton, 3, 0, 1, 2)
+        button_layout.addWidget(self.closedLoopButton, 4, 0)
+        button_layout.addWidget(self.stopClosedLoopButton, 4, 1)
 
         button_box.setLayout(button_layout)
         layout0.addWidget(button_box)
 
+        # 闭环控制到位判定及插值参数
+        tolerance_box = QGroupBox("闭环执行设置")
+        tolerance_layout = QGridLayout()
+
+        self.pos_tol_edit = QLineEdit("0.01")
+        self.vel_tol_edit = QLineEdit("0.01")
+        self.point_timeout_edit = QLineEdit("5.0")
+
+        tolerance_layout.addWidget(QLabel("位置容差 (rad):"), 0, 0)
+        tolerance_layout.addWidget(self.pos_tol_edit, 0, 1)
+        tolerance_layout.addWidget(QLabel("速度容差 (rad/s):"), 1, 0)
+        tolerance_layout.addWidget(self.vel_tol_edit, 1, 1)
+        tolerance_layout.addWidget(QLabel("单点超时 (s):"), 2, 0)
+        tolerance_layout.addWidget(self.point_timeout_edit, 2, 1)
+
+        # 插值方式：逐点到位时按路径点阶跃下发，其余方式在仿真中按物理步长下发稠密设定值
+        self.interp_combo = QComboBox()
+        for text, method in (("逐点到位", None), ("线性插值", "linear"),
+                             ("三次插值", "cubic"), ("五次插值", "quintic")):
+            self.interp_combo.addItem(text, method)
+        tolerance_layout.addWidget(QLabel("插值方式:"), 3, 0)
+        tolerance_layout.addWidget(self.interp_combo, 3, 1)
+
+        tolerance_box.setLayout(tolerance_layout)
+        layout0.addWidget(tolerance_box)
+
         # 创建关节控制参数面板
         group_box = QGroupBox("开环控制参数 (rad)")
         grid_layout = QGridLayout()
@@ -87,6 +173,25 @@ class SimulationControlTab(QWidget):
         group_box.setLayout(grid_layout)
         layout0.addWidget(group_box)
 
+        # 笛卡尔目标（逆运动学求解关节角）
+        cartesian_box = QGroupBox("笛卡尔目标 (m / rad)")
+        cartesian_layout = QGridLayout()
+
+        self.cartesian_edits = []
+        cartesian_defaults = [0.4, 0.1, 0.4, 3.1416, 0.0, 0.0]
+        for i, name in enumerate(["X", "Y", "Z", "横滚", "俯仰", "偏航"]):
+            edit = QLineEdit(str(cartesian_defaults[i]))
+            cartesian_layout.addWidget(QLabel(f"{name}:"), i // 3, (i % 3) * 2)
+            cartesian_layout.addWidget(edit, i // 3, (i % 3) * 2 + 1)
+            self.cartesian_edits.append(edit)
+
+        ikButton = QPushButton("逆解")
+        ikButton.clicked.connect(self.solve_cartesian_target)
+        cartesian_layout.addWidget(ikButton, 2, 0, 1, 6)
+
+        cartesian_box.setLayout(cartesian_layout)
+        layout0.addWidget(cartesian_box)
+
         # 参数显示布局
         params_box = QGroupBox("参数显示")
         params_layout = QGridLayout()
@@ -107,6 +212,46 @@ class SimulationControlTab(QWidget):
         params_box.setLayout(params_layout)
         layout1.addWidget(params_box)
 
+        # 仿真遥测显示
+        telemetry_box = QGroupBox("仿真遥测")
+        telemetry_layout = QGridLayout()
+
+        self.telemetry_pos_labels = []
+        self.telemetry_vel_labels = []
+        self.telemetry_force_labels = []
+        for i, name in enumerate(joint_names):
+            telemetry_layout.addWidget(QLabel(f"{name}:"), i, 0)
+
+            pos_label = QLabel("未知")
+            self.telemetry_pos_labels.append(pos_label)
+            telemetry_layout.addWidget(QLabel("位置:"), i, 1)
+            telemetry_layout.addWidget(pos_label, i, 2)
+
+            vel_label = QLabel("未知")
+            self.telemetry_vel_labels.append(vel_label)
+            telemetry_layout.addWidget(QLabel("速度:"), i, 3)
+            telemetry_layout.addWidget(vel_label, i, 4)
+
+            force_label = QLabel("未知")
+            self.telemetry_force_labels.append(force_label)
+            telemetry_layout.addWidget(QLabel("力矩:"), i, 5)
+            telemetry_layout.addWidget(force_label, i, 6)
+
+        self.eef_pose_label = QLabel("未知")
+        self.telemetry_rate_label = QLabel("0 Hz")
+        telemetry_layout.addWidget(QLabel("末端位姿:"), 6, 0)
+        telemetry_layout.addWidget(self.eef_pose_label, 6, 1, 1, 6)
+        telemetry_layout.addWidget(QLabel("遥测速率:"), 7, 0)
+        telemetry_layout.addWidget(self.telemetry_rate_label, 7, 1, 1, 6)
+
+        # 查询仿真主循环各阶段耗时，用于判断卡顿来自物理计算、渲染还是通信
+        self.profileButton = QPushButton("性能统计")
+        self.profileButton.clicked.connect(self.show_profile)
+        telemetry_layout.addWidget(self.profileButton, 8, 0, 1, 7)
+
+        telemetry_box.setLayout(telemetry_layout)
+        layout1.addWidget(telemetry_box)
+
         # 添加进度条
         progress_box = QGroupBox("闭环控制进度条")
         progress_layout = QGridLayout()
@@ -138,36 +283,18 @@ class SimulationControlTab(QWidget):
         layout.addWidget(tc_box)
         layout.addWidget(tm_box) 
 
-        # 存储仿真进程
-        self.simulation_process = None
         self.closed_loop_active = False
 
     def update_ctrl_value(self):
         """更新控制值数组"""
+        from PyQt6.QtWidgets import QMessageBox
+        values = []
         for i in range(6):
             try:
                 # 获取输入值
-                value = float(self.spinboxes[i].text())
-                
-                # 检查值是否在有效范围内
-                if abs(value) > 6.28:
-                    # 弹出错误提示框
-                    from PyQt6.QtWidgets import QMessageBox
-                    QMessageBox.critical(
-                        self, 
-                        "输入错误", 
-                        f"值 {value} 超出范围 (-6.28 到 6.28)，请重新输入！"
-                    )
-                    # 重置为默认值
-                    self.spinboxes[i].setText(str(self.ctrl_values[i]))
-                    return False
-                
-                # 更新控制值
-                self.ctrl_values[i] = value
-                
+                values.append(float(self.spinboxes[i].text()))
             except ValueError:
                 # 处理非数字输入
-                from PyQt6.QtWidgets import QMessageBox
                 QMessageBox.critical(
                     self, 
                     "输入错误", 
@@ -176,30 +303,144 @@ class SimulationControlTab(QWidget):
                 # 重置为默认值
                 self.spinboxes[i].setText(str(self.ctrl_values[i]))
                 return False
+
+        # 按模型的关节限位和碰撞检查设定值；有遥测时检查从当前位置到设定值经过的全部构型
+        try:
+            checker = self.get_trajectory_checker()
+            if self.latest_telemetry is not None:
+                result = checker.check_path(np.vstack((self.latest_telemetry["qpos"], values)))
+            else:
+                result = checker.check([values])
+        except Exception as e:
+            self.show_list.addItem(f"设定值检查失败: {str(e)}")
+            self.show_list.scrollToBottom()
+            return False
+        if not result["ok"]:
+            # 弹出错误提示框
+            QMessageBox.critical(self, "输入错误", f"{result['message']}，请重新输入！")
+            _, joint = checker.check_limits([values])
+            if joint is not None:
+                # 重置越限关节为原值（越限的是当前位置时设定值本身不需要修改）
+                self.spinboxes[joint].setText(str(self.ctrl_values[joint]))
+            return False
+
+        # 更新控制值
+        self.ctrl_values[:] = values
         return True
 
-    def run_mujoco_simulation(self):
-        """运行mujoco_simulation.py文件"""
+    def get_trajectory_checker(self):
+        """轨迹检查器（首次使用时加载模型）"""
+        if self.trajectory_checker is None:
+            self.trajectory_checker = TrajectoryChecker()
+        return self.trajectory_checker
+
+    def ensure_sim_server(self):
+        """确保常驻仿真服务已启动并已连接（首次启动需等待加载模型，在后台线程中调用）"""
+        if self.sim_client.connected:
+            return
         try:
-            # 确保没有其他仿真在运行
-            if self.simulation_process and self.simulation_process.poll() is None:
-                self.show_list.addItem("已有一个仿真在运行")
-                self.show_list.scrollToBottom()
-                return
+            # 服务可能已在运行（例如上次会话留下的）
+            self.sim_client.connect(timeout=0)
+            return
+        except SimServerError:
+            pass
+        if not self.server_process or self.server_process.poll() is not None:
+            # 仿真服务只在首次使用时启动，之后模型常驻内存
+            script_path = Path(__file__).parent / "sim_server.py"
+            self.server_process = subprocess.Popen(
+                [sys.executable, str(script_path), "--exit-on-disconnect"])
+        self.sim_client.connect()
+
+    def is_simulation_running(self):
+        """查询仿真服务中是否有进行中的仿真会话"""
+        if not self.sim_client.connected:
+            return False
+        try:
+            return self.sim_client.request("status")["session"]
+        except SimServerError:
+            return False
+
+    def solve_cartesian_target(self):
+        """对笛卡尔目标求逆解，并把结果填入开环控制参数"""
+        try:
+            values = [float(edit.text()) for edit in self.cartesian_edits]
+        except ValueError:
+            self.show_list.addItem("请输入有效的笛卡尔目标！")
+            self.show_list.scrollToBottom()
+            return
+
+        try:
+            if self.ik_service is None:
+                self.ik_service = IKService()
+            q, converged, error = self.ik_service.solve(values[:3], rpy_to_quat(*values[3:]))
+        except Exception as e:
+            self.show_list.addItem(f"逆解失败: {str(e)}")
+            self.show_list.scrollToBottom()
+            return
 
-            # 获取当前脚本所在目录
-            script_path = Path(__file__).parent / "mujoco_simulation.py"
+        if not converged:
+            self.show_list.addItem(f"逆解未收敛（残差 {error:.2e}），目标可能不可达")
+            self.show_list.scrollToBottom()
+            return
+
+        for i in range(6):
+            self.spinboxes[i].setText(f"{q[i]:.4f}")
+        self.show_list.addItem(f"逆解结果: {', '.join(f'{v:.4f}' for v in q)}")
+        self.show_list.scrollToBottom()
+
+    def run_mujoco_simulation(self):
+        """在常驻仿真服务中启动一次仿真会话；服务未连接时先在后台线程中启动并连接"""
+        if self.sim_server_starting:
+            return
+        # 确保没有其他仿真在运行
+        if self.is_simulation_running():
+            self.show_list.addItem("已有一个仿真在运行")
+            self.show_list.scrollToBottom()
+            return
 
-            # 创建包含控制参数的临时文件
-            self.save_ctrl_params()
+        # 保存控制参数
+        self.save_ctrl_params()
 
-            # 在独立的进程中异步执行脚本
-            self.simulation_process = subprocess.Popen([sys.executable, str(script_path)])
+        if self.sim_client.connected:
+            self.start_sim_session()
+            return
+        self.sim_server_starting = True
+        self.startButton.setEnabled(False)
+        self.show_list.addItem("正在启动仿真服务...")
+        self.show_list.scrollToBottom()
+        threading.Thread(target=self._connect_sim_server, daemon=True).start()
+
+    def _connect_sim_server(self):
+        # 在后台线程中执行：启动服务进程并等待其加载模型，结果通过信号回到界面线程
+        try:
+            self.ensure_sim_server()
+        except Exception as e:
+            self.sim_server_ready.emit(False, str(e))
+            return
+        self.sim_server_ready.emit(True, "")
+
+    def on_sim_server_ready(self, ok, error):
+        self.sim_server_starting = False
+        self.startButton.setEnabled(True)
+        if not ok:
+            self.show_list.addItem(f"运行仿真失败: {error}")
+            self.show_list.scrollToBottom()
+            return
+        self.start_sim_session()
+
+    def start_sim_session(self):
+        """复位并启动仿真会话（服务已连接）"""
+        try:
+            self.sim_client.request("reset", ctrl=self.ctrl_values)
+            self.sim_client.request("start")
             self.show_list.addItem(f"成功启动Mujoco仿真，参数: {self.ctrl_values}")
             self.show_list.scrollToBottom()
 
+            self.pauseButton.setText("暂停仿真")
             self.set_button_enable_func(True)
 
+            self.telemetry_timer.start(50)
+
         except Exception as e:
             self.show_list.addItem(f"运行仿真失败: {str(e)}")
             self.show_list.scrollToBottom()
@@ -209,6 +450,7 @@ class SimulationControlTab(QWidget):
         try:
             with open("ctrl_params.json", "w") as f:
                 json.dump(self.ctrl_values, f)
+            self.setpoint_channel.write(self.ctrl_values)
             self.show_list.addItem(f"控制参数已保存: {self.ctrl_values}")
             self.show_list.scrollToBottom()
 
@@ -220,14 +462,18 @@ class SimulationControlTab(QWidget):
     def update_simulation_params(self):
         """更新仿真中的控制参数"""
         # 更新内存中的控制值
-        if self.update_ctrl_value():
+        if not self.update_ctrl_value():
             return
 
         # 保存到文件
         self.save_ctrl_params()
 
-        if self.simulation_process and self.simulation_process.poll() is None:
-            self.show_list.addItem(f"仿真参数已更新: {self.ctrl_values}")
+        if self.is_simulation_running():
+            try:
+                reply = self.sim_client.request("set_setpoint", ctrl=self.ctrl_values)
+                self.show_list.addItem(f"仿真参数已更新: {reply['ctrl']}")
+            except SimServerError as e:
+                self.show_list.addItem(f"仿真参数更新失败: {e}")
             self.show_list.scrollToBottom()
         else:
             self.show_list.addItem("请先启动仿真")
@@ -238,10 +484,13 @@ class SimulationControlTab(QWidget):
         if self.closed_loop_active:
             self.stop_closed_loop_control()
 
-        if self.simulation_process and self.simulation_process.poll() is None:
-            self.simulation_process.terminate()
-            self.simulation_process = None
-            self.show_list.addItem("仿真已停止")
+        if self.is_simulation_running():
+            try:
+                self.sim_client.request("stop")
+                self.telemetry_timer.stop()
+                self.show_list.addItem("仿真已停止")
+            except SimServerError as e:
+                self.show_list.addItem(f"停止仿真失败: {e}")
             self.show_list.scrollToBottom()
 
             self.set_button_enable_func(False)    
@@ -249,22 +498,88 @@ class SimulationControlTab(QWidget):
             self.show_list.addItem("没有运行中的仿真")
             self.show_list.scrollToBottom()    
 
+    def toggle_pause_simulation(self):
+        """暂停或继续仿真步进"""
+        try:
+            status = self.sim_client.request("status")
+            if status["running"]:
+                self.sim_client.request("pause")
+                self.pauseButton.setText("继续仿真")
+                self.show_list.addItem(f"仿真已暂停 (t = {status['time']:.3f} s)")
+            else:
+                self.sim_client.request("resume")
+                self.pauseButton.setText("暂停仿真")
+                self.show_list.addItem("仿真已继续")
+        except SimServerError as e:
+            self.show_list.addItem(f"暂停/继续仿真失败: {e}")
+        self.show_list.scrollToBottom()
+
+    def reset_simulation(self):
+        """复位仿真状态，无需重启仿真进程"""
+        if self.closed_loop_active:
+            self.stop_closed_loop_control()
+        try:
+            self.sim_client.request("reset", ctrl=self.ctrl_values)
+            self.show_list.addItem(f"仿真已复位，参数: {self.ctrl_values}")
+        except SimServerError as e:
+            self.show_list.addItem(f"复位仿真失败: {e}")
+        self.show_list.scrollToBottom()
+
+    def shutdown_sim_server(self):
+        """关闭常驻仿真服务（程序退出时调用）"""
+        if self.closed_loop_active:
+            self.stop_closed_loop_control()
+        if self.sim_client.connected:
+            try:
+                self.sim_client.request("shutdown")
+            except SimServerError:
+                pass
+            self.sim_client.close()
+        if self.server_process and self.server_process.poll() is None:
+            try:
+                self.server_process.wait(timeout=2.0)
+            except subprocess.TimeoutExpired:
+                self.server_process.terminate()
+
     def start_closed_loop_control(self):
         """开始闭环控制"""
-        if not self.simulation_process or self.simulation_process.poll() is not None:
+        if not self.is_simulation_running():
             self.show_list.addItem("请先启动仿真！")
             self.show_list.scrollToBottom()
             return
 
         try:
-            with open("closedLoopParams.json", "r") as f:
-                trajectory_points = json.load(f)
+            pos_tol = float(self.pos_tol_edit.text())
+            vel_tol = float(self.vel_tol_edit.text())
+            point_timeout = float(self.point_timeout_edit.text())
+            if pos_tol <= 0 or vel_tol <= 0 or point_timeout <= 0:
+                raise ValueError
+        except ValueError:
+            self.show_list.addItem("到位判定参数必须为正数！")
+            self.show_list.scrollToBottom()
+            return
+
+        try:
+            trajectory_points = self.load_closed_loop_points()
 
-            if not trajectory_points or len(trajectory_points) == 0:
+            if len(trajectory_points) == 0:
                 self.show_list.addItem("轨迹点文件为空！")
                 self.show_list.scrollToBottom()
                 return
 
+            # 下发前检查整条路径（从当前位置出发）是否越限或碰撞
+            path = np.asarray(trajectory_points, dtype=float)[:, :6]
+            if self.latest_telemetry is not None:
+                path = np.vstack((self.latest_telemetry["qpos"], path))
+            result = self.get_trajectory_checker().check_path(path)
+            if not result["ok"]:
+                # 路径点序号换算为轨迹点序号（从 1 开始）；路径以当前位置开头时第 0 个路径点就是当前位置
+                point = result["waypoint"] + (0 if self.latest_telemetry is not None else 1)
+                where = f"前往第 {point} 个轨迹点时" if point > 0 else "当前位置"
+                self.show_list.addItem(f"轨迹检查未通过（{where}）: {result['message']}")
+                self.show_list.scrollToBottom()
+                return
+
             self.update_params_display()
 
             # 显示进度条
@@ -277,7 +592,15 @@ class SimulationControlTab(QWidget):
 
             # 启动闭环控制线程
             self.closed_loop_active = True
-            self.control_thread = threading.Thread(target=self.execute_closed_loop, args=(trajectory_points,))
+            method = self.interp_combo.currentData()
+            if method is None:
+                self.control_thread = threading.Thread(
+                    target=self.execute_closed_loop,
+                    args=(trajectory_points, pos_tol, vel_tol, point_timeout))
+            else:
+                self.control_thread = threading.Thread(
+                    target=self.execute_interpolated,
+                    args=(trajectory_points, method, pos_tol, vel_tol, point_timeout))
             self.control_thread.daemon = True
             self.control_thread.start()
 
@@ -296,6 +619,12 @@ class SimulationControlTab(QWidget):
         self.closed_loop_active = False
         if self.control_thread and self.control_thread.is_alive():
             self.control_thread.join(timeout=1.0)
+        try:
+            # 停止仿真中正在下发的插值轨迹
+            if self.sim_client.connected:
+                self.sim_client.request("cancel_trajectory")
+        except SimServerError:
+            pass
 
         # 停止定时器
         self.progress_timer.stop()
@@ -303,10 +632,43 @@ class SimulationControlTab(QWidget):
         self.show_list.addItem("闭环控制已停止")
         self.show_list.scrollToBottom() 
 
-    def execute_closed_loop(self, trajectory_points):
-        """执行闭环控制轨迹"""
+    def wait_for_convergence(self, target, pos_tol, vel_tol, timeout):
+        """根据仿真遥测等待机械臂到达目标点
+
+        关节误差和速度都低于容差时返回 True；超过 timeout（仿真时间）或
+        超过 timeout 墙钟时间没有新的遥测（例如仿真已暂停）时返回 False。
+        """
+        target = np.asarray(target[:6], dtype=float)
+        # 只使用下发设定值之后的遥测
+        index = self.telemetry_ring.head
+        start_time = None
+        last_arrival = time.monotonic()
+        while self.closed_loop_active:
+            records, index = self.telemetry_ring.read_new(index)
+            now = time.monotonic()
+            if len(records) == 0:
+                if now - last_arrival > timeout:
+                    return False
+                time.sleep(0.002)
+                continue
+            last_arrival = now
+
+            fields = TelemetryRing.unpack(records)
+            if start_time is None:
+                start_time = fields["time"][0, 0]
+            converged = ((np.abs(fields["qpos"] - target) < pos_tol).all(axis=1)
+                         & (np.abs(fields["qvel"]) < vel_tol).all(axis=1))
+            if converged.any():
+                return True
+            if fields["time"][-1, 0] - start_time > timeout:
+                return False
+        return False
+
+    def execute_closed_loop(self, trajectory_points, pos_tol=0.01, vel_tol=0.01, point_timeout=5.0):
+        """执行闭环控制轨迹，机械臂到位后立即切换到下一个点"""
         total_points = len(trajectory_points)
         self.progress_value = 0
+        start = time.monotonic()
 
         for idx, point in enumerate(trajectory_points):
             if not self.closed_loop_active:
@@ -316,23 +678,114 @@ class SimulationControlTab(QWidget):
             self.show_list.addItem(f"移动到位置 {idx + 1}/{total_points}")
             self.show_list.scrollToBottom()            
 
-            # 保存控制参数
-            with open("ctrl_params.json", "w") as f:
-                json.dump(point, f)
+            # 通过共享内存通道下发控制参数
+            self.setpoint_channel.write(point)
 
             # 更新进度
             self.progress_value = int((idx + 1) * 100 / total_points)
 
-            # 等待机械臂移动到该位置（根据实际情况调整）
-            time.sleep(2.0)
+            # 等待机械臂移动到该位置
+            if not self.wait_for_convergence(point, pos_tol, vel_tol, point_timeout):
+                if not self.closed_loop_active:
+                    break
+                self.show_list.addItem(f"位置 {idx + 1} 超时未到位，继续下一个点")
+                self.show_list.scrollToBottom()
 
         # 完成循环
         if self.closed_loop_active:
-            self.show_list.addItem("闭环控制已完成")
+            self.show_list.addItem(f"闭环控制已完成，用时 {time.monotonic() - start:.2f} s")
             self.show_list.scrollToBottom() 
 
         self.closed_loop_active = False
 
+    def execute_interpolated(self, trajectory_points, method, pos_tol=0.01, vel_tol=0.01, point_timeout=5.0):
+        """由仿真服务插值路径点并按物理步长执行，完成后检查终点是否到位"""
+        self.progress_value = 0
+        start = time.monotonic()
+        try:
+            reply = self.sim_client.request("load_waypoints", points=trajectory_points, method=method)
+        except SimServerError as e:
+            self.show_list.addItem(f"加载插值轨迹失败: {e}")
+            self.show_list.scrollToBottom()
+            self.closed_loop_active = False
+            return
+
+        duration = reply["duration"]
+        end_time = reply["start_time"] + duration
+        self.show_list.addItem(f"插值轨迹: {reply['points']} 个设定值, 时长 {duration:.2f} s")
+        self.show_list.scrollToBottom()
+
+        # 根据遥测中的仿真时间更新进度；超过 point_timeout 墙钟时间没有新的遥测
+        # （仿真已暂停或服务无响应）时退出，仿真慢于实时时不会误判超时
+        index = self.telemetry_ring.head
+        sim_time = reply["start_time"]
+        last_arrival = time.monotonic()
+        while self.closed_loop_active and sim_time < end_time:
+            records, index = self.telemetry_ring.read_new(index)
+            now = time.monotonic()
+            if len(records) == 0 and now - last_arrival > point_timeout:
+                self.show_list.addItem("插值轨迹执行超时（仿真已暂停或服务无响应）")
+                self.show_list.scrollToBottom()
+                self.closed_loop_active = False
+                return
+            if len(records):
+                last_arrival = now
+                sim_time = records[-1, 0]
+                done = (sim_time - reply["start_time"]) / duration if duration > 0 else 1.0
+                self.progress_value = int(min(done, 1.0) * 100)
+            time.sleep(0.02)
+
+        if self.closed_loop_active:
+            # 路径点按关节限位裁剪过，以服务返回的实际终点判断是否到位
+            if not self.wait_for_convergence(reply["end_point"], pos_tol, vel_tol, point_timeout):
+                if self.closed_loop_active:
+                    self.show_list.addItem("终点超时未到位")
+            if self.closed_loop_active:
+                self.progress_value = 100
+                self.show_list.addItem(f"闭环控制已完成，用时 {time.monotonic() - start:.2f} s")
+                self.show_list.scrollToBottom()
+
+        self.closed_loop_active = False
+
+    def update_telemetry(self):
+        """读取遥测环形缓冲区中的新记录并更新显示（不阻塞界面）"""
+        records, self.telemetry_index = self.telemetry_ring.read_new(self.telemetry_index)
+        now = time.monotonic()
+        self._telemetry_count += len(records)
+        if now - self._telemetry_rate_time >= 1.0:
+            rate = self._telemetry_count / (now - self._telemetry_rate_time)
+            self.telemetry_rate_label.setText(f"{rate:.0f} Hz")
+            self._telemetry_count = 0
+            self._telemetry_rate_time = now
+        if len(records) == 0:
+            return
+
+        latest = TelemetryRing.unpack(records[-1].copy())
+        self.latest_telemetry = latest
+        for i in range(6):
+            self.telemetry_pos_labels[i].setText(f"{latest['qpos'][i]:.4f}")
+            self.telemetry_vel_labels[i].setText(f"{latest['qvel'][i]:.4f}")
+            self.telemetry_force_labels[i].setText(f"{latest['actuator_force'][i]:.2f}")
+        pos = ", ".join(f"{v:.4f}" for v in latest["eef_pos"])
+        quat = ", ".join(f"{v:.4f}" for v in latest["eef_quat"])
+        self.eef_pose_label.setText(f"({pos}) / ({quat}), t = {latest['time'][0]:.3f} s")
+
+    def show_profile(self):
+        """显示仿真主循环各阶段耗时的 p50/p95/p99"""
+        try:
+            reply = self.sim_client.request("profile")
+        except SimServerError as e:
+            self.show_list.addItem(f"获取性能统计失败: {e}")
+            self.show_list.scrollToBottom()
+            return
+        phases = reply["phases"]
+        if not phases:
+            self.show_list.addItem("暂无性能统计数据")
+        for name, stats in phases.items():
+            self.show_list.addItem(f"{name}: p50 {stats['p50_ms']:.3f} ms, p95 {stats['p95_ms']:.3f} ms, "
+                                   f"p99 {stats['p99_ms']:.3f} ms, 最大 {stats['max_ms']:.3f} ms")
+        self.show_list.scrollToBottom()
+
     def update_progress(self):
         """更新进度条显示"""
         self.progress_bar.setValue(self.progress_value)
@@ -346,18 +799,35 @@ class SimulationControlTab(QWidget):
             self.ctrl_params_label.setText(str(ctrl_data))
             
             # 更新closedLoopParams显示
-            with open("closedLoopParams.json", "r") as f:
-                closed_loop_data = json.load(f)
+            closed_loop_data = self.load_closed_loop_points()
+            shown = closed_loop_data[:PARAMS_DISPLAY_LIMIT]
+            # 只对至少有 6 个数值的行批量计算末端位置，其余行（列数不足或含非数值）原样显示
+            joints = [_joint_values(row) for row in shown]
+            valid = [values for values in joints if values is not None]
+            eef_positions = iter(forward_kinematics(np.asarray(valid))[0] if valid else ())
             # 清空列表并添加新数据
             self.closed_loop_params_label.clear()
-            for row in closed_loop_data:
+            for row, values in zip(shown, joints):
+                if values is None:
+                    self.closed_loop_params_label.addItem(f"{row}（无法计算末端位置）")
+                    continue
                 # 将每个点的数据格式化为字符串
-                formatted_row = ", ".join([f"{item:.4f}" for item in row])
-                self.closed_loop_params_label.addItem(formatted_row)
+                formatted_row = ", ".join([_format_value(item) for item in row])
+                formatted_eef = ", ".join([f"{item:.3f}" for item in next(eef_positions)])
+                self.closed_loop_params_label.addItem(f"{formatted_row} → ({formatted_eef})")
+            if len(closed_loop_data) > len(shown):
+                self.closed_loop_params_label.addItem(f"…（共 {len(closed_loop_data)} 个轨迹点）")
         except Exception as e:
             self.show_list.addItem(f"更新参数显示失败: {str(e)}")
             self.show_list.scrollToBottom()
 
+    def load_closed_loop_points(self):
+        """闭环轨迹点：导入了二进制轨迹时返回其内存映射数组，否则读取 closedLoopParams.json"""
+        if self.closed_loop_points is not None:
+            return self.closed_loop_points
+        with open("closedLoopParams.json", "r") as f:
+            return json.load(f)
+
     def import_closed_loop_params(self):
         """导入闭环控制参数文件"""
         # 打开文件对话框
@@ -365,12 +835,24 @@ class SimulationControlTab(QWidget):
             self, 
             "选择闭环参数文件", 
             "", 
-            "文本文件 (*.txt);;JSON文件 (*.json);;所有文件 (*)"
+            f"文本文件 (*.txt);;JSON文件 (*.json);;二进制轨迹 (*{TRAJ_SUFFIX});;所有文件 (*)"
         )
         
         if not file_path:
             return  # 用户取消了选择
         
+        if Path(file_path).suffix.lower() == TRAJ_SUFFIX:
+            # 二进制轨迹直接内存映射使用，不转存为 JSON
+            try:
+                self.closed_loop_points = load_trajectory(file_path, 6)
+                self.update_params_display()
+                self.show_list.addItem(f"成功导入二进制轨迹: {Path(file_path).name} "
+                                       f"({len(self.closed_loop_points)} 个轨迹点)")
+            except Exception as e:
+                self.show_list.addItem(f"导入失败: {str(e)}")
+            self.show_list.scrollToBottom()
+            return
+
         try:
             # 读取文件内容
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -392,6 +874,7 @@ class SimulationControlTab(QWidget):
             # 保存到closedLoopParams.json
             with open("closedLoopParams.json", 'w') as f:
                 json.dump(data, f, indent=4)
+            self.closed_loop_points = None
             
             # 更新显示
             self.update_params_display()
@@ -440,5 +923,8 @@ class SimulationControlTab(QWidget):
 
     def set_button_enable_func(self, state):
         self.updateButton.setEnabled(state)
+        self.pauseButton.setEnabled(state)
+        self.resetButton.setEnabled(state)
         self.closedLoopButton.setEnabled(state)
-        self.stopClosedLoopButton.setEnabled(state)
\ No newline at end of file
+        self.stopClosedLoopButton.setEnabled(state)
+        self.profileButton.setEnabled(state)
\ No newline at end of file
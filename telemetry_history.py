@@ -0,0 +1,156 @@
+import numpy as np
+
+# 每一级最小/最大值金字塔的合并倍数（第 k 级每格覆盖 PYRAMID_FACTOR**k 个样本）
+PYRAMID_FACTOR = 16
+
+
+class TelemetryHistory:
+    """定长遥测历史环形缓冲区，附带多级最小/最大值金字塔
+
+    每个样本是一行 channels 个通道值（float32）及其时间戳，写满后覆盖最旧的样本，
+    内存占用固定。追加时只更新受影响的金字塔格子；按像素宽度抽取曲线时选用
+    每格不超过每像素样本数的那一级，读取量只与像素宽度有关，与时间跨度无关。
+    """
+
+    def __init__(self, capacity, channels):
+        # 容量取最大一级格子大小的整数倍，保证格子不跨越环形缓冲区末尾
+        levels = 0
+        while PYRAMID_FACTOR ** (levels + 1) * PYRAMID_FACTOR <= capacity:
+            levels += 1
+        top = PYRAMID_FACTOR ** levels
+        self.capacity = -(-capacity // top) * top
+        self.channels = channels
+        self.head = 0
+        self.times = np.zeros(self.capacity)
+        self.values = np.zeros((self.capacity, channels), dtype=np.float32)
+        # [(每格样本数, 最小值, 最大值)]，从细到粗
+        self.levels = []
+        for k in range(1, levels + 1):
+            size = PYRAMID_FACTOR ** k
+            cells = self.capacity // size
+            self.levels.append((size, np.zeros((cells, channels), dtype=np.float32),
+                                np.zeros((cells, channels), dtype=np.float32)))
+
+    def __len__(self):
+        return min(self.head, self.capacity)
+
+    def clear(self):
+        self.head = 0
+
+    def append(self, times, rows):
+        """追加 n 个样本：times (n,)，rows (n, channels)"""
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self.channels)
+        times = np.asarray(times, dtype=float).reshape(-1)
+        if len(rows) > self.capacity:
+            # 超出容量的部分直接丢弃，只保留最新的 capacity 个样本
+            self.head += len(rows) - self.capacity
+            times, rows = times[-self.capacity:], rows[-self.capacity:]
+        start = self.head
+        n = len(rows)
+        if not n:
+            return
+        # 保证时间戳单调不减（span_for_seconds 依赖二分查找），晚到的旧时间戳按最新时间记录
+        if start:
+            times = np.maximum(times, self.latest_time())
+        times = np.maximum.accumulate(times)
+        first = start % self.capacity
+        split = min(n, self.capacity - first)
+        self.times[first:first + split] = times[:split]
+        self.values[first:first + split] = rows[:split]
+        self.times[:n - split] = times[split:]
+        self.values[:n - split] = rows[split:]
+        self.head = start + n
+        self._update_levels(start)
+
+    def _update_levels(self, start):
+        """自下而上重算 [start, head) 覆盖到的金字塔格子"""
+        child_min = child_max = self.values
+        child_size = 1
+        for size, mins, maxs in self.levels:
+            cells = len(mins)
+            last = (self.head - 1) // size
+            first = max(start // size, last - cells + 1)
+            # 完整的格子：按环形数组末尾拆成连续段，整段 reshape 后一次归约
+            cell = first
+            while cell < last:
+                idx = cell % cells
+                count = min(last - cell, cells - idx)
+                lo, hi = idx * PYRAMID_FACTOR, (idx + count) * PYRAMID_FACTOR
+                mins[idx:idx + count] = child_min[lo:hi].reshape(count, PYRAMID_FACTOR, -1).min(axis=1)
+                maxs[idx:idx + count] = child_max[lo:hi].reshape(count, PYRAMID_FACTOR, -1).max(axis=1)
+                cell += count
+            # 最后一格可能只写了一部分，只合并已写入的子格（其余子格是上一圈的旧数据）
+            used = -(-(self.head - last * size) // child_size)
+            lo = (last % cells) * PYRAMID_FACTOR
+            mins[last % cells] = child_min[lo:lo + used].min(axis=0)
+            maxs[last % cells] = child_max[lo:lo + used].max(axis=0)
+            child_min, child_max, child_size = mins, maxs, size
+
+    def latest_time(self):
+        return self.times[(self.head - 1) % self.capacity] if self.head else 0.0
+
+    def span_for_seconds(self, seconds):
+        """最近 seconds 秒内的样本数（要求时间戳单调递增）"""
+        available = len(self)
+        if seconds is None or not available:
+            return available
+        cutoff = self.latest_time() - seconds
+        # 在逻辑序号上二分查找第一个不早于 cutoff 的样本
+        lo, hi = self.head - available, self.head
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[mid % self.capacity] < cutoff:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.head - lo
+
+    def decimate(self, span, width, channels=None):
+        """最近 span 个样本按 width 列抽取，返回 (列数, 最小值 (列数, 通道), 最大值 (列数, 通道))
+
+        每列取落在该列的样本的最小/最大值；样本数不超过 width 时每个样本一列，最小值与最大值相同。
+        """
+        channels = slice(None) if channels is None else channels
+        span = min(span, len(self))
+        if span <= 0 or width <= 0:
+            empty = np.zeros((0, self.channels), dtype=np.float32)[:, channels]
+            return 0, empty, empty
+        start = self.head - span
+        if span <= width:
+            rows = self._ring_slice(self.values, start, self.head)[:, channels]
+            return span, rows, rows
+
+        # 选用每格样本数不超过每像素样本数的最粗一级
+        per_pixel = span / width
+        size, mins, maxs = 1, self.values, self.values
+        for level in self.levels:
+            if level[0] > per_pixel:
+                break
+            size, mins, maxs = level
+        last = (self.head - 1) // size
+        # 从跨度内第一个完整的格子开始（最旧的格子在环形数组中的位置可能已被正在写入的格子占用）
+        first = -(-start // size)
+        cell_min = self._ring_slice(mins, first, last + 1)[:, channels]
+        cell_max = self._ring_slice(maxs, first, last + 1)[:, channels]
+        cell_start = np.arange(first, last + 1) * size - start
+        if first * size > start:
+            # 跨度起点之后的半个格子按原始样本计算（不超过一列的样本数）
+            rows = self._ring_slice(self.values, start, min(first * size, self.head))[:, channels]
+            cell_min = np.concatenate((rows.min(axis=0, keepdims=True), cell_min))
+            cell_max = np.concatenate((rows.max(axis=0, keepdims=True), cell_max))
+            cell_start = np.r_[0, cell_start]
+        # 每个格子按其起点落入的像素列归并
+        columns = np.minimum(cell_start * width // span, width - 1)
+        bounds = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+        return len(bounds), np.minimum.reduceat(cell_min, bounds, axis=0), np.maximum.reduceat(cell_max, bounds, axis=0)
+
+    @staticmethod
+    def _ring_slice(ring, start, stop):
+        """按逻辑序号 [start, stop) 取环形数组中的行（跨越末尾时拼接）"""
+        size = len(ring)
+        first, last = start % size, (stop - 1) % size + 1
+        if stop - start <= 0:
+            return ring[:0]
+        if first < last:
+            return ring[first:last]
+        return np.concatenate((ring[first:], ring[:last]))
@@ -0,0 +1,85 @@
+import numpy as np
+from PyQt6.QtCore import QPointF, Qt
+from PyQt6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt6.QtWidgets import QWidget
+
+# 各条曲线的颜色（按通道顺序循环使用）
+CURVE_COLORS = ("#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f")
+
+# 绘图区边距 (px)：左侧纵轴刻度，顶部图例，底部时间跨度
+_MARGIN_LEFT = 70
+_MARGIN_TOP = 20
+_MARGIN_RIGHT = 10
+_MARGIN_BOTTOM = 20
+
+
+class TelemetryPlot(QWidget):
+    """遥测历史曲线（最小/最大值抽取）
+
+    每个像素列画出落在该列的样本的最小到最大值，振荡和尖峰不会因抽取而丢失；
+    每次重绘只读取与像素宽度相当的数据量，与显示的时间跨度无关。
+    """
+
+    def __init__(self, history, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.channels = slice(0, history.channels)
+        self.names = []
+        self.span_seconds = None
+        self.setMinimumHeight(200)
+
+    def set_channels(self, channels, names):
+        """显示的通道 (slice) 及各通道图例名称"""
+        self.channels = channels
+        self.names = list(names)
+        self.update()
+
+    def set_span(self, seconds):
+        """显示最近 seconds 秒的数据，None 表示全部历史"""
+        self.span_seconds = seconds
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("white"))
+        left, top = _MARGIN_LEFT, _MARGIN_TOP
+        width = self.width() - _MARGIN_LEFT - _MARGIN_RIGHT
+        height = self.height() - _MARGIN_TOP - _MARGIN_BOTTOM
+        if width <= 0 or height <= 0:
+            return
+        painter.setPen(QColor("gray"))
+        painter.drawRect(left, top, width, height)
+
+        span = self.history.span_for_seconds(self.span_seconds)
+        columns, mins, maxs = self.history.decimate(span, width, self.channels)
+        if columns == 0:
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "无数据")
+            return
+
+        lo, hi = float(mins.min()), float(maxs.max())
+        if hi - lo < 1e-9:
+            lo, hi = lo - 1.0, hi + 1.0
+        scale = height / (hi - lo)
+        # 样本数少于像素列数时按样本均匀铺开
+        xs = left + (np.arange(columns) + 0.5) * (width / columns)
+        y_min = top + (hi - mins) * scale
+        y_max = top + (hi - maxs) * scale
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, False)
+        for ch in range(mins.shape[1]):
+            # 每列先到最大值再到最小值，折线同时勾出包络和走势
+            points = np.empty((2 * columns, 2))
+            points[0::2, 0] = points[1::2, 0] = xs
+            points[0::2, 1] = y_max[:, ch]
+            points[1::2, 1] = y_min[:, ch]
+            color = QColor(CURVE_COLORS[ch % len(CURVE_COLORS)])
+            painter.setPen(QPen(color, 1))
+            painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in points.tolist()]))
+            if ch < len(self.names):
+                painter.drawText(left + 5 + ch * 60, top - 5, self.names[ch])
+
+        painter.setPen(QColor("black"))
+        painter.drawText(5, top + 10, f"{hi:.4g}")
+        painter.drawText(5, top + height, f"{lo:.4g}")
+        duration = self.history.latest_time() - self.history.times[(self.history.head - span) % self.history.capacity]
+        painter.drawText(left, top + height + 15, f"最近 {duration:.1f} s, {span} 个样本")
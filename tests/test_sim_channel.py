@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+import sim_channel
+from sim_channel import (MAX_SETPOINTS, READ_RETRIES, TELEMETRY_RECORD_LEN, SetpointChannel,
+                         TelemetryRing)
+
+
+@pytest.fixture
+def channel(tmp_path):
+    channel = SetpointChannel(str(tmp_path / "channel.bin"))
+    yield channel
+    channel.close()
+
+
+def _set_seq(channel, seq):
+    sim_channel._SEQ.pack_into(channel._mm, sim_channel._SEQ_OFFSET, seq)
+
+
+def test_setpoint_round_trip(channel):
+    assert channel.read() == (0, [])
+    seq = channel.write([0.5, -1.0, 2.0])
+    assert seq == 2
+    assert channel.read() == (2, [0.5, -1.0, 2.0])
+    assert channel.write(range(MAX_SETPOINTS + 3)) == 4
+    assert channel.read() == (4, [float(v) for v in range(MAX_SETPOINTS)])
+
+
+def test_setpoint_shared_between_mappings(channel):
+    channel.write([1.0, 2.0])
+    other = SetpointChannel(channel.path)
+    try:
+        assert other.read() == (2, [1.0, 2.0])
+    finally:
+        other.close()
+
+
+def test_poll_only_on_new_sequence(channel):
+    seq = channel.write([1.0])
+    assert channel.poll(seq) is None
+    assert channel.poll(0) == (seq, [1.0])
+
+
+def test_read_gives_up_on_odd_sequence(channel, monkeypatch):
+    channel.write([1.0])
+    # 写端停在写入中途
+    _set_seq(channel, 3)
+    sleeps = []
+    monkeypatch.setattr(sim_channel.time, "sleep", sleeps.append)
+    assert channel.read() is None
+    assert len(sleeps) == READ_RETRIES
+    assert channel.poll(2) is None
+
+
+def test_write_recovers_from_odd_sequence(channel):
+    _set_seq(channel, 5)
+    assert channel.write([3.0]) == 8
+    assert channel.read() == (8, [3.0])
+
+
+def _record(i):
+    return np.full(TELEMETRY_RECORD_LEN, float(i))
+
+
+@pytest.fixture
+def ring(tmp_path):
+    ring = TelemetryRing(str(tmp_path / "ring.bin"), capacity=8, reset=True)
+    yield ring
+    ring.close()
+
+
+def test_ring_read_new(ring):
+    records, last = ring.read_new(0)
+    assert len(records) == 0 and last == 0
+    for i in range(3):
+        ring.write(_record(i))
+    records, last = ring.read_new(0)
+    assert last == 3
+    np.testing.assert_array_equal(records[:, 0], [0, 1, 2])
+    ring.write(_record(3))
+    records, last = ring.read_new(last)
+    np.testing.assert_array_equal(records[:, 0], [3])
+
+
+def test_ring_read_new_after_wrap(ring):
+    for i in range(20):
+        ring.write(_record(i))
+    # 读指针落后超过容量时只返回未被覆盖的记录（保留一格给正在写入的记录）
+    records, last = ring.read_new(5)
+    assert last == 20
+    np.testing.assert_array_equal(records[:, 0], np.arange(13, 20))
+    assert (records == records[:, :1]).all()
+    records, last = ring.read_new(17)
+    np.testing.assert_array_equal(records[:, 0], [17, 18, 19])
+
+
+def test_ring_drops_records_overwritten_during_copy(ring, monkeypatch):
+    for i in range(10):
+        ring.write(_record(i))
+    heads = iter([10, 12])
+    # 第二次读取写指针时写端已经又写入了两条记录
+    monkeypatch.setattr(TelemetryRing, "head", property(lambda self: next(heads)))
+    records, last = ring.read_new(0)
+    assert last == 10
+    np.testing.assert_array_equal(records[:, 0], np.arange(5, 10))
+
+
+def test_ring_reset_by_writer(ring):
+    for i in range(5):
+        ring.write(_record(i))
+    # 读指针超过写指针：写端重新初始化了缓冲区
+    records, last = ring.read_new(100)
+    assert last == 5
+    np.testing.assert_array_equal(records[:, 0], np.arange(5))
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from telemetry_history import PYRAMID_FACTOR, TelemetryHistory
+
+
+def brute_force_decimate(history, values, span, width):
+    """按 decimate 的列划分规则逐样本求最小/最大值（values 为全部追加过的样本）"""
+    span = min(span, len(history))
+    start = history.head - span
+    if span <= width:
+        rows = values[start:history.head]
+        return span, rows, rows
+    per_pixel = span / width
+    size = 1
+    for level_size, _, _ in history.levels:
+        if level_size > per_pixel:
+            break
+        size = level_size
+    index = np.arange(start, history.head)
+    cell_start = np.maximum(index // size * size, start) - start
+    columns = np.minimum(cell_start * width // span, width - 1)
+    bounds = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+    rows = values[start:history.head]
+    return len(bounds), np.minimum.reduceat(rows, bounds), np.maximum.reduceat(rows, bounds)
+
+
+@pytest.fixture
+def filled():
+    """写满并回绕数次的历史：块大小不对齐金字塔格子"""
+    rng = np.random.default_rng(0)
+    history = TelemetryHistory(PYRAMID_FACTOR ** 3, 3)
+    values = rng.standard_normal((3 * history.capacity + 1234, 3)).astype(np.float32)
+    start = 0
+    for n in rng.integers(1, 700, size=1000):
+        if start >= len(values):
+            break
+        chunk = values[start:start + n]
+        history.append(np.arange(start, start + len(chunk)) * 1e-3, chunk)
+        start += len(chunk)
+    return history, values
+
+
+@pytest.mark.parametrize("span", [1, 100, 1000, 4095, 4096, 10 ** 6])
+@pytest.mark.parametrize("width", [1, 7, 300, 5000])
+def test_decimate_matches_brute_force_across_wrap(filled, span, width):
+    history, values = filled
+    columns, mins, maxs = history.decimate(span, width)
+    expected_columns, expected_mins, expected_maxs = brute_force_decimate(history, values, span, width)
+    assert columns == expected_columns
+    np.testing.assert_array_equal(mins, expected_mins)
+    np.testing.assert_array_equal(maxs, expected_maxs)
+
+
+def test_decimate_does_not_modify_pyramid(filled):
+    history, values = filled
+    history.decimate(1000, 1)
+    history.decimate(1000, 1)
+    _, mins, maxs = history.decimate(history.capacity, 1)
+    assert mins[0, 0] == values[-history.capacity:, 0].min()
+    assert maxs[0, 0] == values[-history.capacity:, 0].max()
+
+
+def test_decimate_channel_selection(filled):
+    history, values = filled
+    _, mins, maxs = history.decimate(3000, 50, slice(1, 2))
+    assert mins.shape == (50, 1)
+    assert mins.min() == values[-3000:, 1].min()
+    assert maxs.max() == values[-3000:, 1].max()
+
+
+def test_decimate_partial_cell_ignores_previous_lap():
+    history = TelemetryHistory(PYRAMID_FACTOR ** 2, 1)
+    history.append(np.arange(history.capacity), np.full((history.capacity, 1), 100.0))
+    history.append([history.capacity], [[-1.0]])
+    _, mins, maxs = history.decimate(PYRAMID_FACTOR + 1, 1)
+    assert mins[0, 0] == -1.0
+    assert maxs[0, 0] == 100.0
+
+
+def test_decimate_full_span_includes_oldest_partial_cell():
+    # 最旧的格子与正在写入的格子共用同一位置时，最旧格子中仍在跨度内的样本不能丢失
+    history = TelemetryHistory(PYRAMID_FACTOR ** 2, 1)
+    n = history.capacity + 5
+    values = np.zeros((n, 1))
+    values[5] = -100.0
+    history.append(np.arange(n), values)
+    _, mins, _ = history.decimate(history.capacity, 1)
+    assert mins[0, 0] == -100.0
+
+
+def test_oversize_append_keeps_newest():
+    history = TelemetryHistory(PYRAMID_FACTOR ** 2, 1)
+    n = history.capacity * 2 + 5
+    history.append(np.arange(n), np.arange(n).reshape(-1, 1))
+    assert len(history) == history.capacity
+    assert history.latest_time() == n - 1
+    _, rows, _ = history.decimate(history.capacity, history.capacity)
+    np.testing.assert_array_equal(rows[:, 0], np.arange(n - history.capacity, n))
+
+
+def test_span_for_seconds_with_late_timestamps():
+    history = TelemetryHistory(PYRAMID_FACTOR ** 2, 1)
+    history.append([0.0, 1.0, 2.0, 3.0], np.zeros((4, 1)))
+    # 晚到的旧时间戳按最新时间记录，二分查找仍然有效
+    history.append([2.5, 4.0, 3.5], np.zeros((3, 1)))
+    assert history.span_for_seconds(0.5) == 2
+    assert history.span_for_seconds(1.0) == 4
+    assert history.span_for_seconds(None) == 7
+
+
+def test_clear():
+    history = TelemetryHistory(PYRAMID_FACTOR ** 2, 2)
+    history.append([1.0], [[1.0, 2.0]])
+    history.clear()
+    assert len(history) == 0
+    assert history.decimate(10, 10)[0] == 0
@@ -0,0 +1,151 @@
+import re
+import struct
+
+import numpy as np
+import pytest
+
+from traj_io import (TrajectoryFile, TrajectoryWriter, binary_to_csv, csv_to_binary, iter_csv_blocks,
+                     load_csv, load_trajectory, write_trajectory)
+
+CSV_TEXT = (
+    "# 关节轨迹\n"
+    "0.1,0.2,0.3\n"
+    "\n"
+    "1.5,2.5,3.5,extra\n"
+    "-1e-3, 4 ,5  # 行尾注释\n"
+    "6,7,8\n"
+)
+CSV_EXPECTED = np.array([[0.1, 0.2, 0.3], [1.5, 2.5, 3.5], [-1e-3, 4, 5], [6, 7, 8]])
+
+
+@pytest.mark.parametrize("block_bytes", list(range(1, 40)) + [1 << 20])
+def test_csv_independent_of_block_size(tmp_path, block_bytes):
+    path = tmp_path / "a.csv"
+    path.write_text(CSV_TEXT, encoding="utf-8")
+    np.testing.assert_array_equal(load_csv(path, 3, block_bytes), CSV_EXPECTED)
+
+
+def test_csv_without_trailing_newline(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("1,2,3\n4,5,6", encoding="utf-8")
+    np.testing.assert_array_equal(load_csv(path, 3, 7), [[1, 2, 3], [4, 5, 6]])
+
+
+def test_csv_blocks_are_bounded(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("1,2,3\n" * 100, encoding="utf-8")
+    blocks = list(iter_csv_blocks(path, 3, 60))
+    assert len(blocks) > 1
+    assert sum(len(b) for b in blocks) == 100
+
+
+@pytest.mark.parametrize("block_bytes", list(range(1, 60)) + [1 << 20])
+@pytest.mark.parametrize("bad_line, message", [
+    ("1,2", "需要 3 列数据, 实际 2 列"),
+    ("1,x,3", "无法解析数值 'x'"),
+])
+def test_csv_error_line_number_at_any_chunk_boundary(tmp_path, block_bytes, bad_line, message):
+    lines = ["# header", "1,2,3", "", "4,5,6", "7,8,9", bad_line, "10,11,12"]
+    path = tmp_path / "bad.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=f"^第 6 行: {re.escape(message)}"):
+        load_csv(path, 3, block_bytes)
+
+
+def test_csv_non_utf8_comment(tmp_path):
+    path = tmp_path / "gbk.csv"
+    path.write_bytes("# 关节轨迹 (GBK)\n".encode("gbk") + b"1,2,3\n# caf\xe9\n4,5,6\n")
+    np.testing.assert_array_equal(load_csv(path, 3, 8), [[1, 2, 3], [4, 5, 6]])
+
+
+def test_csv_undecodable_value_reports_line(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_bytes(b"1,2,3\n4,\xb9,6\n")
+    with pytest.raises(ValueError, match="^第 2 行: 无法解析数值"):
+        load_csv(path, 3)
+
+
+def _points(count, joints=7):
+    return np.random.default_rng(count).standard_normal((count, joints))
+
+
+@pytest.mark.parametrize("count", [0, 1, 4, 5, 6, 23])
+def test_traj_round_trip(tmp_path, count):
+    path = tmp_path / "a.traj"
+    points = _points(count)
+    write_trajectory(path, points, period=0.002, units="deg", block_points=5)
+    traj = TrajectoryFile(path)
+    assert (len(traj), traj.joints, traj.period, traj.units) == (count, 7, 0.002, "deg")
+    assert traj.blocks == -(-count // 5)
+    np.testing.assert_array_equal(traj.points, points)
+    assert traj.verify() == []
+    if count:
+        np.testing.assert_array_equal(load_trajectory(str(path)), points)
+
+
+def test_traj_writer_chunks_match_single_write(tmp_path):
+    points = _points(23)
+    write_trajectory(tmp_path / "a.traj", points, block_points=5)
+    with TrajectoryWriter(tmp_path / "b.traj", 7, block_points=5) as writer:
+        for chunk in np.array_split(points, [3, 4, 11, 20]):
+            writer.write(chunk)
+    assert (tmp_path / "a.traj").read_bytes() == (tmp_path / "b.traj").read_bytes()
+
+
+def test_traj_verify_detects_corrupted_block(tmp_path):
+    path = tmp_path / "a.traj"
+    write_trajectory(path, _points(23), block_points=5)
+    data = bytearray(path.read_bytes())
+    # 第 12 个点（第 2 块）的第一个关节值
+    data[64 + 12 * 7 * 8] ^= 0x01
+    path.write_bytes(data)
+    traj = TrajectoryFile(path)
+    assert traj.verify() == [2]
+    assert not traj.verify_block(traj.block_of(12))
+
+
+@pytest.mark.parametrize("offset, value", [(0, b"XXXX"), (4, struct.pack("<I", 99)),
+                                           (8, struct.pack("<I", 0)), (12, struct.pack("<I", 0))])
+def test_traj_invalid_header(tmp_path, offset, value):
+    path = tmp_path / "a.traj"
+    write_trajectory(path, _points(6), block_points=5)
+    data = bytearray(path.read_bytes())
+    data[offset:offset + len(value)] = value
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        TrajectoryFile(path)
+
+
+def test_traj_truncated_file(tmp_path):
+    path = tmp_path / "a.traj"
+    write_trajectory(path, _points(6), block_points=5)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="长度"):
+        TrajectoryFile(path)
+
+
+def test_csv_binary_round_trip(tmp_path):
+    csv_path = tmp_path / "a.csv"
+    csv_path.write_text(CSV_TEXT, encoding="utf-8")
+    assert csv_to_binary(csv_path, tmp_path / "a.traj", columns=3) == len(CSV_EXPECTED)
+    binary_to_csv(tmp_path / "a.traj", tmp_path / "b.csv")
+    np.testing.assert_array_equal(load_csv(tmp_path / "b.csv", 3), CSV_EXPECTED)
+
+
+def test_failed_conversion_leaves_no_file(tmp_path):
+    csv_path = tmp_path / "bad.csv"
+    csv_path.write_text("1,2,3\n" * 10 + "1,2\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="第 11 行"):
+        csv_to_binary(csv_path, tmp_path / "bad.traj", columns=3)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bad.csv"]
+
+
+def test_failed_conversion_keeps_existing_file(tmp_path):
+    path = tmp_path / "a.traj"
+    points = _points(6, 3)
+    write_trajectory(path, points)
+    csv_path = tmp_path / "bad.csv"
+    csv_path.write_text("1,2,x\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        csv_to_binary(csv_path, path, columns=3)
+    np.testing.assert_array_equal(TrajectoryFile(path).points, points)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from traj_io import TrajectoryFile, write_trajectory
+from traj_stream import TRAJ_CAPACITY, TRAJ_READ_IDX, TRAJ_WRITE_IDX, TrajectoryStreamer
+
+
+class FakePlc:
+    """模拟 PLC 缓冲区：记录块写入的点，读指针由测试设置"""
+
+    def __init__(self, capacity, joints):
+        self.buffer = np.zeros((capacity, joints))
+        self.values = {TRAJ_CAPACITY: capacity, TRAJ_READ_IDX: 0, TRAJ_WRITE_IDX: 0}
+
+    # AdsWorker 接口
+    def require_plc(self):
+        return self
+
+    def write(self, *args):
+        if len(args) == 3:
+            name, value, _ = args
+            self.values[name] = value
+            return
+        _, offset, block, _ = args
+        data = np.frombuffer(bytes(block), dtype=np.float64).reshape(-1, self.buffer.shape[1])
+        slot = offset // (self.buffer.shape[1] * 8)
+        self.buffer[slot:slot + len(data)] = data
+
+    def read(self, name, _):
+        return self.values[name]
+
+    # pyads.Connection 接口
+    def get_symbol(self, _):
+        class Symbol:
+            index_group = 0x4020
+            index_offset = 0
+        return Symbol
+
+
+@pytest.fixture
+def traj(tmp_path):
+    path = tmp_path / "a.traj"
+    write_trajectory(path, np.arange(40 * 7, dtype=float).reshape(40, 7), block_points=8)
+    return path
+
+
+def test_stream_verified_file(traj):
+    source = TrajectoryFile(traj)
+    plc = FakePlc(16, 7)
+    streamer = TrajectoryStreamer(plc, source.points, source=source)
+    assert streamer.prepare() == 16
+    np.testing.assert_array_equal(plc.buffer, source.points[:16])
+    plc.values[TRAJ_READ_IDX] = 8
+    assert streamer.pump()[0] == 24
+
+
+def test_stream_refuses_corrupted_block(traj):
+    data = bytearray(traj.read_bytes())
+    # 第 20 个点所在的第 2 块
+    data[64 + 20 * 7 * 8] ^= 0x01
+    traj.write_bytes(data)
+    source = TrajectoryFile(traj)
+    plc = FakePlc(16, 7)
+    streamer = TrajectoryStreamer(plc, source.points, source=source)
+    assert streamer.prepare() == 16
+    plc.values[TRAJ_READ_IDX] = 8
+    with pytest.raises(RuntimeError, match="第 2 块"):
+        streamer.pump()
+    # 写指针停在损坏块之前，PLC 不会执行损坏的数据
+    assert plc.values[TRAJ_WRITE_IDX] == 16
+    assert streamer.sent == 16
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from trajectory_interp import METHODS, interpolate, segment_durations
+
+LIMITS = {
+    "pos_min": np.full(3, -np.pi),
+    "pos_max": np.full(3, np.pi),
+    "vel_max": np.array([1.0, 2.0, 0.5]),
+    "acc_max": np.array([4.0, 1.0, 2.0]),
+}
+WAYPOINTS = np.array([
+    [0.0, 0.0, 0.0],
+    [1.0, -0.5, 0.2],
+    [1.0, -0.5, 0.2],
+    [-0.3, 1.5, 0.1],
+    [0.2, 1.0, -1.0],
+])
+DT = 1e-3
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_endpoints_exact(method):
+    times, positions = interpolate(WAYPOINTS, DT, LIMITS, method)
+    assert times[0] == 0.0
+    np.testing.assert_array_equal(positions[0], WAYPOINTS[0])
+    np.testing.assert_array_equal(positions[-1], WAYPOINTS[-1])
+    durations = segment_durations(WAYPOINTS, LIMITS["vel_max"], LIMITS["acc_max"], method)
+    assert times[-1] == pytest.approx(durations.sum())
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_passes_through_every_waypoint(method):
+    durations = segment_durations(WAYPOINTS, LIMITS["vel_max"], LIMITS["acc_max"], method)
+    times, positions = interpolate(WAYPOINTS, DT, LIMITS, method)
+    for start, waypoint in zip(np.concatenate(([0.0], np.cumsum(durations))), WAYPOINTS):
+        # 路径点时刻不一定落在采样点上，取最近的采样点，误差不超过一个步长的位移
+        nearest = np.argmin(np.abs(times - start))
+        np.testing.assert_allclose(positions[nearest], waypoint, atol=DT * LIMITS["vel_max"].max())
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_times_monotonic(method):
+    times, positions = interpolate(WAYPOINTS, DT, LIMITS, method)
+    steps = np.diff(times)
+    assert len(times) == len(positions)
+    assert (steps > 0).all()
+    assert steps.max() <= DT * (1 + 1e-9)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_velocity_within_limits(method):
+    times, positions = interpolate(WAYPOINTS, DT, LIMITS, method)
+    velocity = np.diff(positions, axis=0) / np.diff(times)[:, None]
+    assert (np.abs(velocity).max(axis=0) <= LIMITS["vel_max"] * (1 + 1e-3)).all()
+    # 最慢关节的峰值速度应接近限制（时长不是随意放大的）
+    assert np.isclose(np.abs(velocity).max(axis=0) / LIMITS["vel_max"], 1.0, rtol=0.05).any()
+
+
+@pytest.mark.parametrize("method", ["cubic", "quintic"])
+def test_acceleration_within_limits(method):
+    times, positions = interpolate(WAYPOINTS, DT, LIMITS, method)
+    # 最后一个点可能是补上的终点，间隔不等，不参与二阶差分
+    times, positions = times[:-1], positions[:-1]
+    acceleration = np.diff(positions, n=2, axis=0) / DT ** 2
+    assert (np.abs(acceleration).max(axis=0) <= LIMITS["acc_max"] * 1.01).all()
+
+
+@pytest.mark.parametrize("method", ["cubic", "quintic"])
+def test_segments_start_and_end_at_rest(method):
+    times, positions = interpolate(WAYPOINTS[:2], DT, LIMITS, method)
+    velocity = np.diff(positions, axis=0) / np.diff(times)[:, None]
+    assert np.abs(velocity[0]).max() < 0.01
+    assert np.abs(velocity[-1]).max() < 0.05
+
+
+def test_waypoints_clipped_to_limits():
+    times, positions = interpolate([[0.0, 0.0, 0.0], [5.0, -5.0, 0.0]], DT, LIMITS)
+    np.testing.assert_array_equal(positions[-1], [np.pi, -np.pi, 0.0])
+    assert (positions >= LIMITS["pos_min"]).all() and (positions <= LIMITS["pos_max"]).all()
+
+
+def test_single_waypoint():
+    times, positions = interpolate([[0.1, 0.2, 0.3]], DT, LIMITS)
+    np.testing.assert_array_equal(times, [0.0])
+    np.testing.assert_array_equal(positions, [[0.1, 0.2, 0.3]])
+
+
+def test_min_duration_for_repeated_waypoints():
+    durations = segment_durations(WAYPOINTS, LIMITS["vel_max"], LIMITS["acc_max"], "quintic", min_duration=0.1)
+    assert durations[1] == 0.1
+    assert (durations >= 0.1).all()
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        interpolate(np.zeros(3), DT, LIMITS)
+    with pytest.raises(ValueError):
+        interpolate(np.zeros((0, 3)), DT, LIMITS)
+    with pytest.raises(ValueError, match="未知插值方式"):
+        interpolate(WAYPOINTS, DT, LIMITS, "spline")
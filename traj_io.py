@@ -0,0 +1,315 @@
+import io
+import json
+import os
+import struct
+import warnings
+import zlib
+
+import numpy as np
+
+# 每次读取并解析的 CSV 字节数
+CSV_BLOCK_BYTES = 8 << 20
+
+# 二进制轨迹文件扩展名
+TRAJ_SUFFIX = ".traj"
+
+# 文件头: magic(4s) version(I) joints(I) block_points(I) count(Q) period(d) units(8s)
+#         index_crc(I) 保留(I)，补齐到 64 字节；其后是 (count, joints) 的 float64 数据，
+#         最后是每块 block_points 个点一项的 CRC32 块索引 (uint32)
+_MAGIC = b"TRJB"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIIIQd8sII")
+_DATA_OFFSET = 64
+
+# 每块点数（块是校验和流式读取的单位）
+TRAJ_BLOCK_POINTS = 4096
+
+
+def _find_bad_line(text, first_line, columns):
+    """逐行检查解析失败的数据块，抛出带行号的 ValueError（只在出错时调用）"""
+    for line_no, line in enumerate(text.splitlines(), first_line):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        values = line.split(",")
+        if len(values) < columns:
+            raise ValueError(f"第 {line_no} 行: 需要 {columns} 列数据, 实际 {len(values)} 列")
+        for value in values[:columns]:
+            try:
+                float(value)
+            except ValueError:
+                raise ValueError(f"第 {line_no} 行: 无法解析数值 {value.strip()!r}") from None
+
+
+def iter_csv_blocks(path, columns=7, block_bytes=CSV_BLOCK_BYTES):
+    """按块解析逗号分隔的轨迹文件，逐块产出 (行数, columns) 的 float64 数组
+
+    每块约 block_bytes 字节，用 NumPy 的 C 解析器整体转换，内存占用与文件大小无关。
+    空行和 # 注释忽略（注释可以是任意编码），多余的列忽略；列数不足或数值无效时抛出带行号的 ValueError。
+    """
+    with open(path, "rb") as f:
+        line_no = 1
+        tail = b""
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                data, tail = tail, b""
+                if not data:
+                    break
+            else:
+                data = tail + data
+                # 只解析到最后一个换行符，剩余的半行留到下一块
+                cut = data.rfind(b"\n") + 1
+                data, tail = data[:cut], data[cut:]
+                if not data:
+                    continue
+            # 注释可能是 GBK/Latin-1 等非 UTF-8 编码，无法解码的字节替换为 U+FFFD；
+            # 出现在数值中时按无效数值报告行号
+            text = data.decode(errors="replace")
+            try:
+                with warnings.catch_warnings():
+                    # 只有注释或空行的块会触发 "input contained no data" 警告
+                    warnings.simplefilter("ignore", UserWarning)
+                    block = np.loadtxt(io.StringIO(text), delimiter=",", usecols=range(columns),
+                                       ndmin=2, dtype=np.float64)
+            except ValueError as e:
+                _find_bad_line(text, line_no, columns)
+                raise ValueError(f"第 {line_no} 行起的数据块解析失败: {e}") from None
+            line_no += data.count(b"\n")
+            if len(block):
+                yield block
+
+
+def load_csv(path, columns=7, block_bytes=CSV_BLOCK_BYTES):
+    """读取整个轨迹文件为连续的 (点数, columns) float64 数组"""
+    blocks = list(iter_csv_blocks(path, columns, block_bytes))
+    if not blocks:
+        return np.empty((0, columns))
+    return np.concatenate(blocks)
+
+
+class TrajectoryWriter:
+    """逐块写入二进制轨迹文件，写入过程中只缓存当前块的校验状态
+
+    数据按块追加并计算每块的 CRC32，close() 时写出块索引和文件头；
+    配合 iter_csv_blocks 可以把任意大的 CSV 文件转换为二进制而不整体载入内存。
+    写入过程中数据在临时文件中，close() 成功后才替换为目标文件；
+    出错时（with 块中抛出异常或调用 abort()）删除临时文件，不会留下截断的轨迹。
+    """
+
+    def __init__(self, path, joints, period=0.0, units="rad", block_points=TRAJ_BLOCK_POINTS):
+        if len(units.encode()) > 8:
+            raise ValueError(f"单位名称过长: {units}")
+        self.path = path
+        self.joints = joints
+        self.period = period
+        self.units = units
+        self.block_points = block_points
+        self.count = 0
+        self.crcs = []
+        self._crc = 0
+        self._tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._f = open(self._tmp_path, "wb")
+        self._f.write(bytes(_DATA_OFFSET))
+
+    def write(self, points):
+        """追加 (点数, joints) 的数据块"""
+        points = np.ascontiguousarray(points, dtype="<f8")
+        if points.ndim != 2 or points.shape[1] != self.joints:
+            raise ValueError(f"数据应为 (点数, {self.joints}) 的数组，实际为 {points.shape}")
+        self._f.write(points.data)
+        # 按块边界切分，逐块累计校验和
+        start = 0
+        while start < len(points):
+            in_block = self.count % self.block_points
+            n = min(len(points) - start, self.block_points - in_block)
+            self._crc = zlib.crc32(points[start:start + n].data, self._crc)
+            self.count += n
+            start += n
+            if self.count % self.block_points == 0:
+                self.crcs.append(self._crc)
+                self._crc = 0
+
+    def close(self):
+        if self._f is None:
+            return
+        if self.count % self.block_points:
+            self.crcs.append(self._crc)
+        index = np.array(self.crcs, dtype="<u4")
+        self._f.write(index.data)
+        header = _HEADER.pack(_MAGIC, _VERSION, self.joints, self.block_points, self.count, self.period,
+                              self.units.encode(), zlib.crc32(index.data), 0)
+        self._f.seek(0)
+        self._f.write(header)
+        self._f.close()
+        self._f = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        if self._f is None:
+            return
+        self._f.close()
+        self._f = None
+        os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class TrajectoryFile:
+    """以只读内存映射打开二进制轨迹文件
+
+    打开只读取文件头和块索引，与轨迹长度无关；points 是直接映射文件的
+    (点数, 关节数) 数组，按需分页载入。校验在 verify/verify_block 中按需进行。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"轨迹文件不完整: {path}")
+        magic, version, self.joints, self.block_points, self.count, self.period, units, index_crc, _ = \
+            _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"不是有效的二进制轨迹文件: {path}")
+        if self.joints == 0 or self.block_points == 0:
+            raise ValueError(f"轨迹文件头无效（关节数 {self.joints}, 每块点数 {self.block_points}）: {path}")
+        self.units = units.rstrip(b"\0").decode()
+        blocks = -(-self.count // self.block_points)
+        data_bytes = self.count * self.joints * 8
+        if os.path.getsize(path) != _DATA_OFFSET + data_bytes + blocks * 4:
+            raise ValueError(f"轨迹文件长度与文件头不符: {path}")
+        self.crcs = np.fromfile(path, dtype="<u4", count=blocks, offset=_DATA_OFFSET + data_bytes)
+        if zlib.crc32(self.crcs.data) != index_crc:
+            raise ValueError(f"轨迹文件块索引校验失败: {path}")
+        if self.count:
+            self.points = np.memmap(path, dtype="<f8", mode="r", offset=_DATA_OFFSET,
+                                    shape=(self.count, self.joints))
+        else:
+            self.points = np.zeros((0, self.joints))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def blocks(self):
+        return len(self.crcs)
+
+    def block(self, index):
+        """第 index 块数据（视图）"""
+        start = index * self.block_points
+        return self.points[start:start + self.block_points]
+
+    def block_of(self, row):
+        """第 row 个点所在的块序号"""
+        return row // self.block_points
+
+    def index_at(self, t):
+        """时刻 t（秒，从第一个点起算）对应的点序号，要求 period > 0"""
+        if self.period <= 0:
+            raise ValueError("轨迹没有采样周期，无法按时间定位")
+        return min(max(int(t / self.period), 0), self.count - 1)
+
+    def verify_block(self, index):
+        return zlib.crc32(np.ascontiguousarray(self.block(index)).data) == int(self.crcs[index])
+
+    def verify(self):
+        """逐块校验全部数据，返回校验失败的块序号列表"""
+        return [i for i in range(self.blocks) if not self.verify_block(i)]
+
+
+def write_trajectory(path, points, period=0.0, units="rad", block_points=TRAJ_BLOCK_POINTS):
+    """把 (点数, 关节数) 数组写为二进制轨迹文件"""
+    points = np.asarray(points, dtype=float)
+    with TrajectoryWriter(path, points.shape[1], period, units, block_points) as writer:
+        writer.write(points)
+
+
+def csv_to_binary(csv_path, path, columns=7, period=0.0, units="rad"):
+    """CSV 轨迹按块转换为二进制轨迹，返回点数"""
+    with TrajectoryWriter(path, columns, period, units) as writer:
+        for block in iter_csv_blocks(csv_path, columns):
+            writer.write(block)
+    return writer.count
+
+
+def binary_to_csv(path, csv_path):
+    """二进制轨迹按块导出为 CSV"""
+    traj = TrajectoryFile(path)
+    with open(csv_path, "w") as f:
+        for i in range(traj.blocks):
+            np.savetxt(f, traj.block(i), fmt="%.10g", delimiter=",")
+
+
+def json_to_binary(json_path, path, period=0.0, units="rad"):
+    """JSON 二维数组（如 closedLoopParams.json）转换为二进制轨迹，返回点数"""
+    with open(json_path, "r") as f:
+        points = np.asarray(json.load(f), dtype=float)
+    if points.ndim != 2:
+        raise ValueError("数据格式不正确，应为二维数组")
+    write_trajectory(path, points, period, units)
+    return len(points)
+
+
+def binary_to_json(path, json_path):
+    with open(json_path, "w") as f:
+        json.dump(TrajectoryFile(path).points.tolist(), f, indent=4)
+
+
+def open_trajectory(path, columns=7):
+    """打开二进制轨迹文件并检查关节数"""
+    traj = TrajectoryFile(path)
+    if traj.joints != columns:
+        raise ValueError(f"轨迹文件有 {traj.joints} 个关节，需要 {columns} 个")
+    return traj
+
+
+def load_trajectory(path, columns=7):
+    """按扩展名读取轨迹: .traj 零拷贝映射，.json 二维数组，其他按 CSV 解析"""
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == TRAJ_SUFFIX:
+        return open_trajectory(path, columns).points
+    if suffix == ".json":
+        with open(path, "r") as f:
+            points = np.asarray(json.load(f), dtype=float)
+        if points.ndim != 2 or points.shape[1] < columns:
+            raise ValueError(f"数据格式不正确，应为每行至少 {columns} 列的二维数组")
+        return points[:, :columns]
+    return load_csv(path, columns)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="轨迹文件格式转换（CSV / JSON 二维数组 / 二进制 .traj）")
+    parser.add_argument("src", help="源文件")
+    parser.add_argument("dst", help="目标文件，按扩展名决定格式")
+    parser.add_argument("--columns", type=int, default=7, help="CSV 转二进制时的关节数")
+    parser.add_argument("--period", type=float, default=0.0, help="采样周期 (s)，0 表示无时间信息的路径点")
+    parser.add_argument("--units", default="rad", help="关节单位")
+    args = parser.parse_args()
+
+    src_suffix = os.path.splitext(args.src)[1].lower()
+    dst_suffix = os.path.splitext(args.dst)[1].lower()
+    if dst_suffix == TRAJ_SUFFIX:
+        if src_suffix == ".json":
+            n = json_to_binary(args.src, args.dst, args.period, args.units)
+        else:
+            n = csv_to_binary(args.src, args.dst, args.columns, args.period, args.units)
+        print(f"已写入 {n} 个点: {args.dst}")
+    elif src_suffix == TRAJ_SUFFIX:
+        if dst_suffix == ".json":
+            binary_to_json(args.src, args.dst)
+        else:
+            binary_to_csv(args.src, args.dst)
+        print(f"已导出: {args.dst}")
+    else:
+        parser.error("源文件或目标文件必须有一个是 .traj")
@@ -0,0 +1,162 @@
+import ctypes
+
+import numpy as np
+import pyads
+
+# PLC 侧环形缓冲区约定（累计计数按 UDINT 回绕）：
+#   MAIN.TrajBuffer    ARRAY[0..N-1, 0..6] OF LREAL  轨迹点环形缓冲区
+#   MAIN.TrajCapacity  UDINT  缓冲区点数 N
+#   MAIN.TrajWriteIdx  UDINT  已写入的点数（上位机写）
+#   MAIN.TrajReadIdx   UDINT  已执行的点数（PLC 写，ReadIdx 追上 WriteIdx 时保持当前位置等待）
+#   MAIN.TrajLoop      BOOL   TRUE 时 ReadIdx 继续累加，按 ReadIdx MOD WriteIdx 取点（整条轨迹常驻缓冲区）
+#   MAIN.TrajCommand   INT    0 停止，1 执行，2 中止（立即停止运动）
+TRAJ_BUFFER = "MAIN.TrajBuffer"
+TRAJ_CAPACITY = "MAIN.TrajCapacity"
+TRAJ_WRITE_IDX = "MAIN.TrajWriteIdx"
+TRAJ_READ_IDX = "MAIN.TrajReadIdx"
+TRAJ_LOOP = "MAIN.TrajLoop"
+TRAJ_COMMAND = "MAIN.TrajCommand"
+
+TRAJ_STOP = 0
+TRAJ_RUN = 1
+TRAJ_ABORT = 2
+
+_INDEX_MASK = 0xFFFFFFFF
+
+# 单次块写入的最大点数（7 关节 LREAL 约 224 KB），避免超出 ADS 单帧上限
+MAX_BLOCK_POINTS = 4096
+
+
+def _block_type(count):
+    """count 个 LREAL 的连续块；包在结构体里，pyads 直接按内存发送而不逐个元素转换"""
+    class Block(ctypes.Structure):
+        _pack_ = 1
+        _fields_ = [("data", ctypes.c_double * count)]
+    return Block
+
+
+class TrajectoryStreamer:
+    """把 (N, 关节数) 轨迹分块流式写入 PLC 环形缓冲区
+
+    缓冲区分成两半交替使用：PLC 执行一半时上位机整块写入另一半，空闲空间按
+    PLC 的读指针计算，因此轨迹长度不受 PLC 内存限制。轨迹能整个放进缓冲区时，
+    循环模式由 PLC 自行回绕，不再重复传输。
+    source 为二进制轨迹文件 (TrajectoryFile) 时，每个文件块首次写入前校验 CRC，
+    校验失败时抛出异常，损坏的数据不会写入 PLC。
+
+    除构造外的方法都会访问 PLC，只能在 ADS 工作线程中调用。
+    """
+
+    def __init__(self, worker, points, loop=False, source=None):
+        self.worker = worker
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        if self.points.ndim != 2 or not len(self.points):
+            raise ValueError("轨迹必须是非空的 (点数, 关节数) 数组")
+        self.loop = loop
+        self.source = source
+        self._verified = set()
+        self.capacity = 0
+        self.chunk = 0
+        self.sent = 0
+        self.executed = 0
+        self.resident = False
+        self.finished = False
+        self._group = self._offset = 0
+        self._block_types = {}
+
+    @property
+    def point_bytes(self):
+        return self.points.shape[1] * ctypes.sizeof(ctypes.c_double)
+
+    def prepare(self):
+        """停止 PLC 轨迹执行，复位读写指针并预先写满缓冲区，返回已写入的点数"""
+        plc = self.worker.require_plc()
+        self.worker.write(TRAJ_COMMAND, TRAJ_STOP, pyads.PLCTYPE_INT)
+        symbol = plc.get_symbol(TRAJ_BUFFER)
+        self._group, self._offset = symbol.index_group, symbol.index_offset
+        self.capacity = self.worker.read(TRAJ_CAPACITY, pyads.PLCTYPE_UDINT)
+        if self.capacity < 2:
+            raise RuntimeError(f"PLC 轨迹缓冲区太小: {self.capacity}")
+        self.chunk = self.capacity // 2
+        self.resident = len(self.points) <= self.capacity
+        self.sent = self.executed = 0
+        self.finished = False
+        self.worker.write(TRAJ_WRITE_IDX, 0, pyads.PLCTYPE_UDINT)
+        self.worker.write(TRAJ_READ_IDX, 0, pyads.PLCTYPE_UDINT)
+        # 整条轨迹在缓冲区中时由 PLC 循环；否则由上位机循环发送
+        self.worker.write(TRAJ_LOOP, self.loop and self.resident, pyads.PLCTYPE_BOOL)
+        self._fill(self.capacity)
+        return self.sent
+
+    def start(self):
+        self.worker.write(TRAJ_COMMAND, TRAJ_RUN, pyads.PLCTYPE_INT)
+
+    def abort(self):
+        self.worker.write(TRAJ_COMMAND, TRAJ_ABORT, pyads.PLCTYPE_INT)
+        self.finished = True
+
+    def pump(self):
+        """一次流控：读取 PLC 读指针，有半个缓冲区空闲时整块补写
+
+        返回 (已写入点数, 已执行点数, 是否结束)。
+        """
+        if self.finished:
+            return self.sent, self.executed, True
+        read_idx = self.worker.read(TRAJ_READ_IDX, pyads.PLCTYPE_UDINT)
+        if self.resident:
+            # 轨迹常驻缓冲区，循环时 ReadIdx 会超过 WriteIdx
+            self.executed = read_idx
+            if not self.loop and self.executed >= self.sent:
+                self._finish()
+            return self.sent, self.executed, self.finished
+
+        # 累计计数可能回绕，按与已写入点数的差值还原
+        self.executed = self.sent - ((self.sent - read_idx) & _INDEX_MASK)
+        if not self.loop and self.sent >= len(self.points):
+            if self.executed >= self.sent:
+                self._finish()
+            return self.sent, self.executed, self.finished
+
+        free = self.capacity - (self.sent - self.executed)
+        if free >= self.chunk:
+            self._fill(free)
+        return self.sent, self.executed, self.finished
+
+    def _finish(self):
+        self.worker.write(TRAJ_COMMAND, TRAJ_STOP, pyads.PLCTYPE_INT)
+        self.finished = True
+
+    def _fill(self, free):
+        """写入最多 free 个点并更新写指针；块写入在缓冲区末尾、轨迹末尾和单次上限处拆分"""
+        count = free if self.loop and not self.resident else min(free, len(self.points) - self.sent)
+        written = 0
+        while written < count:
+            slot = (self.sent + written) % self.capacity
+            source = (self.sent + written) % len(self.points)
+            # 一次块写入不跨越缓冲区末尾，也不跨越轨迹末尾（循环时从头继续）
+            n = min(count - written, self.capacity - slot, len(self.points) - source, MAX_BLOCK_POINTS)
+            self._verify(source, source + n)
+            self._write_block(slot, self.points[source:source + n])
+            written += n
+        self.sent += count
+        self.worker.write(TRAJ_WRITE_IDX, self.sent & _INDEX_MASK, pyads.PLCTYPE_UDINT)
+
+    def _verify(self, start, stop):
+        """校验轨迹点 [start, stop) 所在的文件块（每块只校验一次），写指针更新前调用"""
+        if self.source is None:
+            return
+        for index in range(self.source.block_of(start), self.source.block_of(stop - 1) + 1):
+            if index in self._verified:
+                continue
+            if not self.source.verify_block(index):
+                raise RuntimeError(f"轨迹文件第 {index} 块校验失败（第 {index * self.source.block_points} 点起），"
+                                   f"拒绝写入PLC")
+            self._verified.add(index)
+
+    def _write_block(self, slot, block):
+        size = block.size
+        block_type = self._block_types.get(size)
+        if block_type is None:
+            block_type = self._block_types[size] = _block_type(size)
+        self.worker.require_plc().write(self._group, self._offset + slot * self.point_bytes,
+                                        block_type.from_buffer_copy(block), block_type)
@@ -0,0 +1,118 @@
+import mujoco
+import numpy as np
+
+from model_cache import load_model
+from mujoco_simulation import MODEL_PATH, actuated_joint_indices
+
+
+def densify_path(waypoints, max_step=0.01):
+    """在关节空间中线性加密路径点，使相邻构型各关节变化不超过 max_step (rad)
+
+    线性、三次、五次插值的逐段轨迹在关节空间中都是同一条直线，只是时间分配不同，
+    因此按直线加密即可覆盖所有插值方式经过的构型。
+    返回 (加密后的构型 (M, 关节数), 每个构型对应的原路径段序号 (M,))
+    """
+    waypoints = np.atleast_2d(np.asarray(waypoints, dtype=float))
+    if len(waypoints) < 2:
+        return waypoints.copy(), np.zeros(len(waypoints), dtype=int)
+    steps = np.maximum(np.ceil(np.abs(np.diff(waypoints, axis=0)).max(axis=1) / max_step), 1).astype(int)
+    seg = np.repeat(np.arange(len(steps)), steps)
+    # 每段内的插值比例 (0, 1]
+    offsets = np.arange(len(seg)) - np.repeat(np.cumsum(steps) - steps, steps) + 1
+    s = offsets / steps[seg]
+    dense = waypoints[seg] + (waypoints[seg + 1] - waypoints[seg]) * s[:, None]
+    return np.vstack((waypoints[:1], dense)), np.concatenate(([0], seg))
+
+
+class TrajectoryChecker:
+    """轨迹下发前的批量关节限位和碰撞检查
+
+    先对全部构型做向量化的限位检查，再复用同一个 MjData 逐个构型执行
+    mj_kinematics + mj_collision，遇到第一个违规即返回。
+    """
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model = load_model(model_path)
+        self.data = mujoco.MjData(self.model)
+        self.qpos_idx, _ = actuated_joint_indices(self.model)
+        joint_ids = self.model.actuator_trnid[:, 0]
+        # 同时满足关节限位和执行器控制范围
+        limited = self.model.jnt_limited[joint_ids].astype(bool)
+        self.pos_min = np.where(limited, self.model.jnt_range[joint_ids, 0], -np.inf)
+        self.pos_max = np.where(limited, self.model.jnt_range[joint_ids, 1], np.inf)
+        ctrl_limited = self.model.actuator_ctrllimited.astype(bool)
+        self.pos_min = np.maximum(self.pos_min, np.where(ctrl_limited, self.model.actuator_ctrlrange[:, 0], -np.inf))
+        self.pos_max = np.minimum(self.pos_max, np.where(ctrl_limited, self.model.actuator_ctrlrange[:, 1], np.inf))
+
+    def _geom_name(self, geom_id):
+        name = mujoco.mj_id2name(self.model, mujoco.mjtObj.mjOBJ_GEOM, geom_id)
+        if name:
+            return name
+        body = self.model.geom_bodyid[geom_id]
+        return f"{mujoco.mj_id2name(self.model, mujoco.mjtObj.mjOBJ_BODY, body)}#{geom_id}"
+
+    def check_limits(self, configs):
+        """向量化限位检查，返回第一个越限构型的序号及关节号，无越限时返回 (None, None)"""
+        configs = np.atleast_2d(np.asarray(configs, dtype=float))
+        violation = (configs < self.pos_min) | (configs > self.pos_max)
+        rows = np.flatnonzero(violation.any(axis=1))
+        if len(rows) == 0:
+            return None, None
+        index = int(rows[0])
+        return index, int(np.flatnonzero(violation[index])[0])
+
+    def check(self, configs):
+        """检查一组关节构型 (N, 关节数)
+
+        返回字典 {"ok", "index", "kind", "message"}，kind 为 "limit" 或 "collision"。
+        """
+        configs = np.atleast_2d(np.asarray(configs, dtype=float))
+        limit_index, joint = self.check_limits(configs)
+        # 碰撞检查只需进行到第一个越限构型之前
+        stop = len(configs) if limit_index is None else limit_index
+
+        model, data = self.model, self.data
+        mujoco.mj_resetData(model, data)
+        for index in range(stop):
+            data.qpos[self.qpos_idx] = configs[index]
+            mujoco.mj_kinematics(model, data)
+            mujoco.mj_collision(model, data)
+            # 无接触时直接跳过，避免逐个构造接触对象
+            if data.ncon == 0:
+                continue
+            penetrating = np.flatnonzero(data.contact.dist[:data.ncon] < 0)
+            if len(penetrating):
+                contact = data.contact[int(penetrating[0])]
+                return {
+                    "ok": False,
+                    "index": index,
+                    "kind": "collision",
+                    "message": f"构型 {index} 发生碰撞: {self._geom_name(contact.geom1)} - "
+                               f"{self._geom_name(contact.geom2)}（穿透 {-contact.dist * 1000:.1f} mm）",
+                }
+
+        if limit_index is not None:
+            value = configs[limit_index, joint]
+            return {
+                "ok": False,
+                "index": limit_index,
+                "kind": "limit",
+                "message": f"构型 {limit_index} 关节 {joint + 1} 越限: {value:.4f} 不在 "
+                           f"[{self.pos_min[joint]:.4f}, {self.pos_max[joint]:.4f}] 内",
+            }
+        return {"ok": True, "index": None, "kind": None, "message": f"{len(configs)} 个构型检查通过"}
+
+    def check_path(self, waypoints, max_step=0.01):
+        """加密路径后检查
+
+        不通过时结果中 index 为出问题的路径段序号，waypoint 为该构型所在段的终点
+        路径点序号（构型就是第一个路径点本身时为 0），均从 0 开始。
+        """
+        dense, segments = densify_path(waypoints, max_step)
+        result = self.check(dense)
+        if not result["ok"]:
+            dense_index = result["index"]
+            result["dense_index"] = dense_index
+            result["index"] = int(segments[dense_index])
+            result["waypoint"] = result["index"] + 1 if dense_index > 0 else 0
+        return result
@@ -0,0 +1,100 @@
+import mujoco
+import numpy as np
+
+# 支持的插值方式
+METHODS = ("linear", "cubic", "quintic")
+
+# UR5e 各关节最大速度 (rad/s)，MJCF 中没有速度限制，取产品手册数值
+UR5E_VEL_MAX = np.full(6, np.pi)
+
+# 单段位移为 1 时归一化轨迹的峰值速度、峰值加速度系数
+_PEAK_VEL = {"linear": 1.0, "cubic": 1.5, "quintic": 1.875}
+_PEAK_ACC = {"linear": 0.0, "cubic": 6.0, "quintic": 10.0 / np.sqrt(3.0)}
+
+
+def joint_limits(model, vel_max=None, acc_scale=0.5):
+    """从模型中读取各执行器关节的位置、速度、加速度限制
+
+    位置限制取执行器 ctrlrange；加速度限制取 forcerange 除以 home 关键帧
+    （没有关键帧时为零位）处质量矩阵的对角元，再乘以 acc_scale 留出克服重力的余量。
+    """
+    nu = model.nu
+    data = mujoco.MjData(model)
+    if model.nkey > 0:
+        mujoco.mj_resetDataKeyframe(model, data, 0)
+    mujoco.mj_forward(model, data)
+    dof_idx = model.jnt_dofadr[model.actuator_trnid[:, 0]]
+    # 逐列与单位向量相乘取得质量矩阵对角元
+    inertia = np.zeros(nu)
+    unit = np.zeros(model.nv)
+    column = np.zeros(model.nv)
+    for i, dof in enumerate(dof_idx):
+        unit[:] = 0.0
+        unit[dof] = 1.0
+        mujoco.mj_mulM(model, data, column, unit)
+        inertia[i] = column[dof]
+
+    force_max = np.abs(model.actuator_forcerange).max(axis=1)
+    return {
+        "pos_min": model.actuator_ctrlrange[:, 0].copy(),
+        "pos_max": model.actuator_ctrlrange[:, 1].copy(),
+        "vel_max": np.asarray(vel_max if vel_max is not None else UR5E_VEL_MAX[:nu], dtype=float),
+        "acc_max": acc_scale * force_max / inertia,
+    }
+
+
+def _blend(s, method):
+    """归一化插值函数 s∈[0,1] -> [0,1]，三次/五次在两端速度（五次还有加速度）为零"""
+    if method == "linear":
+        return s
+    if method == "cubic":
+        return s * s * (3.0 - 2.0 * s)
+    if method == "quintic":
+        return s * s * s * (10.0 + s * (-15.0 + 6.0 * s))
+    raise ValueError(f"未知插值方式: {method}")
+
+
+def segment_durations(waypoints, vel_max, acc_max, method="quintic", min_duration=0.0):
+    """按各关节速度、加速度限制计算每段的最短时长（取最慢关节）"""
+    if method not in METHODS:
+        raise ValueError(f"未知插值方式: {method}")
+    delta = np.abs(np.diff(waypoints, axis=0))
+    durations = _PEAK_VEL[method] * delta / vel_max
+    if _PEAK_ACC[method] > 0:
+        durations = np.maximum(durations, np.sqrt(_PEAK_ACC[method] * delta / acc_max))
+    return np.maximum(durations.max(axis=1), min_duration)
+
+
+def interpolate(waypoints, dt, limits, method="quintic", min_duration=0.0):
+    """把稀疏路径点一次性插值为等时间间隔的稠密设定值
+
+    每段从静止出发并在路径点处停下（与逐点到位的闭环控制一致），
+    段时长由关节速度/加速度限制决定。返回 (时间数组 (N,), 设定值数组 (N, 关节数))。
+    """
+    waypoints = np.asarray(waypoints, dtype=float)
+    if waypoints.ndim != 2 or len(waypoints) == 0:
+        raise ValueError("路径点应为 (点数, 关节数) 的二维数组")
+    waypoints = np.clip(waypoints, limits["pos_min"], limits["pos_max"])
+    if len(waypoints) == 1:
+        return np.zeros(1), waypoints.copy()
+
+    durations = segment_durations(waypoints, limits["vel_max"], limits["acc_max"], method, min_duration)
+    starts = np.concatenate(([0.0], np.cumsum(durations)))
+    total = starts[-1]
+
+    times = np.arange(int(np.floor(total / dt)) + 1) * dt
+    seg = np.clip(np.searchsorted(starts, times, side="right") - 1, 0, len(durations) - 1)
+    seg_duration = durations[seg]
+    # 零时长的段（重复路径点）直接取终点
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(seg_duration > 0, (times - starts[seg]) / seg_duration, 1.0)
+    s = _blend(np.clip(s, 0.0, 1.0), method)
+
+    q0 = waypoints[seg]
+    q1 = waypoints[seg + 1]
+    positions = q0 + (q1 - q0) * s[:, None]
+    if times[-1] < total:
+        # 补上终点，保证最终设定值准确落在最后一个路径点
+        times = np.append(times, total)
+        positions = np.vstack((positions, waypoints[-1]))
+    return times, positions